@@ -1,64 +1,211 @@
-from datetime import datetime, timedelta
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from django.contrib.auth.models import User
+from monitoring.metrics import registry
+from recipes.models import RevokedToken
+from . import passwords
 
 # Настройки JWT
 SECRET_KEY = "your-secret-key-keep-it-secret"  # В продакшене использовать безопасный ключ
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Настройка хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Кэш пользователей по идентификатору токена (jti)
+TOKEN_CACHE_TTL = 60  # секунды
+TOKEN_CACHE_MAX_SIZE = 10000
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Хеш для выравнивания времени ответа при несуществующем пользователе
+_dummy_password_hash = None
+
+
+class TokenUserCache:
+    """
+    Кэш пользователей с ограниченным временем жизни и размером.
+
+    Ключ — идентификатор токена (jti), значение — объект User.
+    Короткий TTL ограничивает время, в течение которого изменения
+    пользователя (например, деактивация) не видны API.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[User]:
+        """Возвращает пользователя или None, если записи нет или она устарела"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, user = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            return user
+
+    def set(self, key: str, user: User) -> None:
+        """Сохраняет пользователя, вытесняя самые старые записи при переполнении"""
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, user)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """Удаляет запись из кэша"""
+        with self._lock:
+            self._items.pop(key, None)
+
+
+token_users = TokenUserCache(TOKEN_CACHE_TTL, TOKEN_CACHE_MAX_SIZE)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Проверка пароля (синхронно, в текущем потоке)"""
+    return passwords.check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Получение хеша пароля"""
-    return pwd_context.hash(password)
+    """Получение хеша пароля (синхронно, в текущем потоке)"""
+    return passwords.make_password(password)
+
+async def dummy_password_hash() -> str:
+    """
+    Хеш случайного пароля для проверки при несуществующем пользователе.
+
+    Вычисляется при запуске API (lifespan в api/main.py), чтобы первый
+    вход с неизвестным именем не занимал вдвое больше времени.
+    """
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = await passwords.amake_password(uuid.uuid4().hex)
+    return _dummy_password_hash
 
-def authenticate_user(username: str, password: str):
-    """Аутентификация пользователя"""
-    # Для тестирования, сравниваем пароль с именем пользователя
-    # В продакшене использовать verify_password(password, user.password)
-    if not password == username:
-        return False
-    return username
+async def authenticate_user(username: str, password: str) -> Optional[User]:
+    """
+    Аутентификация пользователя Django по имени и паролю.
+
+    Проверка хеша выполняется в пуле процессов, чтобы не блокировать
+    цикл событий. Для несуществующего пользователя также вычисляется хеш,
+    чтобы время ответа не выдавало наличие учетной записи.
+    """
+    user = await User.objects.filter(username=username).afirst()
+    if user is None:
+        await passwords.acheck_password(password, await dummy_password_hash())
+        return None
+    if not await passwords.acheck_password(password, user.password):
+        return None
+    if not user.is_active:
+        return None
+    return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Создание JWT токена"""
+    """Создание JWT токена с уникальным идентификатором (jti)"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    from jose import jwt  # библиотека JWT загружается при первом использовании
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Получение текущего пользователя по токену"""
+def decode_access_token(token: str) -> dict:
+    """Проверка подписи и срока действия токена"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    return username
+    if payload.get("sub") is None or payload.get("uid") is None or payload.get("jti") is None:
+        raise credentials_exception
+    return payload
+
+async def revoke_token(payload: dict) -> None:
+    """
+    Отзыв токена.
+
+    Идентификатор токена заносится в таблицу RevokedToken до истечения
+    срока действия токена: в отличие от кэша, запись не вытесняется
+    и видна всем воркерам независимо от CACHE_SHARED.
+    """
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    await RevokedToken.objects.arevoke(payload["jti"], expires_at)
+    token_users.discard(payload["jti"])
+
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Получение проверенного содержимого неотозванного токена.
+
+    Отзыв проверяется по базе данных при каждом запросе, до обращения
+    к кэшу пользователей TokenUserCache в get_current_user.
+    """
+    payload = decode_access_token(token)
+    if await RevokedToken.objects.ais_revoked(payload["jti"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
 
-async def get_current_active_user(current_user: str = Depends(get_current_user)):
+async def get_current_user(payload: dict = Depends(get_token_payload)) -> User:
+    """Получение текущего пользователя по токену"""
+    jti = payload["jti"]
+    user = token_users.get(jti)
+    registry.cache_access('api_token_user', hit=user is not None)
+    if user is None:
+        user = await User.objects.filter(pk=payload["uid"], is_active=True).afirst()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        token_users.set(jti, user)
+    return user
+
+async def get_scope_user(scope) -> Optional[User]:
+    """
+    Пользователь по токену из заголовка Authorization запроса ASGI.
+
+    Нужен middleware, работающим вне зависимостей FastAPI (профилирование
+    в monitoring/asgi.py). Отозванный или недействительный токен дает None.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            try:
+                payload = await get_token_payload(token)
+            except HTTPException:
+                return None
+            return await User.objects.filter(pk=payload["uid"], is_active=True).afirst()
+    return None
+
+async def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Проверка, что пользователь активен"""
-    # Проверка активности пользователя не реализована
+    if not current_user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return current_user
+
+async def get_current_staff_user(current_user: User = Depends(get_current_user)):
+    """Проверка, что пользователь — сотрудник (is_staff)"""
+    if not current_user.is_staff:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступно только сотрудникам")
     return current_user
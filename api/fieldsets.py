@@ -0,0 +1,119 @@
+"""
+Выборочные поля рецептов в ответах API (параметр fields).
+
+Клиент перечисляет через запятую нужные поля и/или наборы полей:
+fields=card, fields=card,categories, fields=id,title. По умолчанию
+используется набор full (все поля, как раньше).
+
+Запрошенные поля доходят до запроса к БД: незапрошенные столбцы
+исключаются через only(), автор присоединяется только для поля author,
+категории загружаются только для поля categories.
+"""
+
+from django.db.models import Prefetch
+from fastapi import HTTPException, status
+
+from recipes.models import Category
+
+# Поля ответа в порядке схемы Recipe
+FIELDS = (
+    'id', 'title', 'description', 'ingredients', 'steps', 'preparation_time',
+    'image', 'author', 'categories', 'created_at', 'updated_at',
+)
+
+# Именованные наборы полей
+PRESETS = {
+    'card': ('id', 'title', 'image', 'preparation_time'),
+    'full': FIELDS,
+}
+
+DEFAULT_PRESET = 'full'
+
+# Столбцы модели, которые нужны для поля ответа
+_COLUMNS = {
+    'author': ('author__username',),
+    'categories': (),
+}
+
+
+def parse_fields(value):
+    """
+    Разбирает значение параметра fields.
+
+    Args:
+        value: Строка с полями и наборами через запятую или None
+
+    Returns:
+        tuple: Запрошенные поля в порядке FIELDS (id включается всегда)
+
+    Raises:
+        HTTPException: 400 при неизвестном поле или наборе
+    """
+    names = [name.strip() for name in (value or DEFAULT_PRESET).split(',') if name.strip()]
+    requested = {'id'}
+    unknown = []
+    for name in names:
+        if name in PRESETS:
+            requested.update(PRESETS[name])
+        elif name in FIELDS:
+            requested.add(name)
+        else:
+            unknown.append(name)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(unknown)}. "
+                   f"Доступны: {', '.join(FIELDS)} и наборы {', '.join(PRESETS)}"
+        )
+    return tuple(field for field in FIELDS if field in requested)
+
+
+def apply(queryset, fields):
+    """
+    Ограничивает выборку рецептов запрошенными полями.
+
+    Args:
+        queryset: QuerySet модели Recipe
+        fields: Поля из parse_fields()
+
+    Returns:
+        QuerySet: Выборка только с нужными столбцами и связями
+    """
+    columns = []
+    for field in fields:
+        columns.extend(_COLUMNS.get(field, (field,)))
+    queryset = queryset.only(*columns)
+    if 'author' in fields:
+        queryset = queryset.select_related('author')
+    if 'categories' in fields:
+        queryset = queryset.prefetch_related(
+            Prefetch('categories', queryset=Category.objects.only('id', 'name'))
+        )
+    return queryset
+
+
+def serialize(recipe, fields):
+    """
+    Преобразует рецепт в словарь только с запрошенными полями.
+
+    Args:
+        recipe: Рецепт, загруженный выборкой из apply()
+        fields: Поля из parse_fields()
+
+    Returns:
+        dict: Данные для схемы RecipeFields
+    """
+    data = {}
+    for field in fields:
+        if field == 'image':
+            data['image'] = str(recipe.image.url) if recipe.image else None
+        elif field == 'author':
+            data['author'] = recipe.author.username
+        elif field == 'categories':
+            # Порядок ключей как в схеме Category: name, затем id
+            data['categories'] = [
+                {'name': category.name, 'id': category.id} for category in recipe.categories.all()
+            ]
+        else:
+            data[field] = getattr(recipe, field)
+    return data
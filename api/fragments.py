@@ -0,0 +1,174 @@
+"""
+Кэш сериализованных рецептов и быстрые JSON-ответы.
+
+Обычный путь ответа для каждого рецепта: ORM, model_validate, проверка
+pydantic, повторная проверка response_model в FastAPI и кодирование JSON.
+Здесь каждый рецепт сериализуется один раз в байты JSON (фрагмент)
+и хранится в отдельном кэше Django 'fragments'. Ключ включает id, updated_at, набор полей
+(api/fieldsets.py), версию справочника категорий и, если в ответе есть
+автор, отпечаток его имени, поэтому изменение рецепта, переименование
+категории или пользователя само делает фрагмент неактуальным.
+
+Ответ собирается склейкой фрагментов и отдается RawJSONResponse, минуя
+response_model. Для списка при теплом кэше нужен один запрос (id и
+updated_at страницы), рецепты из БД загружаются только для промахов.
+
+Фрагменты совпадают по содержимому с ответом через схемы pydantic
+(даты в UTC с суффиксом Z). Кодирование выполняется orjson (есть
+в requirements.txt), без него — стандартным json.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from fastapi.responses import Response
+
+from monitoring.metrics import registry
+from recipes.catalog import category_catalog
+from recipes.models import Recipe
+
+from . import fieldsets
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+FRAGMENT_CACHE_KEY = 'api:recipe:{version}:{fields}:{id}:{updated}:{author}'
+
+
+def _isoformat(value):
+    """Дата в формате pydantic: UTC с суффиксом Z."""
+    return value.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return _isoformat(value)
+    raise TypeError(f'Объект {type(value).__name__} не сериализуется в JSON')
+
+
+def dumps(data):
+    """Кодирует данные в байты JSON (orjson, если установлен)."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_default).encode()
+
+
+class RawJSONResponse(Response):
+    """Ответ с уже закодированным телом JSON (bytes)."""
+    media_type = 'application/json'
+
+
+def join_array(fragments):
+    """Склеивает фрагменты в JSON-массив."""
+    return b'[' + b','.join(fragments) + b']'
+
+
+def _dump_recipe(recipe, fields):
+    data = fieldsets.serialize(recipe, fields)
+    for key in ('created_at', 'updated_at'):
+        if key in data:
+            data[key] = _isoformat(data[key])
+    return dumps(data)
+
+
+def _fragment_key(version, fields_key, row):
+    pk, updated, *author = row
+    # Имя автора входит в ключ отпечатком: оно может быть длинным
+    author = hashlib.sha1(author[0].encode()).hexdigest()[:12] if author else ''
+    return FRAGMENT_CACHE_KEY.format(
+        version=version, fields=fields_key, id=pk, updated=updated.timestamp(), author=author,
+    )
+
+
+def get_fragments(rows, fields):
+    """
+    Возвращает фрагменты рецептов, загружая из БД только промахи кэша.
+
+    Args:
+        rows: Строки ключей рецептов (см. row_fields())
+        fields: Поля из fieldsets.parse_fields()
+
+    Returns:
+        dict: {id: байты JSON}; рецептов, удаленных между запросами, в нем нет
+    """
+    if not rows:
+        return {}
+    version = category_catalog.version()
+    fields_key = ','.join(fields)
+    keys = {_fragment_key(version, fields_key, row): row[0] for row in rows}
+    cache = caches['fragments']
+    cached = cache.get_many(keys)
+    fragments = {keys[key]: value for key, value in cached.items()}
+    missing = {key: pk for key, pk in keys.items() if pk not in fragments}
+    registry.cache_access('api_recipe_fragment', hit=True, count=len(fragments))
+    registry.cache_access('api_recipe_fragment', hit=False, count=len(missing))
+    if missing:
+        loaded = fieldsets.apply(Recipe.objects.all(), fields).in_bulk(set(missing.values()))
+        to_cache = {}
+        for key, pk in missing.items():
+            if pk in loaded:
+                fragments[pk] = to_cache[key] = _dump_recipe(loaded[pk], fields)
+        cache.set_many(to_cache, timeout=settings.API_FRAGMENT_CACHE_TIMEOUT)
+    return fragments
+
+
+def row_fields(fields, prefix=''):
+    """
+    Поля строки ключа фрагмента: id, updated_at и имя автора, если оно в ответе.
+
+    Args:
+        fields: Поля из fieldsets.parse_fields()
+        prefix: Путь к рецепту в выборке другой модели (например 'similar__')
+
+    Returns:
+        list: Имена полей для values_list()
+    """
+    names = ['id', 'updated_at'] + (['author__username'] if 'author' in fields else [])
+    return [prefix + name for name in names]
+
+
+def recipe_rows(queryset, fields):
+    """Строки ключей фрагментов выборки рецептов."""
+    return list(queryset.values_list(*row_fields(fields)))
+
+
+def render_list(queryset, fields):
+    """
+    Тело ответа со списком рецептов выборки в ее порядке.
+
+    Args:
+        queryset: Выборка рецептов (с сортировкой и срезом)
+        fields: Поля из fieldsets.parse_fields()
+
+    Returns:
+        bytes: JSON-массив рецептов
+    """
+    rows = recipe_rows(queryset, fields)
+    fragments = get_fragments(rows, fields)
+    return join_array([fragments[pk] for pk, *_ in rows if pk in fragments])
+
+
+def render_batch(ids, fields):
+    """
+    Тело ответа пакетной загрузки: рецепты в порядке ids с отметками
+    not_found для отсутствующих.
+
+    Args:
+        ids: Запрошенные id (повторы сохраняются)
+        fields: Поля из fieldsets.parse_fields()
+
+    Returns:
+        bytes: JSON-объект {"results": [...]}
+    """
+    fragments = get_fragments(recipe_rows(Recipe.objects.filter(pk__in=set(ids)), fields), fields)
+    items = [
+        b'{"id":%d,"status":"ok","recipe":%s}' % (pk, fragments[pk]) if pk in fragments
+        else b'{"id":%d,"status":"not_found"}' % pk
+        for pk in ids
+    ]
+    return b'{"results":' + join_array(items) + b'}'
@@ -1,15 +1,17 @@
 import os
 import sys
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, status
+from functools import partial
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Query, Request, UploadFile, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.middleware.cors import CORSMiddleware
-import cloudinary
-import cloudinary.uploader
 from io import BytesIO
-from typing import List
+from typing import List, Optional
+from pydantic import ValidationError
 from asgiref.sync import sync_to_async
 
 # Настройка путей для Django
@@ -18,68 +20,88 @@ BASE_DIR = CURRENT_DIR.parent
 if str(BASE_DIR) not in sys.path:
     sys.path.append(str(BASE_DIR))
 
-# Инициализация Django
+# Инициализация Django, если приложение запущено отдельно
+# (в recipe_site/asgi.py Django уже инициализирован)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_site.settings')
 import django
-django.setup()
+from django.apps import apps
+if not apps.ready:
+    django.setup()
 
 # Импорты Django после инициализации
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from recipes.models import Recipe, Category
-from . import models, schemas, auth
+from recipes.models import POPULAR_ORDERING, Recipe, Category, SimilarRecipe
+from recipes.catalog import category_catalog
+from recipes import bulk, export, services, storage, sync
+from monitoring.asgi import MetricsASGIMiddleware, ProfilingASGIMiddleware, TracingASGIMiddleware
+from monitoring.tracing import traced
+from . import schemas, auth, fieldsets, fragments
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Создание директории для медиафайлов если её нет
-MEDIA_DIR = Path("media/recipes")
-MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+@asynccontextmanager
+async def lifespan(app):
+    """Подготовка при запуске: хеш для входа несуществующих пользователей"""
+    try:
+        await auth.dummy_password_hash()
+    except Exception as e:
+        # Хеш будет вычислен при первом входе с неизвестным именем
+        logger.warning(f"Не удалось подготовить хеш пароля: {e}")
+    yield
 
 app = FastAPI(title="Recipe API", 
              description="API для управления рецептами",
-             version="1.0.0")
+             version="1.0.0",
+             lifespan=lifespan)
+
+# CORS настраивается один раз для сайта и API в recipe_site/asgi.py
+
+# Профилирование запросов по токену из админки (только для выдавшего его сотрудника)
+app.add_middleware(ProfilingASGIMiddleware, authenticate=auth.get_scope_user)
 
-# Настройка CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Трассировка отобранных запросов (см. monitoring/tracing.py)
+app.add_middleware(TracingASGIMiddleware)
+
+# Метрики запросов к API (отдаются на /metrics вместе с метриками сайта)
+app.add_middleware(MetricsASGIMiddleware)
 
 # Инициализация базовой аутентификации
 security = OAuth2PasswordBearer(tokenUrl="token")
 
-def authenticate_user(form_data: OAuth2PasswordRequestForm):
+async def authenticate_user(form_data: OAuth2PasswordRequestForm):
     """Аутентификация пользователя"""
     try:
-        user = auth.authenticate_user(form_data.username, form_data.password)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Неверное имя пользователя или пароль",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user
+        user = await auth.authenticate_user(form_data.username, form_data.password)
     except Exception as e:
         logger.error(f"Error in authenticate_user: {e}")
+        user = None
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверное имя пользователя или пароль",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user
 
 @app.post("/token", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    """Получение токена доступа"""
+@traced
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Получение токена доступа.
+    Проверка пароля выполняется в пуле процессов и не блокирует цикл событий.
+    """
     try:
-        user = authenticate_user(form_data)
+        user = await authenticate_user(form_data)
         access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = auth.create_access_token(
-            data={"sub": user}, expires_delta=access_token_expires
+            data={"sub": user.username, "uid": user.pk}, expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
     except HTTPException as e:
@@ -91,64 +113,300 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
             detail="Произошла внутренняя ошибка сервера"
         )
 
-@app.get("/recipes/", response_model=List[schemas.Recipe])
-async def read_recipes(skip: int = 0, limit: int = 100):
-    """Получение списка всех рецептов"""
+@app.post("/token/revoke")
+@traced
+async def revoke_access_token(payload: dict = Depends(auth.get_token_payload)):
+    """Отзыв текущего токена доступа (выход из API)"""
+    await auth.revoke_token(payload)
+    return {"message": "Токен отозван"}
+
+@app.get("/recipes/", response_model=List[schemas.RecipeFields], response_model_exclude_unset=True)
+@traced
+async def read_recipes(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    sort: str = Query("created", pattern="^(created|popular)$")
+):
+    """
+    Получение списка всех рецептов.
+    fields — поля и наборы полей ответа (card, full; см. api/fieldsets.py).
+    sort — created (сначала новые) или popular (по популярности,
+    см. команду update_popularity).
+    """
+    fields = fieldsets.parse_fields(fields)
+    queryset = Recipe.objects.all()
+    if sort == "popular":
+        queryset = queryset.order_by(*POPULAR_ORDERING, '-created_at')
+
+    # Ответ собирается из кэшированных фрагментов JSON (см. api/fragments.py)
+    body = await sync_to_async(fragments.render_list)(queryset[skip:skip + limit], fields)
+    return fragments.RawJSONResponse(body)
+
+@app.get("/recipes/search", response_model=List[schemas.RecipeFields], response_model_exclude_unset=True)
+@traced
+async def search_recipes(
+    q: str = Query(..., min_length=2, max_length=100),
+    skip: int = 0,
+    limit: int = Query(20, le=100),
+    fields: Optional[str] = "card"
+):
+    """
+    Поиск рецептов по названию и описанию (без учета регистра).
+    На Postgres использует триграммные индексы (миграция 0007).
+    По умолчанию возвращает набор полей card.
+    """
+    fields = fieldsets.parse_fields(fields)
+
+    queryset = Recipe.objects.filter(Q(title__icontains=q) | Q(description__icontains=q))
+    body = await sync_to_async(fragments.render_list)(queryset[skip:skip + limit], fields)
+    return fragments.RawJSONResponse(body)
+
+@app.get("/recipes/export")
+@traced
+async def export_recipes(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    compress: bool = True,
+    current_user: User = Depends(auth.get_current_staff_user)
+):
+    """
+    Потоковая выгрузка каталога в NDJSON или CSV (по умолчанию со сжатием gzip).
+    Доступна только сотрудникам.
+
+    since ограничивает выгрузку рецептами, измененными позже этого момента.
+    Для следующей инкрементальной выгрузки используется значение
+    заголовка X-Export-Started. Каталог читается серверным курсором
+    порциями (см. recipes/export.py); все порции читаются в одном потоке
+    синхронного кода, которому принадлежит соединение с курсором.
+    """
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    started = timezone.now()
+    chunks = export.export_stream(since=since, fmt=fmt, compress=compress)
+    next_chunk = sync_to_async(next)
+
+    async def body():
+        try:
+            while (chunk := await next_chunk(chunks, None)) is not None:
+                yield chunk
+        finally:
+            await sync_to_async(chunks.close)()
+
+    filename = f"recipes-{started:%Y%m%d-%H%M%S}.{fmt}" + (".gz" if compress else "")
+    media_type = "application/gzip" if compress else (
+        "application/x-ndjson" if fmt == "ndjson" else "text/csv; charset=utf-8"
+    )
+    return StreamingResponse(body(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Export-Started": started.isoformat(),
+    })
+
+@app.get("/recipes/changes", response_model=schemas.RecipeChanges)
+@traced
+async def get_recipe_changes(since: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=1000)):
+    """
+    Изменения рецептов после токена синхронизации (см. recipes/sync.py).
+
+    Без since возвращается начальный токен: после него клиент загружает
+    каталог целиком и дальше запрашивает только изменения с next_token.
+    Пока has_more истинно, следующую порцию можно запросить сразу.
+    Устаревший токен — 410 (нужна полная синхронизация), поврежденный — 400.
+    """
     @sync_to_async
-    def get_recipes():
-        recipes = Recipe.objects.all()[skip:skip + limit]
-        return [schemas.Recipe.model_validate(recipe) for recipe in recipes]
-    
-    return await get_recipes()
+    def get_changes():
+        try:
+            changes = sync.changes_since(since, limit=limit)
+        except sync.SyncTokenExpired as e:
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+        except sync.SyncTokenError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        for key in ('created', 'updated'):
+            changes[key] = [schemas.Recipe.model_validate(recipe) for recipe in changes[key]]
+        return changes
+
+    return await get_changes()
+
+async def _load_recipe_batch(ids, fields):
+    """
+    Загружает рецепты по списку id постоянным числом запросов.
+
+    Результаты возвращаются в порядке ids (повторы сохраняются),
+    для отсутствующих рецептов — status="not_found".
+    """
+    if len(ids) > settings.API_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Можно запросить не больше {settings.API_BATCH_MAX_IDS} рецептов"
+        )
+
+    body = await sync_to_async(fragments.render_batch)(ids, fields)
+    return fragments.RawJSONResponse(body)
+
+@app.get("/recipes/batch", response_model=schemas.RecipeBatch, response_model_exclude_unset=True)
+@traced
+async def get_recipe_batch(
+    ids: str = Query(..., description="Идентификаторы через запятую"),
+    fields: Optional[str] = None
+):
+    """
+    Пакетная загрузка рецептов по id (ids=1,2,3).
+    Для длинных списков используется POST /recipes/batch.
+    """
+    fields = fieldsets.parse_fields(fields)
+    try:
+        recipe_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids должны быть целыми числами")
+    return await _load_recipe_batch(recipe_ids, fields)
+
+@app.post("/recipes/batch", response_model=schemas.RecipeBatch, response_model_exclude_unset=True)
+@traced
+async def post_recipe_batch(batch: schemas.RecipeBatchRequest, fields: Optional[str] = None):
+    """Пакетная загрузка рецептов по id из тела запроса ({"ids": [...]})"""
+    return await _load_recipe_batch(batch.ids, fieldsets.parse_fields(fields))
+
+@app.get("/recipes/{recipe_id}", response_model=schemas.RecipeFields, response_model_exclude_unset=True)
+@traced
+async def get_recipe(recipe_id: int, fields: Optional[str] = None):
+    """Получение рецепта по ID (fields — см. read_recipes)"""
+    fields = fieldsets.parse_fields(fields)
 
-@app.get("/recipes/{recipe_id}", response_model=schemas.Recipe)
-async def get_recipe(recipe_id: int):
-    """Получение рецепта по ID"""
     @sync_to_async
     def get_recipe_by_id():
-        try:
-            recipe = Recipe.objects.get(id=recipe_id)
-            return schemas.Recipe.model_validate(recipe)
-        except Recipe.DoesNotExist:
+        rows = fragments.recipe_rows(Recipe.objects.filter(id=recipe_id), fields)
+        fragment = fragments.get_fragments(rows, fields).get(recipe_id)
+        if fragment is None:
             raise HTTPException(status_code=404, detail="Рецепт не найден")
+        return fragment
     
-    return await get_recipe_by_id()
+    return fragments.RawJSONResponse(await get_recipe_by_id())
+
+@app.get("/recipes/{recipe_id}/similar", response_model=List[schemas.RecipeFields], response_model_exclude_unset=True)
+@traced
+async def get_similar_recipes(recipe_id: int, fields: Optional[str] = "card"):
+    """
+    Похожие рецепты, заранее рассчитанные командой build_similar.
+    По умолчанию возвращает набор полей card.
+    """
+    fields = fieldsets.parse_fields(fields)
+
+    @sync_to_async
+    def get_similar():
+        # Список читается одним запросом вместе с ключами фрагментов
+        rows = list(
+            SimilarRecipe.objects.filter(recipe_id=recipe_id).order_by('rank')
+            .values_list(*fragments.row_fields(fields, prefix='similar__'))
+        )
+        if not rows and not Recipe.objects.filter(id=recipe_id).exists():
+            raise HTTPException(status_code=404, detail="Рецепт не найден")
+        found = fragments.get_fragments(rows, fields)
+        return fragments.join_array([found[pk] for pk, *_ in rows if pk in found])
+
+    return fragments.RawJSONResponse(await get_similar())
 
 @app.post("/recipes/", response_model=schemas.Recipe)
+@traced
 async def create_recipe(
-    recipe: schemas.RecipeCreate,
+    recipe: str = Form(..., description="Рецепт в JSON (схема RecipeCreate)"),
     image: UploadFile = File(...),
     current_user: User = Depends(auth.get_current_user)
 ):
     """
     Создание нового рецепта.
     Требует аутентификации пользователя.
+    Запрос — multipart-форма: поле recipe с JSON рецепта и файл image.
+    Рецепт и его категории сохраняются в одной транзакции.
     """
+    try:
+        recipe = schemas.RecipeCreate.model_validate_json(recipe)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
     # Загрузка изображения в Cloudinary
     image_content = await image.read()
-    cloudinary_response = cloudinary.uploader.upload(
+    cloudinary_response = await sync_to_async(storage.upload_image, thread_sensitive=False)(
         BytesIO(image_content),
         folder="recipes"
     )
     
-    # Создание рецепта
-    recipe_obj = Recipe.objects.create(
-        title=recipe.title,
-        description=recipe.description,
-        preparation_time=recipe.cooking_time,
-        ingredients=recipe.ingredients,
-        steps=recipe.steps,
-        image=cloudinary_response['url'],
-        author=current_user
-    )
-    
-    # Добавление категорий
-    if recipe.categories:
-        recipe_obj.categories.set(recipe.categories)
+    @sync_to_async
+    def save_recipe():
+        categories = []
+        if recipe.categories:
+            categories, missing_ids = Category.objects.resolve(ids=recipe.categories)
+            if missing_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Категории не найдены: {sorted(missing_ids)}"
+                )
+        recipe_obj = services.create_recipe(
+            Recipe(
+                title=recipe.title,
+                description=recipe.description,
+                preparation_time=recipe.preparation_time,
+                ingredients=recipe.ingredients,
+                steps=recipe.steps,
+                image=cloudinary_response['url'],
+                author=current_user
+            ),
+            categories
+        )
+        return schemas.Recipe.model_validate(recipe_obj)
     
-    return schemas.Recipe.from_orm(recipe_obj)
+    return await save_recipe()
+
+@app.post("/recipes/bulk", response_model=schemas.BulkImportResult)
+@traced
+async def bulk_import_recipes(
+    request: Request,
+    current_user: User = Depends(auth.get_current_user)
+):
+    """
+    Пакетный импорт рецептов из тела запроса в формате NDJSON.
+    Требует аутентификации пользователя; автор всех рецептов — текущий пользователь.
+
+    Тело читается потоком и сохраняется пакетами по BULK_IMPORT_BATCH_SIZE
+    записей (см. recipes/bulk.py), поэтому весь файл не держится в памяти.
+    Изображения не загружаются: поле image может содержать путь к уже
+    загруженному файлу. Ошибки отдельных записей возвращаются в errors
+    с номером строки и не прерывают импорт остальных.
+    """
+    batch_size = settings.BULK_IMPORT_BATCH_SIZE
+    result = bulk.BulkResult()
+
+    # Пакет выполняется вне общего потока синхронного кода, чтобы долгий
+    # импорт (разбор в пуле процессов и вставка) не задерживал остальные
+    # обращения API к ORM; соединение этого потока закрывается после пакета
+    @partial(sync_to_async, thread_sensitive=False)
+    def import_batch(batch, result, author):
+        try:
+            bulk.import_batch(batch, result, author=author)
+        finally:
+            connections.close_all()
+
+    batch = []
+    line_number = 0
+    tail = b''
+
+    async for chunk in request.stream():
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            line_number += 1
+            batch.append((line_number, line.decode('utf-8', errors='replace')))
+        if len(batch) >= batch_size:
+            await import_batch(batch, result, author=current_user)
+            batch = []
+    if tail:
+        batch.append((line_number + 1, tail.decode('utf-8', errors='replace')))
+    if batch:
+        await import_batch(batch, result, author=current_user)
+
+    return result.as_dict()
 
 @app.put("/recipes/{recipe_id}", response_model=schemas.Recipe)
+@traced
 async def update_recipe(
     recipe_id: int,
     recipe: schemas.RecipeUpdate,
@@ -158,38 +416,63 @@ async def update_recipe(
     Обновление рецепта.
     Требует аутентификации пользователя.
     Пользователь может обновлять только свои рецепты.
+    
+    Записываются только изменившиеся поля, категории обновляются
+    разницей с текущим набором, все изменения выполняются в одной
+    транзакции. Если передан updated_at и рецепт с тех пор изменился,
+    возвращается 409.
     """
-    try:
-        recipe_obj = Recipe.objects.get(id=recipe_id)
+    @sync_to_async
+    def apply_update():
+        try:
+            recipe_obj = Recipe.objects.get(id=recipe_id)
+        except Recipe.DoesNotExist:
+            raise HTTPException(status_code=404, detail="Рецепт не найден")
         
         # Проверка прав доступа
-        if recipe_obj.author != current_user:
+        if recipe_obj.author_id != current_user.pk:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Нет прав для редактирования этого рецепта"
             )
         
-        # Обновление полей
-        if recipe.title is not None:
-            recipe_obj.title = recipe.title
-        if recipe.description is not None:
-            recipe_obj.description = recipe.description
-        if recipe.cooking_time is not None:
-            recipe_obj.preparation_time = recipe.cooking_time
-        if recipe.ingredients is not None:
-            recipe_obj.ingredients = recipe.ingredients
-        if recipe.steps is not None:
-            recipe_obj.steps = recipe.steps
-        if recipe.categories is not None:
-            recipe_obj.categories.set(recipe.categories)
+        # Применяем только действительно изменившиеся поля
+        changed_fields = []
+        for field in ('title', 'description', 'preparation_time', 'ingredients', 'steps'):
+            value = getattr(recipe, field)
+            if value is not None and value != getattr(recipe_obj, field):
+                setattr(recipe_obj, field, value)
+                changed_fields.append(field)
         
-        recipe_obj.save()
-        return schemas.Recipe.from_orm(recipe_obj)
+        categories = None
+        if recipe.categories is not None:
+            categories, missing_ids = Category.objects.resolve(ids=recipe.categories)
+            if missing_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Категории не найдены: {sorted(missing_ids)}"
+                )
         
-    except Recipe.DoesNotExist:
-        raise HTTPException(status_code=404, detail="Рецепт не найден")
+        try:
+            services.update_recipe(
+                recipe_obj,
+                changed_fields,
+                categories=categories,
+                expected_version=recipe.updated_at
+            )
+        except services.RecipeConflictError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Рецепт был изменен другим запросом"
+            )
+        except Recipe.DoesNotExist:
+            raise HTTPException(status_code=404, detail="Рецепт не найден")
+        return schemas.Recipe.model_validate(recipe_obj)
+    
+    return await apply_update()
 
 @app.delete("/recipes/{recipe_id}")
+@traced
 async def delete_recipe(
     recipe_id: int,
     current_user: User = Depends(auth.get_current_user)
@@ -199,23 +482,27 @@ async def delete_recipe(
     Требует аутентификации пользователя.
     Пользователь может удалить только свой рецепт.
     """
-    try:
-        recipe = Recipe.objects.get(id=recipe_id)
+    @sync_to_async
+    def delete_recipe_by_id():
+        try:
+            recipe = Recipe.objects.get(id=recipe_id)
+        except Recipe.DoesNotExist:
+            raise HTTPException(status_code=404, detail="Рецепт не найден")
         
         # Проверка прав доступа
-        if recipe.author != current_user:
+        if recipe.author_id != current_user.pk:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Нет прав для удаления этого рецепта"
             )
         
         recipe.delete()
-        return {"message": "Рецепт успешно удален"}
-        
-    except Recipe.DoesNotExist:
-        raise HTTPException(status_code=404, detail="Рецепт не найден")
+    
+    await delete_recipe_by_id()
+    return {"message": "Рецепт успешно удален"}
 
 @app.put("/recipes/{recipe_id}/image")
+@traced
 async def update_recipe_image(
     recipe_id: int,
     image: UploadFile = File(...),
@@ -223,52 +510,46 @@ async def update_recipe_image(
 ):
     """Обновление изображения рецепта"""
     try:
-        recipe = Recipe.objects.get(id=recipe_id)
-        
-        # Проверка прав доступа
-        if recipe.author != current_user:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Нет прав для обновления этого рецепта"
-            )
-        
-        # Загрузка нового изображения в Cloudinary
-        image_data = await image.read()
-        cloudinary_response = cloudinary.uploader.upload(image_data)
-        image_url = cloudinary_response['secure_url']
-        
-        recipe.image = image_url
-        recipe.save()
-        
-        return {"message": "Изображение успешно обновлено"}
-        
+        recipe = await Recipe.objects.aget(id=recipe_id)
     except Recipe.DoesNotExist:
         raise HTTPException(status_code=404, detail="Рецепт не найден")
+    
+    # Проверка прав доступа
+    if recipe.author_id != current_user.pk:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Нет прав для обновления этого рецепта"
+        )
+    
+    # Загрузка нового изображения в Cloudinary
+    image_data = await image.read()
+    cloudinary_response = await sync_to_async(storage.upload_image, thread_sensitive=False)(image_data)
+    image_url = cloudinary_response['secure_url']
+    
+    recipe.image = image_url
+    await sync_to_async(recipe.save)(update_fields=['image', 'updated_at'])
+    
+    return {"message": "Изображение успешно обновлено"}
 
 @app.get("/categories/", response_model=List[schemas.Category])
+@traced
 async def get_categories():
-    """Получение списка всех категорий"""
-    @sync_to_async
-    def get_all_categories():
-        categories = Category.objects.all()
-        return [schemas.Category.model_validate(category) for category in categories]
-    
-    return await get_all_categories()
+    """Получение списка всех категорий из кэшированного справочника"""
+    snapshot = await category_catalog.asnapshot()
+    return [schemas.Category.model_validate(category) for category in snapshot.categories]
 
 @app.get("/categories/{category_id}", response_model=schemas.Category)
+@traced
 async def get_category(category_id: int):
-    """Получение конкретной категории по ID"""
-    @sync_to_async
-    def get_category_by_id():
-        try:
-            category = Category.objects.get(id=category_id)
-            return schemas.Category.model_validate(category)
-        except Category.DoesNotExist:
-            raise HTTPException(status_code=404, detail="Категория не найдена")
-    
-    return await get_category_by_id()
+    """Получение конкретной категории по ID из кэшированного справочника"""
+    snapshot = await category_catalog.asnapshot()
+    category = snapshot.by_id.get(category_id)
+    if category is None:
+        raise HTTPException(status_code=404, detail="Категория не найдена")
+    return schemas.Category.model_validate(category)
 
 @app.get("/")
+@traced
 def read_root():
     """Корневой эндпоинт"""
     return {"message": "Добро пожаловать в API рецептов!"}
@@ -0,0 +1,76 @@
+"""
+Проверка паролей в отдельном пуле процессов.
+
+Хеширование паролей намеренно медленное (PBKDF2/bcrypt), поэтому при
+всплеске входов оно не должно выполняться в потоке цикла событий.
+Проверки выполняются в пуле из API_PASSWORD_WORKERS процессов
+(см. recipe_site/procpool.py), а число ожидающих проверок ограничено
+семафором PASSWORD_QUEUE_LIMIT.
+
+Хешеры Django импортируются при вызове: дочернему процессу они нужны,
+а процессу API достаточно асинхронных оберток.
+"""
+
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from recipe_site.procpool import ProcessPool
+
+# Максимум одновременно ожидающих проверок на процесс API
+PASSWORD_QUEUE_LIMIT = int(os.getenv("API_PASSWORD_QUEUE_LIMIT", "32"))
+
+pool = ProcessPool('API_PASSWORD_WORKERS')
+_slots = None
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля хешерами Django (выполняется в дочернем процессе)"""
+    from django.contrib.auth.hashers import check_password as django_check_password
+    return django_check_password(plain_password, hashed_password)
+
+
+def make_password(password: str) -> str:
+    """Получение хеша пароля хешером Django по умолчанию"""
+    from django.contrib.auth.hashers import make_password as django_make_password
+    return django_make_password(password)
+
+
+def _get_slots():
+    """Возвращает семафор, ограничивающий очередь проверок."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_QUEUE_LIMIT)
+    return _slots
+
+
+async def run_in_pool(func, *args):
+    """
+    Выполняет функцию хеширования в пуле процессов.
+
+    Args:
+        func: check_password или make_password
+        *args: Аргументы функции
+
+    Returns:
+        Результат функции
+    """
+    async with _get_slots():
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool.get(), func, *args)
+        except BrokenProcessPool:
+            # Дочерний процесс аварийно завершился: пересоздаем пул один раз
+            pool.shutdown(wait=False)
+            return await loop.run_in_executor(pool.get(), func, *args)
+
+
+async def acheck_password(plain_password: str, hashed_password: str) -> bool:
+    """Асинхронная проверка пароля в пуле процессов"""
+    return await run_in_pool(check_password, plain_password, hashed_password)
+
+
+async def amake_password(password: str) -> str:
+    """Асинхронное получение хеша пароля в пуле процессов"""
+    return await run_in_pool(make_password, password)
+
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class CategoryBase(BaseModel):
@@ -56,6 +56,8 @@ class RecipeUpdate(BaseModel):
     steps: Optional[str] = None
     preparation_time: Optional[int] = None
     categories: Optional[List[int]] = None
+    # Значение updated_at, которое видел клиент; при расхождении вернется 409
+    updated_at: Optional[datetime] = None
 
 class Recipe(RecipeBase):
     id: int
@@ -86,9 +88,56 @@ class Recipe(RecipeBase):
         }
         return cls(**data)
 
+class RecipeFields(BaseModel):
+    """Рецепт с выборочными полями (параметр fields, см. api/fieldsets.py)"""
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    ingredients: Optional[str] = None
+    steps: Optional[str] = None
+    preparation_time: Optional[int] = None
+    image: Optional[str] = None
+    author: Optional[str] = None
+    categories: Optional[List[Category]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class TokenData(BaseModel):
     username: str | None = None
+
+class BulkImportError(BaseModel):
+    """Ошибка записи пакетного импорта"""
+    line: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    """Итог пакетного импорта рецептов"""
+    created: int
+    ids: List[int] = []
+    errors: List[BulkImportError] = []
+
+class RecipeChanges(BaseModel):
+    """Изменения рецептов после токена синхронизации"""
+    created: List[Recipe] = []
+    updated: List[Recipe] = []
+    deleted: List[int] = []
+    next_token: str
+    has_more: bool = False
+
+class RecipeBatchRequest(BaseModel):
+    """Идентификаторы рецептов для пакетной загрузки"""
+    ids: List[int]
+
+class RecipeBatchItem(BaseModel):
+    """Результат пакетной загрузки для одного id"""
+    id: int
+    status: Literal["ok", "not_found"]
+    recipe: Optional[RecipeFields] = None
+
+class RecipeBatch(BaseModel):
+    """Рецепты в порядке запрошенных id"""
+    results: List[RecipeBatchItem]
@@ -0,0 +1,125 @@
+"""
+Конфигурация административного интерфейса мониторинга.
+
+Этот модуль определяет отображение профилей запросов в админ-панели,
+выдачу токенов профилирования, скачивание файлов профилей и журнал
+медленных SQL-запросов.
+"""
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import ProfileRecord, SlowQuery
+from .profiling import PROFILE_HEADER, PROFILE_PARAM, make_profile_token
+
+
+class ProfileRecordAdmin(admin.ModelAdmin):
+    """
+    Настройки отображения модели ProfileRecord в админ-панели.
+    
+    Attributes:
+        list_display: Поля, отображаемые в списке профилей
+        list_filter: Поля для фильтрации профилей
+        list_select_related: Связанные модели, загружаемые вместе со списком
+    
+    Notes:
+        - На странице списка показывается свежий токен профилирования
+        - Каждый профиль можно скачать в формате folded stacks
+    """
+    list_display = ('created_at', 'app', 'method', 'path', 'duration_ms', 'samples', 'user', 'download_link')
+    list_filter = ('app', 'method')
+    list_select_related = ('user',)
+    readonly_fields = ('created_at', 'app', 'method', 'path', 'duration_ms', 'samples', 'file_name', 'user')
+
+    def has_add_permission(self, request):
+        """Профили создаются только профилировщиком."""
+        return False
+
+    def get_urls(self):
+        """Добавляет адрес для скачивания файла профиля."""
+        urls = [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='monitoring_profilerecord_download',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description='Файл')
+    def download_link(self, obj):
+        """Ссылка на скачивание файла профиля."""
+        url = reverse('admin:monitoring_profilerecord_download', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.file_name)
+
+    def download_view(self, request, pk):
+        """Отдает файл профиля в формате folded stacks."""
+        record = get_object_or_404(ProfileRecord, pk=pk)
+        if not self.has_view_permission(request, record):
+            raise Http404
+        if not record.file_path.exists():
+            raise Http404('Файл профиля удален')
+        return FileResponse(record.file_path.open('rb'), as_attachment=True, filename=record.file_name)
+
+    def changelist_view(self, request, extra_context=None):
+        """Показывает над списком токен для профилирования запросов."""
+        extra_context = {
+            **(extra_context or {}),
+            'profile_token': make_profile_token(request.user),
+            'profile_param': PROFILE_PARAM,
+            'profile_header': PROFILE_HEADER,
+            'profile_token_max_age': settings.PROFILE_TOKEN_MAX_AGE // 60,
+        }
+        return super().changelist_view(request, extra_context)
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    Настройки отображения модели SlowQuery в админ-панели.
+    
+    Attributes:
+        list_display: Поля, отображаемые в списке запросов
+        list_filter: Поля для фильтрации запросов
+        search_fields: Поля для поиска
+    
+    Notes:
+        - Записи создаются только журналом медленных запросов
+        - По умолчанию запросы упорядочены по суммарной длительности
+    """
+    list_display = ('endpoint', 'short_sql', 'count', 'avg_ms_display', 'max_ms', 'last_seen')
+    list_filter = ('endpoint',)
+    search_fields = ('sql', 'endpoint')
+    readonly_fields = ('fingerprint', 'endpoint', 'sql', 'params', 'explain_display', 'count',
+                       'total_ms', 'max_ms', 'first_seen', 'last_seen')
+    exclude = ('explain',)
+
+    def has_add_permission(self, request):
+        """Записи создаются только журналом медленных запросов."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Записи журнала не редактируются."""
+        return False
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        """Начало нормализованного SQL."""
+        return obj.sql if len(obj.sql) <= 120 else obj.sql[:120] + '…'
+
+    @admin.display(description='Среднее, мс', ordering='total_ms')
+    def avg_ms_display(self, obj):
+        """Средняя длительность медленного выполнения."""
+        return f'{obj.avg_ms:.1f}'
+
+    @admin.display(description='План выполнения')
+    def explain_display(self, obj):
+        """План EXPLAIN с сохранением переносов строк."""
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', obj.explain or '—')
+
+
+admin.site.register(ProfileRecord, ProfileRecordAdmin)
+admin.site.register(SlowQuery, SlowQueryAdmin)
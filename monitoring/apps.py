@@ -0,0 +1,32 @@
+"""
+Конфигурация приложения мониторинга.
+
+Приложение собирает метрики производительности сайта и API: задержки
+по маршрутам, число и время SQL-запросов, время отрисовки шаблонов
+и обращений к хранилищу изображений, журнал медленных SQL-запросов.
+"""
+
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    """
+    Класс конфигурации приложения мониторинга.
+    
+    Attributes:
+        default_auto_field (str): Тип поля для автоматически создаваемых
+                                 первичных ключей моделей.
+        name (str): Имя приложения, используемое Django для идентификации.
+        verbose_name (str): Человекочитаемое название приложения для админ-панели.
+    """
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+    verbose_name = 'Мониторинг'
+
+    def ready(self):
+        """
+        Подключает обертки SQL-запросов ко всем соединениям с БД.
+        """
+        from . import instrumentation, slowlog
+        instrumentation.install()
+        slowlog.install()
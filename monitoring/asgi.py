@@ -0,0 +1,160 @@
+"""
+ASGI-middleware мониторинга для приложения FastAPI.
+"""
+
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+
+from . import slowlog, tracing
+from .instrumentation import collect
+from .metrics import registry
+from .profiling import PROFILE_HEADER, PROFILE_PARAM, ProfiledCall, check_profile_token, save_profile
+
+PROFILE_HEADER_BYTES = PROFILE_HEADER.lower().encode()
+PROFILE_PARAM_BYTES = PROFILE_PARAM.encode()
+
+
+class MetricsASGIMiddleware:
+    """
+    Собирает метрики каждого HTTP-запроса к API.
+
+    Маршрут берется из шаблона пути FastAPI (например,
+    '/recipes/{recipe_id}'), который маршрутизатор записывает в scope.
+
+    Args:
+        app: Оборачиваемое ASGI-приложение
+        app_label: Значение метки app в метриках
+    """
+
+    def __init__(self, app, app_label='api'):
+        self.app = app
+        self.app_label = app_label
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        with collect() as stats:
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                duration = time.perf_counter() - start
+                route = getattr(scope.get('route'), 'path', None)
+                registry.observe_request(self.app_label, route, scope['method'],
+                                         status_code, duration, stats)
+                endpoint = f"{self.app_label} {scope['method']} {route}" if route is not None else None
+                slowlog.finish_request(stats, endpoint)
+
+
+class TracingASGIMiddleware:
+    """
+    Открывает корневой интервал трассы для отобранных HTTP-запросов к API.
+
+    Продолжает трассу из заголовка traceparent и добавляет к ответу
+    заголовок X-Trace-Id.
+
+    Args:
+        app: Оборачиваемое ASGI-приложение
+        app_label: Значение атрибута app в интервале
+    """
+
+    def __init__(self, app, app_label='api'):
+        self.app = app
+        self.app_label = app_label
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        traceparent = None
+        for name, value in scope['headers']:
+            if name == b'traceparent':
+                traceparent = value.decode('latin-1')
+                break
+        method = scope['method']
+        span = tracing.start_trace(f'{method} {scope["path"]}', traceparent, {
+            'app': self.app_label, 'http.method': method, 'http.target': scope['path'],
+        })
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                span.attributes['http.status_code'] = message['status']
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'x-trace-id', span.trace_id.encode()),
+                ]
+            await send(message)
+
+        with tracing.activate(span):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get('route'), 'path', None)
+                if route is not None:
+                    span.name = f'{method} {route}'
+                    span.attributes['http.route'] = route
+
+
+class ProfilingASGIMiddleware:
+    """
+    Выполняет запрос к API под профилировщиком по подписанному токену.
+
+    У API нет сессии Django, поэтому пользователя запроса определяет
+    authenticate (по токену доступа API): токен профилирования действует,
+    только если его выдали этому сотруднику.
+
+    Args:
+        app: Оборачиваемое ASGI-приложение
+        authenticate: Асинхронная функция scope -> User или None
+        app_label: Значение поля app в записи профиля
+    """
+
+    def __init__(self, app, authenticate, app_label='api'):
+        self.app = app
+        self.authenticate = authenticate
+        self.app_label = app_label
+
+    def _token(self, scope):
+        """Возвращает токен профилирования из заголовка или строки запроса."""
+        for name, value in scope['headers']:
+            if name == PROFILE_HEADER_BYTES:
+                return value.decode('latin-1')
+        query_string = scope.get('query_string', b'')
+        if PROFILE_PARAM_BYTES in query_string:
+            values = parse_qs(query_string.decode('latin-1')).get(PROFILE_PARAM)
+            if values:
+                return values[0]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = self._token(scope)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        user = await self.authenticate(scope)
+        if not check_profile_token(token, user):
+            await self.app(scope, receive, send)
+            return
+        with ProfiledCall() as profiled:
+            await self.app(scope, receive, send)
+        await sync_to_async(save_profile)(
+            profiled, self.app_label, scope['method'], scope['path'], user
+        )
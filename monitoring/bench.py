@@ -0,0 +1,580 @@
+"""
+Нагрузочный замер в одном процессе.
+
+Драйвер вызывает ASGI-приложение (по умолчанию
+recipe_site.asgi.application) напрямую, без сети: несколько
+конкурентных "клиентов" в одном цикле событий выполняют смешанный
+поток запросов к страницам сайта и API. По окончании считаются
+перцентили задержки p50/p95/p99 и пропускная способность — общие
+и по каждому сценарию, а также число потоков процесса во время замера
+(синхронные представления Django и обращения к ORM выполняются
+в потоках, асинхронные представления — в цикле событий).
+
+Результаты сохраняются в BENCH_RESULTS_DIR в JSON вместе с параметрами
+замера, чтобы прогоны можно было сравнивать между собой
+(см. команду bench).
+"""
+
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils import timezone
+
+# Доля запросов каждого сценария по умолчанию
+DEFAULT_MIX = {
+    'home': 20,
+    'home_filtered': 10,
+    'recipe_detail': 40,
+    'login_page': 5,
+    'api_recipes': 10,
+    'api_recipe': 10,
+    'api_categories': 5,
+    'api_update': 0,
+    'category_ajax': 0,
+}
+
+# Сколько идентификаторов рецептов и категорий выбирается для запросов
+SAMPLE_SIZE = 1000
+
+PERCENTILES = (50, 95, 99)
+
+# Период опроса числа потоков (секунды)
+THREAD_SAMPLE_INTERVAL = 0.005
+
+# Значение CSRF-cookie для POST-запросов к сайту
+CSRF_TOKEN = 'benchcsrftokenbenchcsrftoken0000'
+
+
+class BenchRequest:
+    """
+    Описание одного HTTP-запроса сценария.
+
+    Attributes:
+        method: HTTP-метод
+        path: Путь
+        query: Параметры строки запроса (словарь или список пар)
+        headers: Дополнительные заголовки (список пар байтовых строк)
+        body: Тело запроса
+    """
+
+    __slots__ = ('method', 'path', 'query', 'headers', 'body')
+
+    def __init__(self, method, path, query=None, headers=(), body=b''):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = list(headers)
+        self.body = body
+
+
+def _home(context, rng):
+    return BenchRequest('GET', '/')
+
+
+def _home_filtered(context, rng):
+    categories = rng.sample(context['category_ids'], min(2, len(context['category_ids'])))
+    return BenchRequest('GET', '/', [('categories', pk) for pk in categories])
+
+
+def _recipe_detail(context, rng):
+    return BenchRequest('GET', f"/recipe/{rng.choice(context['recipe_ids'])}/")
+
+
+def _login_page(context, rng):
+    return BenchRequest('GET', '/login/')
+
+
+def _api_recipes(context, rng):
+    skip = rng.randrange(max(1, len(context['recipe_ids']) - 20))
+    return BenchRequest('GET', '/api/recipes/', {'skip': skip, 'limit': 20})
+
+
+def _api_recipe(context, rng):
+    return BenchRequest('GET', f"/api/recipes/{rng.choice(context['recipe_ids'])}")
+
+
+def _api_categories(context, rng):
+    return BenchRequest('GET', '/api/categories/')
+
+
+def _api_update(context, rng):
+    body = json.dumps({'preparation_time': rng.randrange(10, 181, 5)}).encode()
+    return BenchRequest(
+        'PUT',
+        f"/api/recipes/{rng.choice(context['own_recipe_ids'])}",
+        headers=[
+            (b'authorization', f"Bearer {context['token']}".encode()),
+            (b'content-type', b'application/json'),
+        ],
+        body=body,
+    )
+
+
+def _category_ajax(context, rng):
+    # Существующие названия: замер не меняет справочник категорий
+    body = urlencode({'name': rng.choice(context['category_names'])}).encode()
+    return BenchRequest(
+        'POST',
+        '/category/add/',
+        headers=[
+            (b'cookie', f'csrftoken={CSRF_TOKEN}'.encode()),
+            (b'x-csrftoken', CSRF_TOKEN.encode()),
+            (b'content-type', b'application/x-www-form-urlencoded'),
+        ],
+        body=body,
+    )
+
+
+SCENARIOS = {
+    'home': _home,
+    'home_filtered': _home_filtered,
+    'recipe_detail': _recipe_detail,
+    'login_page': _login_page,
+    'api_recipes': _api_recipes,
+    'api_recipe': _api_recipe,
+    'api_categories': _api_categories,
+    'api_update': _api_update,
+    'category_ajax': _category_ajax,
+}
+
+
+def parse_mix(value):
+    """
+    Разбирает состав нагрузки из строки вида "home=20,recipe_detail=40".
+
+    Сценарии, не указанные в строке, получают вес 0.
+
+    Raises:
+        ValueError: Если сценарий неизвестен или вес некорректен
+    """
+    mix = dict.fromkeys(SCENARIOS, 0)
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        mix[name] = float(weight)
+        if mix[name] < 0:
+            raise ValueError(f'Вес сценария {name} не может быть отрицательным')
+    return mix
+
+
+def build_context():
+    """
+    Выбирает данные для запросов: рецепты, категории и токен API.
+
+    Вызывается синхронно до начала замера.
+
+    Returns:
+        dict: Контекст для функций сценариев
+    """
+    from api import auth
+    from recipes.models import Category, Recipe
+
+    recipe_ids = list(Recipe.objects.order_by('?').values_list('id', flat=True)[:SAMPLE_SIZE])
+    if not recipe_ids:
+        raise ValueError('Каталог пуст: сначала выполните generate_catalog')
+    context = {
+        'recipe_ids': recipe_ids,
+        'category_ids': list(Category.objects.values_list('id', flat=True)[:SAMPLE_SIZE]),
+        'category_names': list(Category.objects.values_list('name', flat=True)[:SAMPLE_SIZE]),
+        'catalog': {
+            'recipes': Recipe.objects.count(),
+            'categories': Category.objects.count(),
+        },
+    }
+    owner = Recipe.objects.select_related('author').filter(id__in=recipe_ids).first().author
+    context['own_recipe_ids'] = list(owner.recipe_set.values_list('id', flat=True)[:SAMPLE_SIZE])
+    context['token'] = auth.create_access_token({'sub': owner.username, 'uid': owner.pk})
+    return context
+
+
+async def asgi_request(app, request):
+    """
+    Выполняет запрос к ASGI-приложению без сети.
+
+    Returns:
+        tuple: (код ответа, размер тела ответа в байтах)
+    """
+    query_string = urlencode(request.query, doseq=True).encode() if request.query else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0', 'spec_version': '2.3'},
+        'http_version': '1.1',
+        'method': request.method,
+        'scheme': 'http',
+        'path': request.path,
+        'raw_path': request.path.encode(),
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(b'host', b'localhost'), *request.headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    body_sent = False
+    status = 0
+    size = 0
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': request.body, 'more_body': False}
+        # Клиент не отключается: ожидание отменит само приложение
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        nonlocal status, size
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            size += len(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, size
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Выполняет события lifespan startup/shutdown, если приложение их поддерживает.
+    """
+    incoming = asyncio.Queue()
+    outgoing = asyncio.Queue()
+    task = asyncio.create_task(app({'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}},
+                                   incoming.get, outgoing.put))
+    await incoming.put({'type': 'lifespan.startup'})
+    reply = asyncio.create_task(outgoing.get())
+    await asyncio.wait((task, reply), return_when=asyncio.FIRST_COMPLETED)
+    if not reply.done():
+        # Приложение не поддерживает lifespan
+        reply.cancel()
+        if not task.cancelled():
+            task.exception()
+        yield
+        return
+    if reply.result()['type'] == 'lifespan.startup.failed':
+        raise RuntimeError(f"Ошибка запуска приложения: {reply.result().get('message', '')}")
+    try:
+        yield
+    finally:
+        await incoming.put({'type': 'lifespan.shutdown'})
+        await outgoing.get()
+        await task
+
+
+async def _drive(app, mix, context, concurrency, duration, seed, samples):
+    """Выполняет смешанную нагрузку в течение duration секунд."""
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    deadline = time.perf_counter() + duration
+
+    async def client(number):
+        rng = random.Random(seed + number)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            request = SCENARIOS[name](context, rng)
+            start = time.perf_counter()
+            try:
+                status, _ = await asgi_request(app, request)
+            except Exception:
+                status = 0
+            if samples is not None:
+                samples.append((name, time.perf_counter() - start, status))
+
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+
+
+async def _sample_threads(counts):
+    """Опрашивает число потоков процесса, пока задача не будет отменена."""
+    while True:
+        counts.append(threading.active_count())
+        await asyncio.sleep(THREAD_SAMPLE_INTERVAL)
+
+
+def percentile(values, q):
+    """
+    Перцентиль по методу ближайшего ранга.
+
+    Args:
+        values: Отсортированный список значений
+        q: Перцентиль (0-100)
+    """
+    if not values:
+        return 0.0
+    rank = max(1, -(-q * len(values) // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(samples, wall_time):
+    """
+    Сводит замеры в показатели задержки и пропускной способности.
+
+    Args:
+        samples: Список (сценарий, задержка в секундах, код ответа)
+        wall_time: Длительность замера (секунды)
+
+    Returns:
+        dict: Показатели в миллисекундах и запросах в секунду
+    """
+    def stats(latencies, errors):
+        latencies = sorted(latencies)
+        result = {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput': len(latencies) / wall_time if wall_time else 0.0,
+            'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+        }
+        for q in PERCENTILES:
+            result[f'p{q}_ms'] = percentile(latencies, q) * 1000
+        return result
+
+    by_scenario = {}
+    for name, latency, status in samples:
+        item = by_scenario.setdefault(name, ([], [0]))
+        item[0].append(latency)
+        if not 200 <= status < 400:
+            item[1][0] += 1
+    return {
+        'total': stats([latency for _, latency, _ in samples],
+                       sum(errors[0] for _, errors in by_scenario.values())),
+        'scenarios': {name: stats(latencies, errors[0])
+                      for name, (latencies, errors) in sorted(by_scenario.items())},
+    }
+
+
+def _git_revision():
+    """Возвращает короткий хеш текущего коммита или None."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(app, mix=None, concurrency=8, duration=10.0, warmup=2.0, seed=0, label=''):
+    """
+    Выполняет нагрузочный замер.
+
+    Args:
+        app: ASGI-приложение
+        mix: Веса сценариев (по умолчанию DEFAULT_MIX)
+        concurrency: Число одновременных клиентов
+        duration: Длительность замера (секунды)
+        warmup: Длительность прогрева, не входящего в замер (секунды)
+        seed: Начальное значение генератора сценариев
+        label: Метка прогона
+
+    Returns:
+        dict: Параметры и результаты замера
+    """
+    mix = mix or DEFAULT_MIX
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError('Не выбран ни один сценарий')
+    context = build_context()
+    samples = []
+    thread_counts = []
+
+    async def main():
+        async with lifespan(app):
+            if warmup:
+                await _drive(app, mix, context, concurrency, warmup, seed, None)
+            sampler = asyncio.create_task(_sample_threads(thread_counts))
+            start = time.perf_counter()
+            try:
+                await _drive(app, mix, context, concurrency, duration, seed + concurrency, samples)
+            finally:
+                sampler.cancel()
+            return time.perf_counter() - start
+
+    wall_time = asyncio.run(main())
+    return {
+        'label': label,
+        'created': timezone.now().isoformat(),
+        'revision': _git_revision(),
+        'settings': settings.SETTINGS_MODULE,
+        'python': platform.python_version(),
+        'async_views': settings.ASYNC_VIEWS,
+        'concurrency': concurrency,
+        'duration': wall_time,
+        'warmup': warmup,
+        'mix': {name: weight for name, weight in mix.items() if weight > 0},
+        'catalog': context['catalog'],
+        'results': summarize(samples, wall_time),
+        'threads': {
+            'peak': max(thread_counts, default=0),
+            'mean': sum(thread_counts) / len(thread_counts) if thread_counts else 0.0,
+        },
+    }
+
+
+def mounted_application(django_app, api_app):
+    """
+    Собирает прежнюю схему приложения для сравнения с диспетчером.
+
+    Внешнее приложение FastAPI с CORS монтирует API на /api,
+    а Django — на / (так был устроен recipe_site/asgi.py до появления
+    PathPrefixDispatcher). Как и тогда, у API есть собственный слой CORS
+    внутри внешнего.
+    """
+    from fastapi import FastAPI
+    from starlette.middleware.cors import CORSMiddleware
+
+    cors = {
+        'allow_origins': ['*'],
+        'allow_credentials': True,
+        'allow_methods': ['*'],
+        'allow_headers': ['*'],
+    }
+    outer = FastAPI()
+    outer.add_middleware(CORSMiddleware, **cors)
+    outer.mount('/api', CORSMiddleware(api_app, **cors))
+    outer.mount('/', django_app)
+    return outer
+
+
+def measure_overhead(stacks, paths, requests=2000, warmup=200):
+    """
+    Измеряет задержку одних и тех же запросов через разные схемы приложения.
+
+    Запросы выполняются последовательно, чтобы разница во времени
+    отражала только собственные накладные расходы слоев.
+
+    Args:
+        stacks: Словарь {название схемы: ASGI-приложение}
+        paths: Пути запросов (GET)
+        requests: Число измеряемых запросов на каждый путь и схему
+        warmup: Число запросов прогрева
+
+    Returns:
+        dict: {путь: {схема: {'mean_us': ..., 'p50_us': ..., 'p99_us': ..., 'status': ...}}}
+    """
+    async def run(app, path):
+        request = BenchRequest('GET', path)
+        for _ in range(warmup):
+            await asgi_request(app, request)
+        latencies = []
+        status = 0
+        for _ in range(requests):
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, request)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        return {
+            'mean_us': sum(latencies) / len(latencies) * 1e6,
+            'p50_us': percentile(latencies, 50) * 1e6,
+            'p99_us': percentile(latencies, 99) * 1e6,
+            'status': status,
+        }
+
+    async def main():
+        results = {}
+        for path in paths:
+            # Схемы чередуются по путям, чтобы прогрев одной не искажал другую
+            results[path] = {name: await run(app, path) for name, app in stacks.items()}
+        return results
+
+    return asyncio.run(main())
+
+
+def format_overhead(results, baseline):
+    """
+    Формирует отчет measure_overhead с разницей относительно схемы baseline.
+    """
+    lines = [f"{'путь':<24}{'схема':<14}{'код':>5}{'среднее, мкс':>14}{'p50, мкс':>12}"
+             f"{'p99, мкс':>12}{'разница, мкс':>15}"]
+    for path, stacks in results.items():
+        base = stacks.get(baseline, {}).get('mean_us')
+        for name, stats in stacks.items():
+            delta = f"{stats['mean_us'] - base:+.1f}" if base is not None and name != baseline else ''
+            lines.append(
+                f"{path:<24}{name:<14}{stats['status']:>5}{stats['mean_us']:>14.1f}"
+                f"{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}{delta:>15}"
+            )
+    return '\n'.join(lines)
+
+
+def save_result(result):
+    """
+    Сохраняет результат замера в BENCH_RESULTS_DIR.
+
+    Returns:
+        Path: Путь к сохраненному файлу
+    """
+    directory = Path(settings.BENCH_RESULTS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = f"-{result['label']}" if result['label'] else ''
+    path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}{suffix}.json"
+    path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    return path
+
+
+def load_result(path):
+    """Загружает сохраненный результат замера."""
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def _change(new, old):
+    """Изменение показателя в процентах."""
+    if not old:
+        return ''
+    return f' ({(new - old) / old * 100:+.1f}%)'
+
+
+def format_report(result, baseline=None):
+    """
+    Формирует текстовый отчет о замере.
+
+    Args:
+        result: Результат run_benchmark
+        baseline: Результат предыдущего прогона для сравнения (или None)
+
+    Returns:
+        str: Таблица показателей по сценариям
+    """
+    lines = [
+        f"Прогон {result['label'] or '-'} ({result['revision'] or 'без git'}), "
+        f"клиентов: {result['concurrency']}, длительность: {result['duration']:.1f} с, "
+        f"рецептов: {result['catalog']['recipes']}, "
+        f"представления: {'async' if result.get('async_views') else 'sync'}",
+    ]
+    if baseline:
+        lines.append(f"Сравнение с {baseline['label'] or '-'} от {baseline['created']} "
+                     f"({'async' if baseline.get('async_views') else 'sync'})")
+    if 'threads' in result:
+        old = (baseline or {}).get('threads', {})
+        threads = result['threads']
+        lines.append(
+            f"потоков: пик {threads['peak']}{_change(threads['peak'], old.get('peak'))}, "
+            f"в среднем {threads['mean']:.1f}{_change(threads['mean'], old.get('mean'))}"
+        )
+    lines.append(f"{'сценарий':<16}{'запросов':>10}{'ошибок':>8}{'rps':>16}"
+                 f"{'p50, мс':>18}{'p95, мс':>18}{'p99, мс':>18}")
+    rows = [('ИТОГО', result['results']['total'],
+             baseline['results']['total'] if baseline else None)]
+    for name, stats in result['results']['scenarios'].items():
+        old = baseline['results']['scenarios'].get(name) if baseline else None
+        rows.append((name, stats, old))
+    for name, stats, old in rows:
+        old = old or {}
+        lines.append(
+            f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}"
+            f"{stats['throughput']:>8.1f}{_change(stats['throughput'], old.get('throughput')):>8}"
+            + ''.join(
+                f"{stats[f'p{q}_ms']:>9.1f}{_change(stats[f'p{q}_ms'], old.get(f'p{q}_ms')):>9}"
+                for q in PERCENTILES
+            )
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,137 @@
+"""
+Проверки живости и готовности воркера для балансировщика нагрузки.
+
+/healthz отвечает 200, пока процесс обслуживает запросы (liveness).
+/readyz отвечает 200 только после прогрева воркера (readiness), до этого
+и при ошибке прогрева — 503. Прогрев запускается при событии lifespan
+startup, а если сервер его не присылает — при первом запросе. Ошибка
+прогрева повторяется через WARMUP_RETRY_INTERVAL секунд.
+
+Проверки обрабатываются на уровне ASGI до Django и FastAPI: они не
+проходят через middleware, не проверяют ALLOWED_HOSTS и не попадают
+в метрики запросов.
+"""
+
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = '/healthz'
+READY_PATH = '/readyz'
+
+
+class Readiness:
+    """
+    Состояние готовности воркера.
+
+    Attributes:
+        state: 'starting', 'warming', 'ready' или 'failed'
+        report: Результат функции прогрева
+        error: Текст последней ошибки прогрева
+
+    Args:
+        warmup: Синхронная функция прогрева (выполняется в потоке
+            синхронных представлений)
+    """
+
+    def __init__(self, warmup):
+        self.warmup = warmup
+        self.state = 'starting'
+        self.report = None
+        self.error = None
+        self._task = None
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def start(self):
+        """Запускает прогрев в фоне (повторные вызовы ничего не делают)."""
+        if self._task is not None:
+            return
+        if not settings.WARMUP_ENABLED:
+            self.state = 'ready'
+            self._task = False
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self.state = 'warming'
+            try:
+                self.report = await sync_to_async(self.warmup)()
+            except Exception as e:
+                logger.exception('Ошибка прогрева воркера')
+                self.state = 'failed'
+                self.error = f'{type(e).__name__}: {e}'
+                await asyncio.sleep(settings.WARMUP_RETRY_INTERVAL)
+            else:
+                self.state = 'ready'
+                self.error = None
+                return
+
+    def as_dict(self):
+        """Состояние для ответа /readyz."""
+        data = {'status': self.state}
+        if self.report is not None:
+            data['warmup'] = self.report
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class HealthASGIMiddleware:
+    """
+    Отвечает на /healthz и /readyz и запускает прогрев воркера.
+
+    Должен быть внешним слоем приложения.
+
+    Args:
+        app: Оборачиваемое ASGI-приложение
+        warmup: Синхронная функция прогрева
+    """
+
+    def __init__(self, app, warmup):
+        self.app = app
+        self.readiness = Readiness(warmup)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            async def receive_wrapper():
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    self.readiness.start()
+                return message
+
+            await self.app(scope, receive_wrapper, send)
+            return
+
+        self.readiness.start()
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            if scope['path'] == HEALTH_PATH:
+                await self._respond(send, 200, {'status': 'ok'})
+                return
+            if scope['path'] == READY_PATH:
+                status = 200 if self.readiness.ready else 503
+                await self._respond(send, status, self.readiness.as_dict())
+                return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _respond(send, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'cache-control', b'no-store'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,183 @@
+"""
+Сбор статистики выполнения запроса.
+
+Статистика текущего HTTP-запроса хранится в contextvars, поэтому она
+доступна и в асинхронном коде, и в синхронном коде, запущенном через
+sync_to_async. Счетчики пополняются:
+- оберткой выполнения SQL, подключаемой ко всем соединениям с БД
+- шаблонным бэкендом InstrumentedDjangoTemplates (см. templates.py)
+- функциями работы с хранилищем изображений (см. recipes/storage.py)
+
+Те же точки открывают интервалы трассировки (см. tracing.py), если запрос
+отобран для трассировки.
+
+Вне HTTP-запроса (команды управления, миграции) статистика не собирается
+и обертки сводятся к проверке contextvar.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+
+from . import tracing
+
+# Максимальная длина SQL в атрибутах интервала
+MAX_STATEMENT_LENGTH = 2000
+
+
+class RequestStats:
+    """
+    Счетчики одного HTTP-запроса.
+
+    Attributes:
+        db_queries: Число выполненных SQL-запросов
+        db_time: Суммарное время SQL-запросов (секунды)
+        template_time: Время отрисовки шаблонов (секунды)
+        storage_calls: Число обращений к хранилищу изображений
+        storage_time: Время обращений к хранилищу (секунды)
+        slow_queries: Медленные запросы, ожидающие записи в журнал (см. slowlog.py)
+    """
+
+    __slots__ = ('db_queries', 'db_time', 'template_time', 'storage_calls', 'storage_time',
+                 'slow_queries')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.storage_calls = 0
+        self.storage_time = 0.0
+        self.slow_queries = []
+
+    def merge(self, other):
+        """Добавляет к счетчикам счетчики другой статистики."""
+        self.db_queries += other.db_queries
+        self.db_time += other.db_time
+        self.template_time += other.template_time
+        self.storage_calls += other.storage_calls
+        self.storage_time += other.storage_time
+
+
+_current_stats = ContextVar('monitoring_request_stats', default=None)
+
+
+def current_stats():
+    """Возвращает статистику текущего запроса или None вне запроса."""
+    return _current_stats.get()
+
+
+@contextmanager
+def collect():
+    """
+    Включает сбор статистики для кода внутри блока with.
+
+    Вложенный блок собирает собственную статистику и по выходе добавляет
+    её счетчики к внешней, поэтому внешний блок (например, в тестах)
+    видит всё, что было выполнено внутри, включая код в других потоках,
+    запущенный через sync_to_async.
+
+    Yields:
+        RequestStats: Счетчики, заполняемые во время выполнения блока
+    """
+    parent = _current_stats.get()
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if parent is not None:
+            parent.merge(stats)
+
+
+@contextmanager
+def timed_template(name=None):
+    """
+    Учитывает время блока как время отрисовки шаблона.
+
+    Args:
+        name: Имя шаблона для интервала трассировки
+    """
+    stats = _current_stats.get()
+    with tracing.span('template.render', template=name):
+        if stats is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+@contextmanager
+def timed_storage(operation=None):
+    """
+    Учитывает время блока как обращение к хранилищу изображений.
+
+    Args:
+        operation: Название операции для интервала трассировки
+    """
+    stats = _current_stats.get()
+    with tracing.span('storage', operation=operation):
+        if stats is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.storage_calls += 1
+            stats.storage_time += time.perf_counter() - start
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL (см. connection.execute_wrapper).
+
+    Учитывает число и время запросов в статистике текущего HTTP-запроса
+    и записывает каждый запрос интервалом трассы. Параметры запроса
+    в трассу не попадают.
+    """
+    stats = _current_stats.get()
+    parent = tracing.current_span()
+    if stats is None and parent is None:
+        return execute(sql, params, many, context)
+    span = None
+    if parent is not None:
+        span = parent.child('db.query', {
+            'db.alias': context['connection'].alias,
+            'db.statement': sql[:MAX_STATEMENT_LENGTH],
+        })
+    error = None
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += time.perf_counter() - start
+        if span is not None:
+            span.end(error=error)
+
+
+def _attach_wrapper(sender, connection, **kwargs):
+    """Подключает обертку SQL к новому соединению, если её там еще нет."""
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+def install():
+    """
+    Подключает обертку SQL ко всем текущим и будущим соединениям с БД.
+    """
+    from django.db import connections
+
+    connection_created.connect(_attach_wrapper, dispatch_uid='monitoring.db_execute_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _attach_wrapper(None, connection)
@@ -0,0 +1,66 @@
+"""
+Команда нагрузочного замера ASGI-приложения в одном процессе.
+
+Использование:
+    python manage.py bench --settings=recipe_site.settings_bench --label baseline
+    python manage.py bench --settings=recipe_site.settings_bench --compare bench_results/<файл>.json
+
+Сравнение синхронных и асинхронных представлений (настройка ASYNC_VIEWS):
+    ASYNC_VIEWS=False python manage.py bench --settings=recipe_site.settings_bench --label sync
+    ASYNC_VIEWS=True python manage.py bench --settings=recipe_site.settings_bench --label async \
+        --compare bench_results/<файл>-sync.json
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from monitoring import bench
+
+
+class Command(BaseCommand):
+    """
+    Выполняет смешанную нагрузку и выводит перцентили задержки и пропускную способность.
+    """
+    help = 'Нагрузочный замер сайта и API внутри процесса (см. monitoring/bench.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', default='recipe_site.asgi.application',
+                            help='ASGI-приложение в виде пути для импорта')
+        parser.add_argument('--duration', type=float, default=10.0, help='Длительность замера (секунды)')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Длительность прогрева (секунды)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Число одновременных клиентов')
+        parser.add_argument('--mix', default=None,
+                            help=f'Веса сценариев, например "home=20,recipe_detail=40"; '
+                                 f'доступны: {", ".join(bench.SCENARIOS)}')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора сценариев')
+        parser.add_argument('--label', default='', help='Метка прогона (попадает в имя файла)')
+        parser.add_argument('--compare', default=None, help='Файл предыдущего прогона для сравнения')
+        parser.add_argument('--no-save', action='store_true', help='Не сохранять результат')
+
+    def handle(self, *args, **options):
+        try:
+            mix = bench.parse_mix(options['mix']) if options['mix'] else None
+            baseline = bench.load_result(options['compare']) if options['compare'] else None
+        except (ValueError, OSError) as e:
+            raise CommandError(e)
+        if options['concurrency'] < 1:
+            raise CommandError('Число клиентов должно быть больше нуля')
+
+        app = import_string(options['app'])
+        try:
+            result = bench.run_benchmark(
+                app,
+                mix=mix,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                label=options['label'],
+            )
+        except ValueError as e:
+            raise CommandError(e)
+
+        self.stdout.write(bench.format_report(result, baseline))
+        if not options['no_save']:
+            path = bench.save_result(result)
+            self.stdout.write(self.style.SUCCESS(f'Результат сохранен: {path}'))
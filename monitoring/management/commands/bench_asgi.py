@@ -0,0 +1,57 @@
+"""
+Команда замера накладных расходов ASGI-обвязки на один запрос.
+
+Сравнивает обращение напрямую к Django и FastAPI, через диспетчер
+recipe_site.asgi.application и через прежнюю схему с внешним
+приложением FastAPI и Mount.
+
+Использование:
+    python manage.py bench_asgi --settings=recipe_site.settings_bench --requests 5000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import bench
+
+DEFAULT_PATHS = ('/login/', '/api/', '/api/categories/')
+
+
+class Command(BaseCommand):
+    """
+    Выводит задержку одних и тех же запросов для каждой схемы приложения.
+    """
+    help = 'Накладные расходы диспетчера ASGI в сравнении с прежней схемой'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Число запросов на путь и схему')
+        parser.add_argument('--warmup', type=int, default=200, help='Число запросов прогрева')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Путь запроса (можно несколько раз); по умолчанию {", ".join(DEFAULT_PATHS)}')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('Число запросов должно быть больше нуля')
+        from recipe_site.asgi import application, django_app, fastapi_app
+
+        paths = options['paths'] or DEFAULT_PATHS
+        stacks = {
+            'direct': None,
+            'dispatcher': application,
+            'mount': bench.mounted_application(django_app, fastapi_app),
+        }
+        results = {}
+        for path in paths:
+            # Напрямую: приложение, которому запрос в итоге достается
+            if path.startswith('/api/'):
+                stacks['direct'] = _rooted(fastapi_app, '/api')
+            else:
+                stacks['direct'] = django_app
+            results.update(bench.measure_overhead(stacks, [path], options['requests'], options['warmup']))
+        self.stdout.write(bench.format_overhead(results, 'direct'))
+
+
+def _rooted(app, root_path):
+    """Оборачивает приложение, задавая root_path так же, как диспетчер."""
+    async def wrapper(scope, receive, send):
+        await app({**scope, 'root_path': root_path}, receive, send)
+    return wrapper
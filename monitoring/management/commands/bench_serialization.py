@@ -0,0 +1,83 @@
+"""
+Команда замера скорости сериализации списка рецептов в API.
+
+Сравнивает прежний путь ответа (ORM, model_validate, повторная проверка
+response_model и кодирование JSON) со сборкой из кэшированных
+фрагментов (api/fragments.py) при холодном и теплом кэше.
+
+Использование:
+    python manage.py bench_serialization --settings=recipe_site.settings_bench --limit 100
+"""
+
+import json
+import time
+from typing import List
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from api import fieldsets, fragments, schemas
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Выводит пропускную способность каждого способа сериализации страницы.
+    """
+    help = 'Скорость сериализации рецептов: схемы pydantic и кэш фрагментов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Рецептов на странице')
+        parser.add_argument('--iterations', type=int, default=50, help='Число повторов каждого способа')
+        parser.add_argument('--fields', default=None, help='Набор полей (по умолчанию full)')
+
+    def handle(self, *args, **options):
+        limit, iterations = options['limit'], options['iterations']
+        if limit < 1 or iterations < 1:
+            raise CommandError('Размер страницы и число повторов должны быть больше нуля')
+        fields = fieldsets.parse_fields(options['fields'])
+        page = Recipe.objects.all()[:limit]
+        adapter = TypeAdapter(List[schemas.RecipeFields])
+
+        def pydantic_path():
+            recipes = fieldsets.apply(page, fields)
+            data = [schemas.RecipeFields.model_validate(fieldsets.serialize(r, fields)) for r in recipes]
+            # Как FastAPI: проверка по response_model и кодирование ответа
+            content = jsonable_encoder(adapter.validate_python(data), exclude_unset=True)
+            return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode()
+
+        def fragments_cold():
+            caches['fragments'].clear()
+            return fragments.render_list(page, fields)
+
+        def fragments_warm():
+            return fragments.render_list(page, fields)
+
+        variants = {
+            'pydantic': pydantic_path,
+            'fragments_cold': fragments_cold,
+            'fragments_warm': fragments_warm,
+        }
+        count = len(json.loads(pydantic_path()))
+        if not count:
+            raise CommandError('В базе нет рецептов (см. команду generate_catalog)')
+
+        results = {}
+        for name, perform in variants.items():
+            perform()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                perform()
+            elapsed = (time.perf_counter() - start) / iterations
+            results[name] = elapsed
+
+        baseline = results['pydantic']
+        self.stdout.write(f"Рецептов на странице: {count}, поля: {','.join(fields)}, "
+                          f"кодировщик: {'orjson' if fragments.orjson else 'json'}")
+        self.stdout.write(f"{'способ':<18}{'мс/страница':>14}{'рецептов/с':>14}{'ускорение':>12}")
+        for name, elapsed in results.items():
+            self.stdout.write(
+                f"{name:<18}{elapsed * 1000:>14.2f}{count / elapsed:>14.0f}{baseline / elapsed:>11.1f}x"
+            )
@@ -0,0 +1,32 @@
+"""
+Команда профилирования холодного запуска.
+
+Использование:
+    python manage.py startup_profile
+    python manage.py startup_profile --target api.main --top 40
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import startup
+
+
+class Command(BaseCommand):
+    """
+    Выводит время импорта точки входа с разбивкой по пакетам и модулям.
+    """
+    help = 'Профиль времени импорта при холодном запуске (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='recipe_site.asgi', help='Импортируемый модуль')
+        parser.add_argument('--top', type=int, default=25, help='Сколько пакетов и модулей показать')
+        parser.add_argument('--budget', type=float, default=None, help='Бюджет времени импорта (секунды)')
+
+    def handle(self, *args, **options):
+        try:
+            profile = startup.profile_startup(options['target'])
+        except RuntimeError as e:
+            raise CommandError(e)
+        self.stdout.write(startup.format_report(profile, options['top'], options['budget']))
+        if options['budget'] is not None and profile['import'] > options['budget']:
+            raise CommandError('Бюджет холодного запуска превышен')
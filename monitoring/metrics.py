@@ -0,0 +1,201 @@
+"""
+Реестр метрик в формате Prometheus.
+
+Метрики хранятся в памяти процесса и отдаются представлением /metrics
+в текстовом формате Prometheus (версия 0.0.4). Набор меток ограничен:
+маршрут берется из шаблона URL (а не из фактического пути), метод
+приводится к известному списку, а число рядов ограничено MAX_SERIES —
+всё, что не помещается, учитывается под маршрутом "<other>".
+"""
+
+import bisect
+import threading
+
+# Границы корзин гистограммы задержек (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Максимальное число рядов (комбинаций меток) на метрику
+MAX_SERIES = 500
+
+OTHER_ROUTE = '<other>'
+UNMATCHED_ROUTE = '<unmatched>'
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами.
+
+    Attributes:
+        buckets: Счетчики по корзинам (некумулятивные, последняя — +Inf)
+        total: Сумма наблюдений
+        count: Число наблюдений
+    """
+
+    __slots__ = ('buckets', 'total', 'count')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Добавляет наблюдение."""
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RouteMetrics:
+    """
+    Метрики одного маршрута.
+
+    Attributes:
+        latency: Гистограмма длительности запросов
+        db_queries: Суммарное число SQL-запросов
+        db_time: Суммарное время SQL-запросов
+        template_time: Суммарное время отрисовки шаблонов
+        storage_calls: Суммарное число обращений к хранилищу
+        storage_time: Суммарное время обращений к хранилищу
+    """
+
+    __slots__ = ('latency', 'db_queries', 'db_time', 'template_time',
+                 'storage_calls', 'storage_time')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.storage_calls = 0
+        self.storage_time = 0.0
+
+
+class Registry:
+    """
+    Потокобезопасный реестр метрик процесса.
+    """
+
+    def __init__(self, max_series=MAX_SERIES):
+        self.max_series = max_series
+        self._routes = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, app, route, method, status, duration, stats):
+        """
+        Учитывает завершенный HTTP-запрос.
+
+        Args:
+            app: Приложение ('site' или 'api')
+            route: Шаблон маршрута или None, если маршрут не найден
+            method: HTTP-метод
+            status: Код ответа
+            duration: Длительность запроса (секунды)
+            stats: RequestStats с счетчиками запроса
+        """
+        method = method if method in KNOWN_METHODS else 'OTHER'
+        key = (app, route or UNMATCHED_ROUTE, method, f'{status // 100}xx')
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                if len(self._routes) >= self.max_series:
+                    key = (app, OTHER_ROUTE, method, key[3])
+                    metrics = self._routes.get(key)
+                if metrics is None:
+                    metrics = self._routes[key] = RouteMetrics()
+            metrics.latency.observe(duration)
+            metrics.db_queries += stats.db_queries
+            metrics.db_time += stats.db_time
+            metrics.template_time += stats.template_time
+            metrics.storage_calls += stats.storage_calls
+            metrics.storage_time += stats.storage_time
+
+    def cache_access(self, name, hit, count=1):
+        """
+        Учитывает обращение к внутреннему кэшу.
+
+        Args:
+            name: Имя кэша (фиксированная строка из кода)
+            hit: True при попадании, False при промахе
+            count: Число обращений (для пакетного чтения)
+        """
+        with self._lock:
+            counts = self._cache.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += count
+
+    def render(self):
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст для ответа /metrics
+        """
+        with self._lock:
+            routes = [(key, _copy_route(metrics)) for key, metrics in self._routes.items()]
+            caches = {name: tuple(counts) for name, counts in self._cache.items()}
+
+        lines = [
+            '# HELP recipe_request_duration_seconds Длительность обработки HTTP-запроса',
+            '# TYPE recipe_request_duration_seconds histogram',
+        ]
+        for key, metrics in routes:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.latency.buckets):
+                cumulative += count
+                lines.append(f'recipe_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'recipe_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.latency.count}')
+            lines.append(f'recipe_request_duration_seconds_sum{{{labels}}} {metrics.latency.total}')
+            lines.append(f'recipe_request_duration_seconds_count{{{labels}}} {metrics.latency.count}')
+
+        counters = (
+            ('recipe_db_queries_total', 'Число SQL-запросов', 'db_queries'),
+            ('recipe_db_query_seconds_total', 'Время выполнения SQL-запросов', 'db_time'),
+            ('recipe_template_render_seconds_total', 'Время отрисовки шаблонов', 'template_time'),
+            ('recipe_storage_calls_total', 'Число обращений к хранилищу изображений', 'storage_calls'),
+            ('recipe_storage_seconds_total', 'Время обращений к хранилищу изображений', 'storage_time'),
+        )
+        for name, help_text, attribute in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, metrics in routes:
+                lines.append(f'{name}{{{_labels(key)}}} {getattr(metrics, attribute)}')
+
+        lines.append('# HELP recipe_cache_requests_total Обращения к внутренним кэшам')
+        lines.append('# TYPE recipe_cache_requests_total counter')
+        for name, (hits, misses) in sorted(caches.items()):
+            lines.append(f'recipe_cache_requests_total{{cache="{name}",result="hit"}} {hits}')
+            lines.append(f'recipe_cache_requests_total{{cache="{name}",result="miss"}} {misses}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Сбрасывает все метрики."""
+        with self._lock:
+            self._routes.clear()
+            self._cache.clear()
+
+
+def _copy_route(metrics):
+    """Копирует метрики маршрута для вывода вне блокировки."""
+    copy = RouteMetrics()
+    copy.latency.buckets = list(metrics.latency.buckets)
+    copy.latency.total = metrics.latency.total
+    copy.latency.count = metrics.latency.count
+    for attribute in ('db_queries', 'db_time', 'template_time', 'storage_calls', 'storage_time'):
+        setattr(copy, attribute, getattr(metrics, attribute))
+    return copy
+
+
+def _escape(value):
+    """Экранирует значение метки по правилам формата Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key):
+    """Формирует строку меток для ряда."""
+    app, route, method, status = key
+    return f'app="{app}",route="{_escape(route)}",method="{method}",status="{status}"'
+
+
+registry = Registry()
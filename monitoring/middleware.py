@@ -0,0 +1,189 @@
+"""
+Промежуточные слои (middleware) мониторинга для Django.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from . import slowlog, tracing
+from .instrumentation import collect
+from .metrics import registry
+from .profiling import PROFILE_HEADER, PROFILE_PARAM, ProfiledCall, check_profile_token, save_profile
+
+TRACE_ID_HEADER = 'X-Trace-Id'
+
+
+def route_name(request):
+    """
+    Возвращает шаблон маршрута запроса для меток метрик.
+
+    Используется шаблон URL (например, 'recipe/<int:recipe_id>/'),
+    а не фактический путь, чтобы число рядов метрик было ограничено.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return '/' + match.route
+
+
+def endpoint_name(request):
+    """
+    Возвращает имя представления запроса для журнала медленных запросов.
+
+    Используется имя маршрута (например, 'recipe_detail' или
+    'admin:recipes_recipe_changelist'), а если его нет — шаблон URL.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or '/' + match.route
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики каждого запроса к Django.
+    
+    Учитывает длительность, число и время SQL-запросов, время отрисовки
+    шаблонов и обращений к хранилищу, а также передает в журнал медленные
+    запросы с именем представления. Работает как в синхронном, так и
+    в асинхронном режиме, не добавляя переходов между потоками.
+    Должен стоять первым в MIDDLEWARE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect() as stats:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            duration = time.perf_counter() - start
+        registry.observe_request('site', route_name(request), request.method,
+                                 response.status_code, duration, stats)
+        slowlog.finish_request(stats, endpoint_name(request))
+        return response
+
+    async def __acall__(self, request):
+        with collect() as stats:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            duration = time.perf_counter() - start
+        registry.observe_request('site', route_name(request), request.method,
+                                 response.status_code, duration, stats)
+        slowlog.finish_request(stats, endpoint_name(request))
+        return response
+
+
+class TracingMiddleware:
+    """
+    Открывает корневой интервал трассы для отобранных запросов к Django.
+
+    Продолжает трассу из заголовка traceparent, если он есть, и возвращает
+    идентификатор трассы в заголовке X-Trace-Id. Имя интервала уточняется
+    шаблоном маршрута после того, как запрос обработан. Должен стоять
+    сразу после MetricsMiddleware, чтобы в трассу попало всё остальное.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        return tracing.start_trace(
+            f'{request.method} {request.path}',
+            request.headers.get('traceparent'),
+            {'app': 'site', 'http.method': request.method, 'http.target': request.path},
+        )
+
+    def _finish(self, span, request, response):
+        route = route_name(request)
+        if route is not None:
+            span.name = f'{request.method} {route}'
+            span.attributes['http.route'] = route
+        span.attributes['http.status_code'] = response.status_code
+        response[TRACE_ID_HEADER] = span.trace_id
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        span = self._start(request)
+        if span is None:
+            return self.get_response(request)
+        with tracing.activate(span):
+            response = self.get_response(request)
+            self._finish(span, request, response)
+        return response
+
+    async def __acall__(self, request):
+        span = self._start(request)
+        if span is None:
+            return await self.get_response(request)
+        with tracing.activate(span):
+            response = await self.get_response(request)
+            self._finish(span, request, response)
+        return response
+
+
+def profile_token(request):
+    """
+    Возвращает токен профилирования из запроса или None.
+    
+    Строка запроса разбирается только если в ней есть имя параметра,
+    чтобы обычные запросы не платили за разбор.
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if token is None and PROFILE_PARAM in request.META.get('QUERY_STRING', ''):
+        token = request.GET.get(PROFILE_PARAM)
+    return token
+
+
+class ProfilingMiddleware:
+    """
+    Выполняет запрос под профилировщиком по требованию сотрудника.
+    
+    Профилирование включается, если запрос содержит действительный токен
+    (см. monitoring.profiling), выданный пользователю этой сессии.
+    Должен стоять после AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = profile_token(request)
+        if token is None or not check_profile_token(token, request.user):
+            return self.get_response(request)
+        with ProfiledCall() as profiled:
+            response = self.get_response(request)
+        record = save_profile(profiled, 'site', request.method, request.path, request.user)
+        response['X-Profile-Id'] = str(record.pk)
+        return response
+
+    async def __acall__(self, request):
+        token = profile_token(request)
+        if token is None:
+            return await self.get_response(request)
+        user = await request.auser()
+        if not check_profile_token(token, user):
+            return await self.get_response(request)
+        with ProfiledCall() as profiled:
+            response = await self.get_response(request)
+        record = await sync_to_async(save_profile)(profiled, 'site', request.method, request.path, user)
+        response['X-Profile-Id'] = str(record.pk)
+        return response
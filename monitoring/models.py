@@ -0,0 +1,112 @@
+"""
+Модели приложения мониторинга.
+
+Модели:
+    - ProfileRecord: Профиль отдельного запроса, снятый по требованию
+    - SlowQuery: Медленный SQL-запрос, агрегированный по отпечатку и представлению
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+
+class ProfileRecord(models.Model):
+    """
+    Запись о профиле запроса.
+    
+    Атрибуты:
+        created_at (DateTimeField): Дата и время снятия профиля
+        app (CharField): Приложение ('site' или 'api')
+        method (CharField): HTTP-метод запроса
+        path (CharField): Путь запроса
+        duration_ms (FloatField): Длительность запроса в миллисекундах
+        samples (PositiveIntegerField): Число снятых семплов
+        file_name (CharField): Имя файла профиля в PROFILE_DIR
+        user (ForeignKey): Сотрудник, запросивший профилирование
+    """
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата")
+    app = models.CharField(max_length=10, verbose_name="Приложение")
+    method = models.CharField(max_length=10, verbose_name="Метод")
+    path = models.CharField(max_length=500, verbose_name="Путь")
+    duration_ms = models.FloatField(verbose_name="Длительность, мс")
+    samples = models.PositiveIntegerField(verbose_name="Семплов")
+    file_name = models.CharField(max_length=100, verbose_name="Файл")
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name="Пользователь"
+    )
+
+    def __str__(self):
+        """Возвращает строковое представление профиля."""
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} мс)"
+
+    @property
+    def file_path(self):
+        """Полный путь к файлу профиля."""
+        return Path(settings.PROFILE_DIR) / self.file_name
+
+    class Meta:
+        verbose_name = "Профиль запроса"
+        verbose_name_plural = "Профили запросов"
+        ordering = ['-created_at']
+
+
+class SlowQuery(models.Model):
+    """
+    Медленный SQL-запрос из журнала (см. monitoring/slowlog.py).
+    
+    Атрибуты:
+        fingerprint (CharField): Отпечаток нормализованного SQL
+        endpoint (CharField): Представление или маршрут API ('-' вне запроса)
+        sql (TextField): Нормализованный SQL
+        params (TextField): Параметры последнего запроса без значений (JSON)
+        explain (TextField): План выполнения EXPLAIN
+        count (PositiveIntegerField): Число медленных выполнений
+        total_ms (FloatField): Суммарная длительность в миллисекундах
+        max_ms (FloatField): Наибольшая длительность в миллисекундах
+        first_seen (DateTimeField): Первое появление
+        last_seen (DateTimeField): Последнее появление
+    """
+    fingerprint = models.CharField(max_length=40, verbose_name="Отпечаток")
+    endpoint = models.CharField(max_length=200, verbose_name="Представление")
+    sql = models.TextField(verbose_name="SQL")
+    params = models.TextField(blank=True, verbose_name="Параметры")
+    explain = models.TextField(blank=True, verbose_name="План выполнения")
+    count = models.PositiveIntegerField(default=0, verbose_name="Количество")
+    total_ms = models.FloatField(default=0, verbose_name="Всего, мс")
+    max_ms = models.FloatField(default=0, verbose_name="Максимум, мс")
+    first_seen = models.DateTimeField(verbose_name="Впервые")
+    last_seen = models.DateTimeField(verbose_name="Последний раз")
+
+    def __str__(self):
+        """Возвращает строковое представление запроса."""
+        return f"{self.endpoint}: {self.sql[:80]}"
+
+    @property
+    def avg_ms(self):
+        """Средняя длительность медленного выполнения в миллисекундах."""
+        return self.total_ms / self.count if self.count else 0
+
+    class Meta:
+        verbose_name = "Медленный запрос"
+        verbose_name_plural = "Медленные запросы"
+        ordering = ['-total_ms']
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint', 'endpoint'], name='monitoring_slowquery_unique'),
+        ]
+
+
+@receiver(post_delete, sender=ProfileRecord)
+def delete_profile_file(sender, instance, **kwargs):
+    """
+    Сигнал для удаления файла профиля вместе с записью
+    """
+    instance.file_path.unlink(missing_ok=True)
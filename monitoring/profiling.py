@@ -0,0 +1,182 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Сотрудник (is_staff) получает в админке подписанный токен профилирования
+и добавляет его к запросу параметром ?_profile=<токен> или заголовком
+X-Profile-Token. Такой запрос выполняется под семплирующим профилировщиком,
+а результат сохраняется в PROFILE_DIR в формате "folded stacks",
+который понимают flamegraph.pl, speedscope и inferno.
+
+Токен привязан к выдавшему его сотруднику: он действует только в запросах
+этого пользователя (сессия сайта или токен доступа API), поэтому
+утекший токен профилирования без учетных данных бесполезен.
+
+Без токена проверка сводится к поиску подстроки в строке запроса
+и заголовках, поэтому обычные запросы профилирование не замедляет.
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'monitoring.profiling'
+
+# Файлы, в которых ожидают простаивающие потоки; такие стеки не учитываются
+IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'thread.py')
+
+
+def make_profile_token(user):
+    """
+    Создает подписанный токен профилирования для сотрудника.
+
+    Args:
+        user: Сотрудник, запросивший токен
+
+    Returns:
+        str: Токен, действительный PROFILE_TOKEN_MAX_AGE секунд
+    """
+    return signing.dumps(user.pk, salt=TOKEN_SALT, compress=True)
+
+
+def check_profile_token(token, user):
+    """
+    Проверяет подпись, срок действия и владельца токена профилирования.
+
+    Args:
+        token: Токен из запроса
+        user: Пользователь запроса
+
+    Returns:
+        bool: True, если токен действителен и выдан этому сотруднику
+    """
+    if user is None or not user.is_staff:
+        return False
+    try:
+        user_id = signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return user_id == user.pk
+
+
+class StackSampler:
+    """
+    Семплирующий профилировщик на основе sys._current_frames().
+
+    Отдельный поток с интервалом PROFILE_SAMPLE_INTERVAL снимает стеки
+    всех потоков процесса, кроме простаивающих. Корнем каждого стека
+    служит имя потока, поэтому видна и работа, вынесенная в потоки
+    sync_to_async. На нагруженном воркере в профиль могут попасть
+    параллельные запросы; их легко отличить по имени потока.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        """Запускает семплирование."""
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает семплирование и дожидается потока."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """
+        Возвращает результат в формате folded stacks.
+
+        Returns:
+            str: Строки вида "поток;функция;функция <число>"
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfiledCall:
+    """
+    Контекстный менеджер, выполняющий блок под профилировщиком.
+
+    Attributes:
+        sampler: Экземпляр StackSampler
+        duration: Длительность блока в секундах
+    """
+
+    def __init__(self):
+        self.sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL)
+        self.duration = 0.0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self._start
+        return False
+
+
+def save_profile(profiled, app, method, path, user=None):
+    """
+    Сохраняет результат профилирования и удаляет старые профили.
+
+    Args:
+        profiled: Завершенный ProfiledCall
+        app: Приложение ('site' или 'api')
+        method: HTTP-метод
+        path: Путь запроса
+        user: Пользователь, запросивший профилирование (или None)
+
+    Returns:
+        ProfileRecord: Запись о сохраненном профиле
+    """
+    from .models import ProfileRecord
+
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    file_name = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}.folded'
+    (directory / file_name).write_text(profiled.sampler.folded(), encoding='utf-8')
+
+    record = ProfileRecord.objects.create(
+        app=app,
+        method=method,
+        path=path[:500],
+        duration_ms=profiled.duration * 1000,
+        samples=profiled.sampler.samples,
+        file_name=file_name,
+        user=user if user is not None and user.is_authenticated else None,
+    )
+
+    stale = ProfileRecord.objects.order_by('-created_at')[settings.PROFILE_RETENTION:]
+    for old in stale:
+        old.delete()
+    return record
@@ -0,0 +1,337 @@
+"""
+Журнал медленных SQL-запросов.
+
+Обертка выполнения SQL замеряет каждый запрос; запросы дольше
+SLOW_QUERY_THRESHOLD_MS попадают в журнал. Для каждого запроса
+сохраняются:
+- отпечаток (fingerprint) — SQL, в котором литералы и параметры заменены
+  на '?', а списки IN (...) и многострочные VALUES свернуты
+- представление или маршрут API, в котором выполнялся запрос
+- параметры, в которых значения заменены на тип и длину
+- план выполнения EXPLAIN, снятый один раз для каждого отпечатка
+
+Записи накапливаются в памяти и раз в SLOW_QUERY_FLUSH_INTERVAL секунд
+сохраняются фоновым потоком в модель SlowQuery (счетчики суммируются
+по паре "отпечаток, представление"). Запросы самого журнала — EXPLAIN
+и сохранение — в журнал не попадают.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .instrumentation import current_stats
+
+logger = logging.getLogger(__name__)
+
+# Представление для запросов вне HTTP-запроса (команды управления и т.п.)
+NO_ENDPOINT = '-'
+
+# Максимум различных записей, ожидающих сохранения; остальные отбрасываются
+MAX_PENDING = 1000
+
+# Максимум отпечатков, для которых помнится, что план уже снят
+MAX_EXPLAINED = 5000
+
+# План снимается только для чтения: EXPLAIN между выполнением INSERT ... RETURNING
+# и чтением результата нарушил бы работу курсора
+EXPLAINABLE = ('SELECT', 'WITH')
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+IN_LIST_RE = re.compile(r'\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+VALUES_RE = re.compile(r'(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+')
+SPACE_RE = re.compile(r'\s+')
+
+# Флаг, отключающий журнал для запросов самого журнала
+_suppressed = ContextVar('monitoring_slowlog_suppressed', default=False)
+
+
+def normalize_sql(sql):
+    """
+    Приводит SQL к виду, общему для запросов с разными параметрами.
+
+    Args:
+        sql: Текст SQL-запроса
+
+    Returns:
+        str: Нормализованный SQL
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = SPACE_RE.sub(' ', sql).strip()
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return VALUES_RE.sub(r'\1, ...', sql)
+
+
+def fingerprint(normalized_sql):
+    """Возвращает отпечаток нормализованного SQL."""
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def _redact_value(value):
+    """Заменяет значение параметра на его тип (и длину для строк)."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (str, bytes, memoryview)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def redact_params(params, many=False):
+    """
+    Скрывает значения параметров запроса.
+
+    Args:
+        params: Параметры запроса (последовательность или словарь)
+        many: True для executemany
+
+    Returns:
+        list | dict | str | None: Параметры без значений
+    """
+    if params is None:
+        return None
+    if many:
+        return f'<executemany:{len(params) if hasattr(params, "__len__") else "?"}>'
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    return [_redact_value(value) for value in params]
+
+
+class SlowQueryLog:
+    """
+    Накопитель медленных запросов процесса.
+
+    Записи агрегируются по паре (отпечаток, представление) и сохраняются
+    в БД фоновым потоком.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._pending = {}
+        self._explained = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def needs_explain(self, key):
+        """Возвращает True, если для отпечатка еще не снимался план."""
+        with self._lock:
+            if key in self._explained:
+                return False
+            if len(self._explained) >= MAX_EXPLAINED:
+                self._explained.clear()
+            self._explained.add(key)
+            return True
+
+    def add(self, entries, endpoint):
+        """
+        Добавляет медленные запросы в очередь на сохранение.
+
+        Args:
+            entries: Список словарей с полями fingerprint, sql, params,
+                     duration, explain
+            endpoint: Представление или маршрут, выполнявший запросы
+        """
+        with self._lock:
+            for entry in entries:
+                key = (entry['fingerprint'], endpoint)
+                item = self._pending.get(key)
+                if item is None:
+                    if len(self._pending) >= MAX_PENDING:
+                        self.dropped += 1
+                        continue
+                    item = self._pending[key] = {
+                        'sql': entry['sql'], 'count': 0, 'total': 0.0, 'max': 0.0,
+                        'params': None, 'explain': '',
+                    }
+                item['count'] += 1
+                item['total'] += entry['duration']
+                item['max'] = max(item['max'], entry['duration'])
+                item['params'] = entry['params']
+                if entry['explain']:
+                    item['explain'] = entry['explain']
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        _suppressed.set(True)
+        while True:
+            time.sleep(settings.SLOW_QUERY_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить журнал медленных запросов: {e}")
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """
+        Сохраняет накопленные записи в модель SlowQuery.
+
+        Returns:
+            int: Число сохраненных записей
+        """
+        from .models import SlowQuery
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        token = _suppressed.set(True)
+        try:
+            now = timezone.now()
+            for (key, endpoint), item in pending.items():
+                params = json.dumps(item['params'], ensure_ascii=False, default=str)
+                changes = {
+                    'count': F('count') + item['count'],
+                    'total_ms': F('total_ms') + item['total'] * 1000,
+                    'max_ms': Greatest('max_ms', item['max'] * 1000),
+                    'params': params,
+                    'last_seen': now,
+                }
+                if item['explain']:
+                    changes['explain'] = item['explain']
+                records = SlowQuery.objects.filter(fingerprint=key, endpoint=endpoint)
+                if records.update(**changes):
+                    continue
+                try:
+                    # Точка сохранения: запись могла только что создать другой процесс
+                    with transaction.atomic():
+                        SlowQuery.objects.create(
+                            fingerprint=key,
+                            endpoint=endpoint,
+                            sql=item['sql'],
+                            params=params,
+                            explain=item['explain'],
+                            count=item['count'],
+                            total_ms=item['total'] * 1000,
+                            max_ms=item['max'] * 1000,
+                            first_seen=now,
+                            last_seen=now,
+                        )
+                except IntegrityError:
+                    records.update(**changes)
+        finally:
+            _suppressed.reset(token)
+        return len(pending)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def explain(connection, sql, params):
+    """
+    Снимает план выполнения запроса.
+
+    Внутри транзакции EXPLAIN выполняется в точке сохранения, чтобы его
+    ошибка не прервала транзакцию, в которой работает приложение.
+
+    Returns:
+        str: План выполнения или пустая строка, если снять его не удалось
+    """
+    if not sql.lstrip()[:6].upper().startswith(EXPLAINABLE):
+        return ''
+    prefix = connection.ops.explain_query_prefix()
+    token = _suppressed.set(True)
+    try:
+        if connection.in_atomic_block:
+            with transaction.atomic(using=connection.alias):
+                rows = _execute_explain(connection, f'{prefix} {sql}', params)
+        else:
+            rows = _execute_explain(connection, f'{prefix} {sql}', params)
+    except DatabaseError as e:
+        logger.info(f"Не удалось получить план запроса: {e}")
+        return ''
+    finally:
+        _suppressed.reset(token)
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def _execute_explain(connection, sql, params):
+    """Выполняет EXPLAIN в отдельном курсоре и возвращает строки плана."""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL (см. connection.execute_wrapper).
+
+    Замеряет запрос и записывает его в журнал, если он выполнялся дольше
+    SLOW_QUERY_THRESHOLD_MS. Запросы внутри HTTP-запроса откладываются
+    в статистике запроса и попадают в журнал по его окончании, когда
+    известно представление; остальные записываются сразу.
+    """
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if not threshold or _suppressed.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if duration * 1000 >= threshold:
+        _record(sql, params, many, context['connection'], duration)
+    return result
+
+
+def _record(sql, params, many, connection, duration):
+    """Формирует запись о медленном запросе."""
+    normalized = normalize_sql(sql)
+    key = fingerprint(normalized)
+    plan = ''
+    if settings.SLOW_QUERY_EXPLAIN and not many and slow_query_log.needs_explain(key):
+        plan = explain(connection, sql, params)
+    entry = {
+        'fingerprint': key,
+        'sql': normalized,
+        'params': redact_params(params, many),
+        'duration': duration,
+        'explain': plan,
+    }
+    stats = current_stats()
+    if stats is None:
+        slow_query_log.add([entry], NO_ENDPOINT)
+    else:
+        stats.slow_queries.append(entry)
+
+
+def finish_request(stats, endpoint):
+    """
+    Передает в журнал медленные запросы завершенного HTTP-запроса.
+
+    Args:
+        stats: RequestStats запроса
+        endpoint: Имя представления или маршрута API
+    """
+    if stats.slow_queries:
+        slow_query_log.add(stats.slow_queries, endpoint or NO_ENDPOINT)
+
+
+def _attach_wrapper(sender, connection, **kwargs):
+    """Подключает обертку к новому соединению, если её там еще нет."""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def install():
+    """
+    Подключает журнал медленных запросов ко всем текущим и будущим соединениям.
+    """
+    connection_created.connect(_attach_wrapper, dispatch_uid='monitoring.slow_query_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _attach_wrapper(None, connection)
@@ -0,0 +1,159 @@
+"""
+Профиль холодного запуска процесса.
+
+Импорт точки входа (по умолчанию recipe_site.asgi) выполняется в новом
+интерпретаторе с ключом -X importtime. Из его вывода собирается время
+импорта каждого модуля и сумма по пакетам верхнего уровня, а также
+проверяется, что тяжелые модули, которые должны загружаться лениво
+(SDK Cloudinary, библиотека JWT), не были импортированы при запуске.
+
+Используется командой startup_profile и тестом бюджета холодного запуска.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# Модули, которые загружаются только при первом использовании
+LAZY_MODULES = (
+    'cloudinary',
+    'cloudinary_storage.storage',
+    'jose',
+    'numpy',
+    'requests',
+    'scipy',
+)
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({'import': elapsed, 'loaded': [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+class ImportRecord:
+    """
+    Время импорта одного модуля.
+
+    Attributes:
+        module: Имя модуля
+        self_us: Собственное время импорта (микросекунды)
+        cumulative_us: Время вместе с вложенными импортами (микросекунды)
+        depth: Глубина вложенности импорта
+    """
+
+    __slots__ = ('module', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, module, self_us, cumulative_us, depth):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_importtime(output):
+    """
+    Разбирает вывод python -X importtime.
+
+    Args:
+        output: Текст из stderr интерпретатора
+
+    Returns:
+        list: Записи ImportRecord в порядке завершения импорта
+    """
+    records = []
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def by_package(records):
+    """
+    Суммирует собственное время импорта по пакетам верхнего уровня.
+
+    Returns:
+        list: Пары (пакет, микросекунды), по убыванию времени
+    """
+    totals = {}
+    for record in records:
+        package = record.module.partition('.')[0]
+        totals[package] = totals.get(package, 0) + record.self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_startup(target='recipe_site.asgi', settings_module=None, lazy_modules=LAZY_MODULES):
+    """
+    Импортирует модуль в новом интерпретаторе и собирает профиль импорта.
+
+    Args:
+        target: Импортируемый модуль (точка входа процесса)
+        settings_module: Модуль настроек Django (по умолчанию текущий)
+        lazy_modules: Модули, наличие которых после импорта проверяется
+
+    Returns:
+        dict: wall — полное время запуска интерпретатора (секунды),
+              import — время импорта target (секунды),
+              loaded — какие из lazy_modules оказались импортированы,
+              records — список ImportRecord
+
+    Raises:
+        RuntimeError: Если импорт завершился ошибкой
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module or settings.SETTINGS_MODULE)
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT, target, *lazy_modules],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f'Не удалось импортировать {target}:\n{process.stderr[-2000:]}')
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        'wall': wall,
+        'import': result['import'],
+        'loaded': result['loaded'],
+        'records': parse_importtime(process.stderr),
+    }
+
+
+def format_report(profile, top=25, budget=None):
+    """
+    Формирует текстовый отчет о холодном запуске.
+
+    Args:
+        profile: Результат profile_startup
+        top: Сколько модулей и пакетов показать
+        budget: Бюджет времени импорта (секунды) или None
+    """
+    lines = [f"Импорт: {profile['import'] * 1000:.0f} мс, "
+             f"запуск интерпретатора целиком: {profile['wall'] * 1000:.0f} мс"]
+    if budget is not None:
+        verdict = 'в пределах' if profile['import'] <= budget else 'ПРЕВЫШЕН'
+        lines.append(f'Бюджет {budget * 1000:.0f} мс: {verdict}')
+    if profile['loaded']:
+        lines.append(f"Загружены при запуске (должны быть ленивыми): {', '.join(profile['loaded'])}")
+
+    lines.append('')
+    lines.append(f"{'пакет':<40}{'мс':>10}")
+    for package, total in by_package(profile['records'])[:top]:
+        lines.append(f'{package:<40}{total / 1000:>10.1f}')
+
+    lines.append('')
+    lines.append(f"{'модуль':<60}{'собственное, мс':>17}{'всего, мс':>12}")
+    slowest = sorted(profile['records'], key=lambda record: record.self_us, reverse=True)[:top]
+    for record in slowest:
+        lines.append(f'{record.module:<60}{record.self_us / 1000:>17.1f}{record.cumulative_us / 1000:>12.1f}')
+    return '\n'.join(lines)
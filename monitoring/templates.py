@@ -0,0 +1,38 @@
+"""
+Шаблонный бэкенд Django с учетом времени отрисовки.
+"""
+
+from django.template.backends.django import DjangoTemplates
+
+from .instrumentation import timed_template
+
+
+class InstrumentedTemplate:
+    """
+    Обертка шаблона, учитывающая время render() в статистике запроса.
+
+    Учитывается только внешний шаблон: extends и include выполняются
+    внутри его render() и отдельно не считаются.
+    """
+
+    def __init__(self, template):
+        self._wrapped = template
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        with timed_template(self._wrapped.template.name):
+            return self._wrapped.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд DjangoTemplates, возвращающий шаблоны с учетом времени отрисовки.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
@@ -0,0 +1,338 @@
+"""
+Легковесная трассировка запросов.
+
+Каждый отобранный запрос получает идентификатор трассы (trace id) и дерево
+интервалов (spans): корневой интервал HTTP-запроса, представление или
+обработчик API, SQL-запросы, разбор текста рецепта, отрисовка шаблонов
+и обращения к хранилищу изображений.
+
+Решение об отборе принимается один раз в начале запроса (head-based
+sampling) с вероятностью TRACING_SAMPLE_RATE. Входящий заголовок W3C
+traceparent продолжает трассу вызывающей стороны, но её решение об отборе
+принимается только при TRACING_TRUST_TRACEPARENT (запросы приходят через
+свой шлюз): иначе любой клиент мог бы включить трассировку всех своих
+запросов.
+Для неотобранных запросов текущий интервал равен None, и все точки
+трассировки сводятся к одной проверке contextvar.
+
+Завершенные интервалы отправляются фоновым потоком пакетами:
+- TRACING_EXPORTER = 'jsonl' — в файл TRACING_JSONL_PATH, по строке на интервал;
+  файл больше TRACING_JSONL_MAX_BYTES переименовывается в .1 (хранится одна
+  предыдущая часть)
+- TRACING_EXPORTER = 'otlp' — POST в формате OTLP/HTTP JSON на TRACING_OTLP_ENDPOINT
+Без экспортера трассировка по умолчанию выключена (TRACING_ENABLED).
+"""
+
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Максимум интервалов в очереди экспорта; лишние отбрасываются
+EXPORT_QUEUE_SIZE = 10000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL = 1.0
+
+_current_span = ContextVar('monitoring_current_span', default=None)
+
+
+class Span:
+    """
+    Интервал трассы.
+
+    Attributes:
+        trace_id: Идентификатор трассы (32 шестнадцатеричных символа)
+        span_id: Идентификатор интервала (16 шестнадцатеричных символов)
+        parent_id: Идентификатор родительского интервала или None
+        name: Название операции
+        attributes: Словарь атрибутов
+        start_ns: Время начала (наносекунды Unix)
+        end_ns: Время окончания (наносекунды Unix)
+        error: Текст ошибки, если операция завершилась исключением
+    """
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+                 'start_ns', 'end_ns', 'error')
+
+    def __init__(self, trace_id, parent_id, name, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def child(self, name, attributes=None):
+        """Создает дочерний интервал."""
+        return Span(self.trace_id, self.span_id, name, attributes)
+
+    def end(self, error=None):
+        """Завершает интервал и передает его на экспорт."""
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f'{type(error).__name__}: {error}'
+        exporter().submit(self)
+
+    def traceparent(self):
+        """Возвращает заголовок W3C traceparent для исходящих вызовов."""
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def to_dict(self):
+        """Представление интервала для экспорта в JSONL."""
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': (self.end_ns - self.start_ns) / 1e6,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+def current_span():
+    """Возвращает текущий интервал или None, если запрос не отобран."""
+    return _current_span.get()
+
+
+def start_trace(name, traceparent=None, attributes=None):
+    """
+    Принимает решение об отборе и создает корневой интервал запроса.
+
+    Args:
+        name: Название корневого интервала
+        traceparent: Входящий заголовок W3C traceparent или None
+        attributes: Атрибуты интервала
+
+    Returns:
+        Span | None: Корневой интервал или None, если запрос не отобран
+    """
+    if not settings.TRACING_ENABLED:
+        return None
+    match = TRACEPARENT_RE.match(traceparent) if traceparent else None
+    if match and settings.TRACING_TRUST_TRACEPARENT:
+        sampled = bool(int(match.group(3), 16) & 1)
+    else:
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    if not sampled:
+        return None
+    if match:
+        return Span(match.group(1), match.group(2), name, attributes)
+    return Span(secrets.token_hex(16), None, name, attributes)
+
+
+@contextmanager
+def activate(span):
+    """
+    Делает интервал текущим внутри блока и завершает его на выходе.
+
+    Args:
+        span: Интервал или None (тогда блок выполняется без трассировки)
+    """
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.end(error=exc)
+        raise
+    else:
+        span.end()
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Выполняет блок внутри дочернего интервала текущей трассы.
+
+    Args:
+        name: Название операции
+        **attributes: Атрибуты интервала
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with activate(parent.child(name, attributes)) as child:
+        yield child
+
+
+def traced(func=None, *, name=None):
+    """
+    Декоратор, выполняющий функцию внутри интервала трассы.
+
+    Поддерживает обычные и асинхронные функции. Без аргументов название
+    интервала составляется из модуля и имени функции.
+
+    Использование:
+        @traced
+        def home(request): ...
+
+        @traced(name='recipes.parse_steps')
+        def parse_steps(value): ...
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+    span_name = name or f'{func.__module__}.{func.__qualname__}'
+
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return await func(*args, **kwargs)
+            with span(span_name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+        with span(span_name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class BatchExporter:
+    """
+    Фоновый экспорт завершенных интервалов пакетами.
+
+    Интервалы складываются в ограниченную очередь; отдельный поток
+    забирает их пакетами и записывает в JSONL-файл или отправляет
+    в коллектор OTLP. При переполнении очереди интервалы отбрасываются,
+    чтобы трассировка никогда не тормозила обработку запросов.
+    """
+
+    def __init__(self, kind, target):
+        self.kind = kind
+        self.target = target
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+        self._thread.start()
+
+    def submit(self, span):
+        """Ставит интервал в очередь экспорта."""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                if self.kind == 'otlp':
+                    self._export_otlp(batch)
+                else:
+                    self._export_jsonl(batch)
+            except Exception as e:
+                logger.warning(f"Не удалось экспортировать {len(batch)} интервалов: {e}")
+
+    def _export_jsonl(self, batch):
+        limit = settings.TRACING_JSONL_MAX_BYTES
+        if limit and os.path.exists(self.target) and os.path.getsize(self.target) >= limit:
+            os.replace(self.target, f'{self.target}.1')
+        with open(self.target, 'a', encoding='utf-8') as output:
+            for item in batch:
+                output.write(json.dumps(item.to_dict(), ensure_ascii=False, default=str))
+                output.write('\n')
+
+    def _export_otlp(self, batch):
+        body = json.dumps(_otlp_payload(batch), default=str).encode()
+        request = urllib.request.Request(
+            self.target, data=body, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+
+
+def _otlp_value(value):
+    """Преобразует значение атрибута в формат OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_payload(batch):
+    """Формирует тело запроса OTLP/HTTP JSON (ExportTraceServiceRequest)."""
+    spans = []
+    for item in batch:
+        data = {
+            'traceId': item.trace_id,
+            'spanId': item.span_id,
+            'name': item.name,
+            'kind': 2 if item.parent_id is None else 1,
+            'startTimeUnixNano': str(item.start_ns),
+            'endTimeUnixNano': str(item.end_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in item.attributes.items() if value is not None
+            ],
+            'status': {'code': 2, 'message': item.error} if item.error else {'code': 1},
+        }
+        if item.parent_id:
+            data['parentSpanId'] = item.parent_id
+        spans.append(data)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': settings.TRACING_SERVICE_NAME}},
+            ]},
+            'scopeSpans': [{'scope': {'name': 'monitoring.tracing'}, 'spans': spans}],
+        }],
+    }
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def exporter():
+    """Возвращает экспортер, создавая его при первом обращении."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                if settings.TRACING_EXPORTER == 'otlp':
+                    _exporter = BatchExporter('otlp', settings.TRACING_OTLP_ENDPOINT)
+                else:
+                    _exporter = BatchExporter('jsonl', settings.TRACING_JSONL_PATH)
+    return _exporter
@@ -0,0 +1,33 @@
+"""
+Представления приложения мониторинга.
+"""
+
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import registry
+
+
+def _has_metrics_token(request):
+    """Содержит ли запрос заголовок с METRICS_TOKEN (пустой токен не подходит)."""
+    token = settings.METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def metrics(request):
+    """
+    Отдает метрики процесса в текстовом формате Prometheus.
+    
+    Args:
+        request: объект HttpRequest
+    
+    Returns:
+        HttpResponse с метриками или 403. Метрики доступны сотрудникам,
+        запросам с заголовком "Authorization: Bearer <METRICS_TOKEN>"
+        и всем, только если явно задан METRICS_PUBLIC
+    """
+    if not (settings.METRICS_PUBLIC or _has_metrics_token(request) or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
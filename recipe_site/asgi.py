@@ -1,34 +1,89 @@
 """
 ASGI config for recipe_site project.
+
+Запросы распределяются по префиксу пути без промежуточного приложения:
+/api/... передается приложению FastAPI (api.main), всё остальное — Django.
+CORS применяется один раз, снаружи диспетчера. Проверки /healthz и /readyz
+и прогрев воркера обрабатываются внешним слоем (monitoring/health.py).
 """
 
 import os
 from django.core.asgi import get_asgi_application
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from starlette.routing import Mount
-from api.main import app as fastapi_app
+from starlette.middleware.cors import CORSMiddleware
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_site.settings')
 django_app = get_asgi_application()
 
-app = FastAPI()
+from api.main import app as fastapi_app  # noqa: E402  после инициализации Django
+from monitoring.health import HealthASGIMiddleware  # noqa: E402
+from recipes import warmup  # noqa: E402
+
+
+class PathPrefixDispatcher:
+    """
+    Минимальный ASGI-диспетчер по префиксу пути.
+
+    Для каждого запроса выбирается первое приложение, префикс которого
+    совпадает с началом пути ('/api' обслуживает '/api/...'), иначе
+    запрос передается приложению по умолчанию. Как и Mount в Starlette,
+    префикс сравнивается с путем без root_path (сервер, запущенный
+    с --root-path, включает его в path), добавляется к root_path,
+    а path не меняется.
+
+    События lifespan передаются приложению lifespan_app (Django
+    их не поддерживает).
+
+    Args:
+        routes: Список пар (префикс без завершающего '/', приложение)
+        default: Приложение для остальных путей
+        lifespan_app: Приложение, получающее события lifespan (или None)
+    """
+
+    def __init__(self, routes, default, lifespan_app=None):
+        self.routes = [(prefix.rstrip('/'), app) for prefix, app in routes]
+        self.default = default
+        self.lifespan_app = lifespan_app
 
-# Настройка CORS
-app.add_middleware(
-    CORSMiddleware,
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(scope, receive, send)
+            return
+
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path + '/'):
+            path = path[len(root_path):]
+        for prefix, app in self.routes:
+            if path.startswith(prefix + '/'):
+                scope = dict(scope)
+                scope.setdefault('app_root_path', root_path)
+                scope['root_path'] = root_path + prefix
+                await app(scope, receive, send)
+                return
+        await self.default(scope, receive, send)
+
+    async def _lifespan(self, scope, receive, send):
+        if self.lifespan_app is not None:
+            await self.lifespan_app(scope, receive, send)
+            return
+        # Никто не обрабатывает события: подтверждаем их сами
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+# Настройка CORS (общая для сайта и API)
+application = CORSMiddleware(
+    PathPrefixDispatcher([('/api', fastapi_app)], django_app, lifespan_app=fastapi_app),
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Монтируем FastAPI приложение на /api
-app.mount("/api", fastapi_app)
-
-# Добавляем Django как основное приложение
-app.mount("/", django_app)
-
-# Экспортируем приложение
-application = app
+# Проверки живости и готовности для балансировщика
+application = HealthASGIMiddleware(application, warmup=warmup.run)
@@ -0,0 +1,74 @@
+"""
+Пулы процессов для задач, нагружающих процессор.
+
+Пул создается при первом обращении, а число процессов берется из настройки
+Django. Дочерние процессы запускаются методом spawn: они не наследуют
+соединения с БД, потоки и кэши родителя и загружают только модуль задачи
+и настройки. Поэтому функции задач должны быть определены на уровне модуля
+и не должны требовать моделей Django.
+
+Пулы:
+    - api/passwords.py: проверка и хеширование паролей
+    - recipes/textparse.py: разбор текстов рецептов при пакетном импорте
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+
+def init_worker():
+    """Инициализация дочернего процесса: указывает модуль настроек Django."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_site.settings')
+
+
+class ProcessPool:
+    """
+    Пул процессов, создаваемый при первом обращении.
+
+    Attributes:
+        workers_setting: Имя настройки Django с числом процессов
+        initializer: Функция инициализации дочернего процесса (уровня
+            модуля, чтобы её можно было передать процессу spawn)
+    """
+
+    def __init__(self, workers_setting, initializer=init_worker):
+        self.workers_setting = workers_setting
+        self.initializer = initializer
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get(self, workers=None):
+        """
+        Возвращает пул, создавая его при первом обращении.
+
+        Args:
+            workers: Число процессов вместо настройки workers_setting
+                     (учитывается только при создании пула)
+
+        Returns:
+            ProcessPoolExecutor: Пул процессов
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers or getattr(settings, self.workers_setting),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=self.initializer,
+                )
+            return self._executor
+
+    def shutdown(self, wait=True):
+        """
+        Останавливает пул; следующий get() создаст новый.
+
+        Args:
+            wait: Дождаться завершения дочерних процессов
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -17,9 +17,6 @@ from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
 from decouple import config
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 
 # Загружаем переменные окружения из файла .env
 load_dotenv()
@@ -47,25 +44,34 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.admindocs',
     'recipes',
+    'monitoring',
     'cloudinary_storage',  # Добавляем cloudinary_storage
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',  # Метрики запросов, должен быть первым
+    'monitoring.middleware.TracingMiddleware',  # Трассировка отобранных запросов
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Добавляем WhiteNoise
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.middleware.ProfilingMiddleware',  # Профилирование по токену, после аутентификации
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'recipe_site.urls'
 
+# Асинхронные варианты главной, страницы рецепта и добавления категории
+# (ahome, arecipe_detail, aadd_category_ajax в recipes/views.py)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с учетом времени отрисовки в метриках
+        'BACKEND': 'monitoring.templates.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -93,13 +99,68 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='pff80d041e470232898b25658e107cb776da9436a617d6592be1b11d2b5f82805'),
         'HOST': config('DB_HOST', default='c6sfjnr30ch74e.cluster-czrs8kj4isg7.us-east-1.rds.amazonaws.com'),
         'PORT': config('DB_PORT', default='5432'),
+        # Под ASGI синхронные представления выполняются в разных потоках,
+        # и постоянные соединения копятся по одному на поток. Поэтому по
+        # умолчанию соединение закрывается после запроса, а переиспользует
+        # соединения пулер (PgBouncer) между приложением и базой
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Для нескольких воркеров нужен общий кэш (Redis, Memcached), иначе
+# версия справочника категорий будет своей в каждом процессе.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='recipe-site'),
+    },
+    # Фрагменты JSON рецептов (см. api/fragments.py): отдельный кэш, чтобы
+    # их вытеснение не затрагивало сессии, пользователей и справочник категорий
+    'fragments': {
+        'BACKEND': config('FRAGMENT_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('FRAGMENT_CACHE_LOCATION', default='recipe-fragments'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('FRAGMENT_CACHE_MAX_ENTRIES', default=20000, cast=int),
+        },
+    },
+}
+
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    # ModelBackend с кэшированием пользователя между запросами
+    'recipes.backends.CachedModelBackend',
 ]
 
+# Кэш общий для всех процессов (не LocMemCache и не DummyCache): сброс
+# записи в нем сразу виден всем воркерам
+CACHE_SHARED = not CACHES['default']['BACKEND'].endswith(('.LocMemCache', '.DummyCache'))
+
+# Время жизни кэшированного пользователя (секунды, 0 — без кэша). Без общего
+# кэша сброс при изменении пользователя виден только своему процессу,
+# поэтому по умолчанию пользователь кэшируется только в общем кэше
+USER_CACHE_TIMEOUT = config('USER_CACHE_TIMEOUT', default=60 if CACHE_SHARED else 0, cast=int)
+
+# Наибольший возраст снимка справочника категорий в памяти процесса (секунды,
+# 0 — до смены версии). Без общего кэша смена версии видна только своему
+# процессу, поэтому остальные воркеры перечитывают справочник по времени
+CATEGORY_CATALOG_TIMEOUT = config('CATEGORY_CATALOG_TIMEOUT', default=0 if CACHE_SHARED else 30, cast=int)
+
+# Sessions
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/
+# SESSION_BACKEND: 'cached_db', 'signed_cookies' или 'db'. По умолчанию
+# 'cached_db' с общим кэшем и 'db' без него: сессия, удаленная при выходе
+# в одном процессе, иначе оставалась бы в кэше остальных
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[config('SESSION_BACKEND', default='cached_db' if CACHE_SHARED else 'db')]
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
@@ -150,25 +211,100 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Cloudinary settings
+# SDK настраивается из этого словаря при первом обращении к хранилищу
+# (см. recipes/storage.py), а не при загрузке настроек
 CLOUDINARY_STORAGE = {
-    'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME'),
-    'API_KEY': config('CLOUDINARY_API_KEY'),
-    'API_SECRET': config('CLOUDINARY_API_SECRET'),
+    'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=''),
+    'API_KEY': config('CLOUDINARY_API_KEY', default=''),
+    'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
 }
 
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# MediaCloudinaryStorage с учетом времени обращений в метриках
+DEFAULT_FILE_STORAGE = 'recipes.storage.MediaStorage'
+
+# Заглушка Cloudinary для локальных замеров (см. settings_bench.py и recipes/storage.py)
+FAKE_IMAGE_STORAGE = False
+FAKE_STORAGE_LATENCY = 0.0  # Имитируемая задержка хранилища (секунды)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Настройки Cloudinary
-cloudinary.config(
-    cloud_name=config('CLOUDINARY_CLOUD_NAME'),
-    api_key=config('CLOUDINARY_API_KEY'),
-    api_secret=config('CLOUDINARY_API_SECRET'),
-)
+# Monitoring
+# /metrics доступен сотрудникам и с заголовком "Authorization: Bearer <METRICS_TOKEN>";
+# METRICS_PUBLIC открывает его всем (например, в закрытой сети)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+
+# Профилирование запросов по требованию (см. monitoring/profiling.py)
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILE_RETENTION = config('PROFILE_RETENTION', default=50, cast=int)  # Сколько последних профилей хранить
+PROFILE_TOKEN_MAX_AGE = config('PROFILE_TOKEN_MAX_AGE', default=3600, cast=int)  # Срок действия токена (секунды)
+PROFILE_SAMPLE_INTERVAL = config('PROFILE_SAMPLE_INTERVAL', default=0.001, cast=float)  # Интервал семплирования (секунды)
+
+# Трассировка запросов (см. monitoring/tracing.py)
+TRACING_EXPORTER = config('TRACING_EXPORTER', default='')  # 'jsonl' или 'otlp'
+# По умолчанию трассировка включена, только если задан экспортер: иначе
+# трассы без ограничения копились бы в traces.jsonl рядом с исходниками
+TRACING_ENABLED = config('TRACING_ENABLED', default=bool(TRACING_EXPORTER), cast=bool)
+TRACING_SAMPLE_RATE = config('TRACING_SAMPLE_RATE', default=0.01, cast=float)  # Доля трассируемых запросов
+# Отбирать запросы по флагу входящего traceparent (только если его ставит свой шлюз)
+TRACING_TRUST_TRACEPARENT = config('TRACING_TRUST_TRACEPARENT', default=False, cast=bool)
+TRACING_JSONL_PATH = config('TRACING_JSONL_PATH', default=os.path.join(BASE_DIR, 'traces.jsonl'))
+# Размер файла трасс, после которого он переименовывается в .1 (байты, 0 — без ограничения)
+TRACING_JSONL_MAX_BYTES = config('TRACING_JSONL_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+TRACING_OTLP_ENDPOINT = config('TRACING_OTLP_ENDPOINT', default='http://localhost:4318/v1/traces')
+TRACING_SERVICE_NAME = config('TRACING_SERVICE_NAME', default='recipe_site')
+
+# Журнал медленных SQL-запросов (см. monitoring/slowlog.py)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)  # 0 отключает журнал
+SLOW_QUERY_EXPLAIN = config('SLOW_QUERY_EXPLAIN', default=True, cast=bool)  # Снимать план EXPLAIN
+SLOW_QUERY_FLUSH_INTERVAL = config('SLOW_QUERY_FLUSH_INTERVAL', default=10, cast=float)  # Период сохранения (секунды)
+
+# Списки админки для больших таблиц: начиная с этого числа строк
+# используется оценка по статистике Postgres вместо COUNT(*) (см. recipes/paginators.py)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+
+# Прогрев воркера перед готовностью /readyz (см. recipes/warmup.py и monitoring/health.py)
+WARMUP_ENABLED = config('WARMUP_ENABLED', default=True, cast=bool)
+WARMUP_PRERENDER = config('WARMUP_PRERENDER', default=20, cast=int)  # Сколько страниц рецептов отрисовать заранее
+WARMUP_RETRY_INTERVAL = config('WARMUP_RETRY_INTERVAL', default=5, cast=float)  # Пауза перед повтором (секунды)
+
+# Пакетный импорт рецептов из NDJSON (см. recipes/bulk.py)
+BULK_IMPORT_BATCH_SIZE = config('BULK_IMPORT_BATCH_SIZE', default=500, cast=int)  # Записей в пакете
+BULK_IMPORT_WORKERS = config('BULK_IMPORT_WORKERS', default=2, cast=int)  # Процессов разбора текстов
+BULK_IMPORT_POOL_MIN = config('BULK_IMPORT_POOL_MIN', default=50, cast=int)  # Меньшие пакеты разбираются без пула
+
+# Выгрузка каталога (см. recipes/export.py): строк в порции серверного курсора
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Процессов проверки паролей API (см. api/passwords.py)
+API_PASSWORD_WORKERS = config('API_PASSWORD_WORKERS', default=2, cast=int)
+
+# Наибольшее число рецептов в пакетной загрузке /api/recipes/batch
+API_BATCH_MAX_IDS = config('API_BATCH_MAX_IDS', default=200, cast=int)
+
+# Время хранения сериализованных рецептов в кэше (секунды, см. api/fragments.py)
+API_FRAGMENT_CACHE_TIMEOUT = config('API_FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Синхронизация клиентов по журналу изменений (см. recipes/sync.py)
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)  # Записей журнала в ответе
+SYNC_RETENTION_DAYS = config('SYNC_RETENTION_DAYS', default=30, cast=int)  # Срок действия токена
+SYNC_COMPACT_EVERY = config('SYNC_COMPACT_EVERY', default=1000, cast=int)  # Сжатие журнала каждые N записей
+SYNC_COMMIT_LAG = config('SYNC_COMMIT_LAG', default=2.0, cast=float)  # Наибольшая длительность транзакции (секунды)
+
+# Просмотры рецептов копятся в памяти процесса (см. recipes/counters.py),
+# популярность пересчитывает команда update_popularity
+RECIPE_VIEWS_FLUSH_INTERVAL = config('RECIPE_VIEWS_FLUSH_INTERVAL', default=30, cast=float)  # Период сохранения (секунды)
+RECIPE_POPULARITY_HALF_LIFE_HOURS = config('RECIPE_POPULARITY_HALF_LIFE_HOURS', default=72, cast=float)  # Полураспад просмотра
+
+# Похожие рецепты, рассчитываемые командой build_similar (см. recipes/similarity.py)
+SIMILAR_RECIPES_TOP_K = config('SIMILAR_RECIPES_TOP_K', default=8, cast=int)  # Соседей в списке
+SIMILAR_MAX_FEATURES = config('SIMILAR_MAX_FEATURES', default=5000, cast=int)  # Наибольший размер словаря TF-IDF
+
+# Результаты нагрузочных замеров (см. monitoring/bench.py)
+BENCH_RESULTS_DIR = config('BENCH_RESULTS_DIR', default=os.path.join(BASE_DIR, 'bench_results'))
 
 # Security settings
 SECURE_SSL_REDIRECT = False  # Включить на продакшене если есть SSL
@@ -0,0 +1,36 @@
+"""
+Настройки для локальных замеров нагрузки.
+
+Профиль не требует Postgres и учетных данных Cloudinary: база данных —
+файл SQLite, изображения хранятся в памяти процесса (FakeMediaStorage),
+а загрузка в Cloudinary заменена заглушкой.
+
+Использование:
+    python manage.py migrate --settings=recipe_site.settings_bench
+    python manage.py generate_catalog --recipes 5000 --settings=recipe_site.settings_bench
+    python manage.py bench --settings=recipe_site.settings_bench
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, config
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('BENCH_DB_PATH', default=str(BASE_DIR / 'bench.sqlite3')),
+    }
+}
+
+# Статика отдается без манифеста, collectstatic не нужен
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+# Хранилище изображений в памяти вместо Cloudinary
+DEFAULT_FILE_STORAGE = 'recipes.storage.FakeMediaStorage'
+FAKE_IMAGE_STORAGE = True
+FAKE_STORAGE_LATENCY = config('FAKE_STORAGE_LATENCY', default=0.0, cast=float)
+
+# Трассы замеров не смешиваются с трассами разработки
+TRACING_JSONL_PATH = str(BASE_DIR / 'bench_traces.jsonl')
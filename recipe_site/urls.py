@@ -5,7 +5,10 @@
 - Административный интерфейс (/admin/)
 - Документация админки (/admin/doc/)
 - Все URL приложения рецептов (/)
-- API интерфейс (/api/)
+- Метрики в формате Prometheus (/metrics)
+
+API (/api/) обслуживается приложением FastAPI, запросы к нему
+направляет диспетчер в recipe_site/asgi.py.
 
 Также настраивается обработка медиа-файлов в режиме разработки.
 
@@ -17,11 +20,11 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from api.main import app
+from monitoring import views as monitoring_views
 
 urlpatterns = [
     path('admin/doc/', include('django.contrib.admindocs.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', monitoring_views.metrics, name='metrics'),
     path('', include('recipes.urls')),
-    path('api/', app),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -3,10 +3,87 @@
 
 Этот модуль определяет настройки отображения моделей в админ-панели Django,
 включая списки отображаемых полей, поиск и фильтрацию.
+
+Список рецептов рассчитан на большие каталоги: авторы загружаются
+в том же запросе, поиск опирается на триграммные индексы (Postgres,
+миграция 0007), фильтры по автору и категориям выбирают значение через
+автодополнение вместо полного списка, а число строк для больших
+выборок оценивается по статистике Postgres (см. recipes/paginators.py).
 """
 
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from .models import Recipe, Category
+from .paginators import EstimatedCountPaginator
+
+
+class AutocompleteFieldListFilter(admin.FieldListFilter):
+    """
+    Фильтр по связанной модели с выбором значения через автодополнение.
+
+    В отличие от стандартного RelatedFieldListFilter не загружает все
+    связанные объекты в боковую панель: отображается только выбранное
+    значение, а варианты ищутся через автодополнение админки
+    (у модели связанного объекта должны быть заданы search_fields).
+    """
+    template = 'admin/recipes/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.model_admin = model_admin
+        value = self.used_parameters.get(self.lookup_kwarg)
+        self.lookup_val = value[-1] if isinstance(value, list) else value
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        # Подсчет по каждому значению противоречит назначению фильтра
+        return {}
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'Все',
+        }
+
+    def widget(self):
+        """Поле выбора с автодополнением, содержащее только выбранное значение."""
+        remote_model = self.field.remote_field.model
+        form_field = forms.ModelChoiceField(
+            queryset=remote_model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(self.field, self.model_admin.admin_site,
+                                      attrs={'data-allow-clear': 'true', 'data-placeholder': 'Все'}),
+        )
+        return form_field.widget.render(
+            f'filter_{self.lookup_kwarg}', self.lookup_val,
+            attrs={'id': f'id_filter_{self.field_path}'},
+        )
+
+
+class LargeTableAdminMixin:
+    """
+    Настройки списка для больших таблиц.
+
+    Attributes:
+        paginator: Пагинатор с оценкой числа строк для больших выборок
+        show_full_result_count: Не выполнять второй COUNT(*) по всей таблице
+            при фильтрации
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        """Скрипты автодополнения для фильтров AutocompleteFieldListFilter."""
+        autocomplete = AutocompleteSelect(None, self.admin_site).media
+        return super().media + autocomplete + forms.Media(
+            js=['admin/js/jquery.init.js', 'js/admin_autocomplete_filter.js'],
+        )
 
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -23,19 +100,27 @@ class CategoryAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Настройки отображения модели Recipe в админ-панели.
     
     Attributes:
         list_display: Поля, отображаемые в списке рецептов
+        list_select_related: Авторы загружаются в запросе списка
         search_fields: Поля, по которым возможен поиск
-        list_filter: Поля для фильтрации рецептов
+            (на Postgres — по триграммным индексам)
+        list_filter: Поля для фильтрации рецептов (с автодополнением)
+        autocomplete_fields: Поля формы с выбором через автодополнение
         ordering: Сортировка рецептов
     """
     list_display = ('title', 'author', 'preparation_time')
+    list_select_related = ('author',)
     search_fields = ('title', 'description', 'steps')
-    list_filter = ('categories', 'author')
+    list_filter = (
+        ('categories', AutocompleteFieldListFilter),
+        ('author', AutocompleteFieldListFilter),
+    )
+    autocomplete_fields = ('author', 'categories')
     ordering = ('title',)
 
 
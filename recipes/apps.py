@@ -21,3 +21,9 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        """
+        Подключает обработчики сигналов, объявленные вне models.py.
+        """
+        from . import backends  # noqa: F401
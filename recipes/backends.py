@@ -0,0 +1,91 @@
+"""
+Бэкенды аутентификации приложения рецептов.
+
+Этот модуль содержит бэкенд, который кэширует пользователя, загружаемого
+AuthenticationMiddleware на каждом запросе, чтобы проверка сессии
+не выполняла запрос к таблице auth_user.
+
+Кэш сбрасывается сигналами при любом сохранении или удалении пользователя
+(смена пароля, флагов is_active/is_staff/is_superuser, last_login) и при
+изменении его групп и прав. Сброс виден всем процессам только в общем
+кэше (Redis, Memcached), поэтому с LocMemCache кэширование по умолчанию
+выключено (USER_CACHE_TIMEOUT = 0). QuerySet.update() сигналов не
+отправляет: изменения через него видны по истечении USER_CACHE_TIMEOUT.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from monitoring.metrics import registry
+
+USER_CACHE_KEY = 'recipes:auth_user:{}'
+
+
+def user_cache_key(user_id):
+    """Возвращает ключ кэша для пользователя с указанным id."""
+    return USER_CACHE_KEY.format(user_id)
+
+
+def invalidate_user(user_id):
+    """Удаляет пользователя из кэша."""
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend с кэшированием пользователя между запросами.
+    
+    Каждый вызов get_user возвращает отдельную копию объекта из кэша,
+    поэтому изменения атрибутов пользователя в одном запросе (например,
+    кэш прав _perm_cache) не видны другим запросам.
+    """
+
+    def get_user(self, user_id):
+        """
+        Возвращает пользователя по id, используя кэш.
+        
+        Args:
+            user_id: Идентификатор пользователя из сессии
+        
+        Returns:
+            User | None: Пользователь, если он существует и активен
+        """
+        if not settings.USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        registry.cache_access('auth_user', hit=user is not None)
+        if user is None:
+            try:
+                user = User._default_manager.get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Сигнал для сброса кэша пользователя при изменении или удалении
+    """
+    invalidate_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_cached_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сигнал для сброса кэша пользователей при изменении групп и прав
+    """
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_user(instance.pk)
+    elif pk_set:
+        cache.delete_many([user_cache_key(user_id) for user_id in pk_set])
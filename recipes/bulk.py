@@ -0,0 +1,301 @@
+"""
+Пакетный импорт рецептов из NDJSON.
+
+Общий путь для эндпоинта POST /api/recipes/bulk и команды import_recipes.
+Каждая строка входных данных — JSON-объект рецепта:
+
+    {"title": "...", "description": "...", "ingredients": "...",
+     "steps": "...", "preparation_time": 30,
+     "categories": [1, "Супы"], "image": "recipes/borsch.jpg",
+     "author": "cook1"}
+
+categories — id существующих категорий (числа) или названия (строки;
+недостающие категории создаются), image — путь к уже загруженному изображению, author —
+имя пользователя (учитывается только командой; в API автором
+становится текущий пользователь).
+
+Записи обрабатываются пакетами:
+- тексты ингредиентов и шагов нормализуются и разбираются фильтрами
+  parse_ingredients и parse_steps в пуле процессов (recipes/textparse.py);
+- поля проверяются валидаторами модели Recipe;
+- категории и авторы всего пакета разрешаются одним проходом;
+- рецепты и связи с категориями вставляются через bulk_create
+  в одной транзакции на пакет.
+
+Ошибка в записи не прерывает пакет: запись пропускается, а ошибка
+попадает в отчет с номером строки.
+"""
+
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import textparse
+from .models import MAX_CATEGORY_ID, Category, Recipe, RecipeChange
+
+# Поля записи, которые переносятся в модель как есть
+RECIPE_FIELDS = ('title', 'description', 'ingredients', 'steps', 'preparation_time', 'image')
+REQUIRED_FIELDS = ('title', 'description', 'ingredients', 'steps', 'preparation_time')
+
+class BulkResult:
+    """
+    Итог импорта.
+
+    Attributes:
+        created: Число созданных рецептов
+        ids: Идентификаторы созданных рецептов
+        errors: Список {'line': номер строки, 'error': текст ошибки}
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.ids = []
+        self.errors = []
+
+    def add_error(self, line, error):
+        self.errors.append({'line': line, 'error': error})
+
+    def as_dict(self):
+        errors = sorted(self.errors, key=lambda error: error['line'])
+        return {'created': self.created, 'ids': self.ids, 'errors': errors}
+
+
+def _validation_message(error):
+    """Текст ошибки валидации модели в виде 'поле: сообщение; ...'."""
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def decode_records(lines, result):
+    """
+    Разбирает строки NDJSON.
+
+    Args:
+        lines: Пары (номер строки, текст строки)
+        result: BulkResult для ошибок разбора
+
+    Returns:
+        list: Пары (номер строки, словарь записи); пустые строки пропускаются
+    """
+    records = []
+    for line_number, text in lines:
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as e:
+            result.add_error(line_number, f'Некорректный JSON: {e}')
+            continue
+        if not isinstance(record, dict):
+            result.add_error(line_number, 'Запись должна быть JSON-объектом')
+            continue
+        missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '')]
+        if missing:
+            result.add_error(line_number, f"Не заполнены поля: {', '.join(missing)}")
+            continue
+        if not isinstance(record['ingredients'], str) or not isinstance(record['steps'], str):
+            result.add_error(line_number, 'Поля ingredients и steps должны быть строками')
+            continue
+        categories = record.get('categories') or []
+        if not isinstance(categories, list):
+            result.add_error(line_number, 'Поле categories должно быть списком')
+            continue
+        error = _check_categories(categories)
+        if error:
+            result.add_error(line_number, error)
+            continue
+        records.append((line_number, record))
+    return records
+
+
+def _check_categories(values):
+    """
+    Проверяет значения categories одной записи.
+
+    Returns:
+        str | None: Текст ошибки или None
+    """
+    max_length = Category._meta.get_field('name').max_length
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            return 'Категория должна быть id (число) или названием (строка)'
+        if isinstance(value, int):
+            if not 1 <= value <= MAX_CATEGORY_ID:
+                return f'Некорректный id категории: {value}'
+        else:
+            name = Category.normalize_name(value)
+            if not name:
+                return 'Пустое название категории'
+            if len(name) > max_length:
+                return f'Название категории длиннее {max_length} символов'
+    return None
+
+
+def preparse(records, result, workers=None):
+    """
+    Нормализует и разбирает тексты записей (в пуле процессов).
+
+    Записи без ингредиентов или без шагов отбрасываются с ошибкой.
+
+    Args:
+        records: Пары (номер строки, словарь записи)
+        result: BulkResult для ошибок
+        workers: Число процессов разбора (по умолчанию BULK_IMPORT_WORKERS,
+                 0 — разбор в текущем процессе)
+
+    Returns:
+        list: Записи, прошедшие разбор (тексты заменены нормализованными)
+    """
+    workers = settings.BULK_IMPORT_WORKERS if workers is None else workers
+    texts = [(record['ingredients'], record['steps']) for _, record in records]
+    if workers and len(texts) >= settings.BULK_IMPORT_POOL_MIN:
+        parsed = textparse.pool.get(workers).map(textparse.preparse, texts, chunksize=32)
+    else:
+        parsed = map(textparse.preparse, texts)
+
+    accepted = []
+    for (line_number, record), (ingredients, steps, ingredient_count, step_count) in zip(records, parsed):
+        if not ingredient_count:
+            result.add_error(line_number, 'В тексте ингредиентов не найдено ни одного ингредиента')
+            continue
+        if not step_count:
+            result.add_error(line_number, 'В тексте шагов не найдено ни одного шага')
+            continue
+        record['ingredients'], record['steps'] = ingredients, steps
+        accepted.append((line_number, record))
+    return accepted
+
+
+def _split_categories(values):
+    """Делит значения categories (после _check_categories) на id и названия."""
+    ids, names = set(), []
+    for value in values:
+        if isinstance(value, int):
+            ids.add(value)
+        else:
+            names.append(value)
+    return ids, names
+
+
+def save_batch(records, result, author=None):
+    """
+    Сохраняет пакет записей.
+
+    Категории и авторы всего пакета разрешаются одним проходом,
+    рецепты и связи с категориями вставляются через bulk_create
+    в одной транзакции.
+
+    Args:
+        records: Пары (номер строки, словарь записи) после preparse()
+        result: BulkResult для итогов и ошибок
+        author: Автор всех записей (User) или None, чтобы брать
+                имя пользователя из поля author записи
+    """
+    if not records:
+        return
+
+    authors = {}
+    if author is None:
+        usernames = {record.get('author') for _, record in records if record.get('author')}
+        authors = {user.username: user for user in User.objects.filter(username__in=usernames)}
+
+    all_ids, all_names = set(), []
+    for _, record in records:
+        ids, names = _split_categories(record.get('categories') or [])
+        all_ids |= ids
+        all_names.extend(names)
+
+    with transaction.atomic():
+        categories, missing_ids = Category.objects.resolve(ids=all_ids, names=all_names)
+        by_name = {category.name.lower(): category.pk for category in categories}
+
+        recipes, links = [], []
+        for line_number, record in records:
+            recipe_author = author or authors.get(record.get('author'))
+            if recipe_author is None:
+                result.add_error(line_number, f"Автор не найден: {record.get('author') or '-'}")
+                continue
+            ids, names = _split_categories(record.get('categories') or [])
+            if ids & missing_ids:
+                result.add_error(line_number, f'Категории не найдены: {sorted(ids & missing_ids)}')
+                continue
+            recipe = Recipe(author=recipe_author, **{
+                field: record[field] for field in RECIPE_FIELDS if record.get(field) is not None
+            })
+            try:
+                recipe.clean_fields(exclude=['author'])
+            except ValidationError as e:
+                result.add_error(line_number, _validation_message(e))
+                continue
+            category_ids = set(ids)
+            category_ids.update(
+                by_name[key] for key in (Category.normalize_name(name).lower() for name in names)
+                if key in by_name
+            )
+            recipes.append(recipe)
+            links.append(category_ids)
+
+        Recipe.objects.bulk_create(recipes)
+        # bulk_create не отправляет сигналы, поэтому журнал изменений пишется явно
+        RecipeChange.objects.log(recipe.pk for recipe in recipes)
+        through = Recipe.categories.through
+        through.objects.bulk_create([
+            through(recipe_id=recipe.pk, category_id=category_id)
+            for recipe, category_ids in zip(recipes, links)
+            for category_id in category_ids
+        ])
+
+    result.created += len(recipes)
+    result.ids.extend(recipe.pk for recipe in recipes)
+
+
+def import_batch(lines, result, author=None, workers=None):
+    """
+    Импортирует пакет строк NDJSON.
+
+    Args:
+        lines: Пары (номер строки, текст строки)
+        result: BulkResult, в который добавляются итоги пакета
+        author: Автор всех записей или None (см. save_batch)
+        workers: Число процессов разбора (см. preparse)
+    """
+    records = decode_records(lines, result)
+    records = preparse(records, result, workers=workers)
+    save_batch(records, result, author=author)
+
+
+def import_lines(lines, author=None, batch_size=None, workers=None, on_batch=None):
+    """
+    Импортирует строки NDJSON пакетами.
+
+    Args:
+        lines: Итерируемый объект строк
+        author: Автор всех записей или None (см. save_batch)
+        batch_size: Размер пакета (по умолчанию BULK_IMPORT_BATCH_SIZE)
+        workers: Число процессов разбора (см. preparse)
+        on_batch: Функция (номер последней строки, BulkResult), вызываемая
+                  после каждого пакета
+
+    Returns:
+        BulkResult: Итог импорта
+    """
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    result = BulkResult()
+    batch = []
+    for line_number, line in enumerate(lines, 1):
+        batch.append((line_number, line))
+        if len(batch) >= batch_size:
+            import_batch(batch, result, author=author, workers=workers)
+            if on_batch:
+                on_batch(line_number, result)
+            batch = []
+    if batch:
+        import_batch(batch, result, author=author, workers=workers)
+        if on_batch:
+            on_batch(batch[-1][0], result)
+    return result
@@ -0,0 +1,173 @@
+"""
+Кэшированный справочник категорий.
+
+Таблица категорий меняется редко, а читается на каждой странице: форма
+фильтрации на главной, выпадающий список в форме рецепта и API категорий.
+Этот модуль хранит снимок таблицы в памяти процесса и перечитывает его только
+при смене версии справочника.
+
+Версия хранится в кэше Django, поэтому при общем кэше (Redis, Memcached)
+изменение категории в одном воркере сбрасывает снимки во всех остальных.
+Версия меняется сигналами сохранения и удаления Category (см. models.py)
+после фиксации транзакции. С кэшем в памяти процесса (LocMemCache) смену
+версии видит только свой воркер, поэтому снимок дополнительно устаревает
+через CATEGORY_CATALOG_TIMEOUT секунд.
+"""
+
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from monitoring.metrics import registry
+
+VERSION_CACHE_KEY = 'recipes:category_catalog:version'
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок справочника категорий.
+
+    Attributes:
+        version: Версия справочника, для которой загружен снимок
+        categories: Кортеж объектов Category, отсортированных по названию
+        by_id: Словарь {id: Category} для быстрого поиска
+        loaded_at: Время загрузки по time.monotonic()
+    """
+
+    __slots__ = ('version', 'categories', 'by_id', 'loaded_at')
+
+    def __init__(self, version, categories):
+        self.version = version
+        self.categories = tuple(categories)
+        self.by_id = {category.pk: category for category in self.categories}
+        self.loaded_at = time.monotonic()
+
+    def is_current(self, version):
+        """
+        Проверяет, что снимок соответствует версии и не устарел.
+
+        Args:
+            version: Текущая версия справочника
+
+        Returns:
+            bool: Снимок можно использовать без перечитывания таблицы
+        """
+        if self.version != version:
+            return False
+        timeout = settings.CATEGORY_CATALOG_TIMEOUT
+        return not timeout or time.monotonic() - self.loaded_at < timeout
+
+    def choices(self):
+        """Возвращает список пар (id, название) для полей выбора."""
+        return [(category.pk, category.name) for category in self.categories]
+
+
+class CategoryCatalog:
+    """
+    Справочник категорий, загружаемый из БД один раз на версию.
+
+    Объекты Category внутри снимка общие для всех запросов процесса,
+    поэтому их нельзя изменять — только читать.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        """Возвращает текущую версию из кэша, создавая её при отсутствии."""
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def _load(self, version):
+        """Читает таблицу категорий и сохраняет снимок для указанной версии."""
+        from .models import Category
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.is_current(version):
+                return snapshot
+            snapshot = CatalogSnapshot(version, Category.objects.order_by('name'))
+            self._snapshot = snapshot
+            return snapshot
+
+    def snapshot(self):
+        """
+        Возвращает актуальный снимок справочника.
+
+        Returns:
+            CatalogSnapshot: Снимок, соответствующий текущей версии.
+            Обращение к БД происходит только при смене версии или по
+            истечении CATEGORY_CATALOG_TIMEOUT.
+        """
+        version = self._current_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.is_current(version):
+            registry.cache_access('category_catalog', hit=True)
+            return snapshot
+        registry.cache_access('category_catalog', hit=False)
+        return self._load(version)
+
+    async def asnapshot(self):
+        """
+        Асинхронный вариант snapshot().
+
+        Если снимок актуален, он возвращается без обращения к БД;
+        перечитывание таблицы выполняется в потоке синхронного кода.
+        """
+        version = await cache.aget(VERSION_CACHE_KEY)
+        snapshot = self._snapshot
+        if version is not None and snapshot is not None and snapshot.is_current(version):
+            registry.cache_access('category_catalog', hit=True)
+            return snapshot
+        return await sync_to_async(self.snapshot)()
+
+    def all(self):
+        """Возвращает все категории, отсортированные по названию."""
+        return self.snapshot().categories
+
+    def get(self, category_id):
+        """Возвращает категорию по id или None, если её нет."""
+        return self.snapshot().by_id.get(category_id)
+
+    def choices(self):
+        """Возвращает список пар (id, название) для полей выбора."""
+        return self.snapshot().choices()
+
+    def version(self):
+        """Возвращает текущую версию справочника."""
+        return self.snapshot().version
+
+    def invalidate(self):
+        """
+        Сбрасывает снимок и меняет версию справочника.
+
+        Вызывается после фиксации текущей транзакции, чтобы другие воркеры
+        не успели перечитать ещё не зафиксированные данные.
+        """
+        def bump():
+            self._snapshot = None
+            cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+        transaction.on_commit(bump)
+
+
+category_catalog = CategoryCatalog()
+
+
+def category_choices():
+    """
+    Возвращает варианты выбора категорий для полей форм.
+
+    Функция уровня модуля (а не метод) нужна потому, что Django копирует
+    поля формы через deepcopy, а копировать сам справочник нельзя.
+    """
+    return category_catalog.choices()
@@ -0,0 +1,102 @@
+"""
+Счетчики просмотров рецептов с отложенной записью.
+
+Запись в строку счетчика на каждый просмотр страницы рецепта сделала бы
+самое частое чтение конкурирующей записью. Поэтому просмотры
+суммируются в памяти процесса и раз в RECIPE_VIEWS_FLUSH_INTERVAL
+секунд сохраняются фоновым потоком одной вставкой INSERT ... ON CONFLICT
+на пакет рецептов (RecipeStatsManager.add_views).
+
+Просмотры, не сохраненные к моменту остановки процесса, теряются
+(не больше, чем за один период сохранения).
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Максимум различных рецептов, ожидающих сохранения; просмотры остальных отбрасываются
+MAX_PENDING = 50000
+
+# Рецептов в одной вставке
+FLUSH_BATCH_SIZE = 500
+
+
+class ViewCounter:
+    """
+    Накопитель просмотров рецептов процесса.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, recipe_id, count=1):
+        """
+        Учитывает просмотр рецепта (без обращения к БД).
+
+        Args:
+            recipe_id: Идентификатор рецепта
+            count: Число просмотров
+        """
+        with self._lock:
+            if recipe_id not in self._pending and len(self._pending) >= MAX_PENDING:
+                self.dropped += count
+                return
+            self._pending[recipe_id] += count
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='recipe-view-counter', daemon=True)
+                self._thread.start()
+
+    def pending(self):
+        """Возвращает копию несохраненных просмотров {id рецепта: число}."""
+        with self._lock:
+            return dict(self._pending)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.RECIPE_VIEWS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить просмотры рецептов: {e}")
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """
+        Сохраняет накопленные просмотры в RecipeStats.
+
+        При ошибке несохраненные просмотры возвращаются в накопитель
+        и попадут в следующее сохранение.
+
+        Returns:
+            int: Число рецептов, чьи просмотры сохранены
+        """
+        from .models import RecipeStats
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        items = list(pending.items())
+        saved = 0
+        try:
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = dict(items[start:start + FLUSH_BATCH_SIZE])
+                RecipeStats.objects.add_views(batch)
+                saved += len(batch)
+        except Exception:
+            with self._lock:
+                self._pending.update(dict(items[saved:]))
+            raise
+        return saved
+
+
+view_counter = ViewCounter()
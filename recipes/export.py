@@ -0,0 +1,165 @@
+"""
+Потоковая выгрузка каталога рецептов в NDJSON или CSV.
+
+Общий путь для команды export_recipes и эндпоинта GET /api/recipes/export.
+Рецепты читаются итератором QuerySet.iterator(chunk_size): на Postgres
+это серверный курсор, из которого строки забираются порциями по
+EXPORT_CHUNK_SIZE, авторы загружаются в том же запросе, а категории —
+одним запросом на порцию. Порция сразу кодируется (и сжимается gzip),
+поэтому память не зависит от размера каталога.
+
+Формат записи NDJSON совпадает с форматом импорта (recipes/bulk.py):
+автор — имя пользователя, категории — названия.
+
+Инкрементальная выгрузка (since) включает рецепты, измененные позже
+указанного момента. Для следующей выгрузки используется момент начала
+предыдущей (started из export_stream), а не время последней записи,
+чтобы не пропустить рецепты, сохраненные во время выгрузки. updated_at
+назначается при сохранении, а рецепт виден после фиксации транзакции,
+поэтому since сдвигается назад на SYNC_COMMIT_LAG секунд (как в
+recipes/sync.py): рецепты, сохраненные незадолго до since, выгружаются
+повторно, но не пропускаются. Удаленные рецепты в выгрузку не попадают.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Category, Recipe
+
+FORMATS = ('ndjson', 'csv')
+
+# Поля выгрузки в порядке столбцов CSV
+FIELDS = (
+    'id', 'title', 'description', 'ingredients', 'steps', 'preparation_time',
+    'image', 'author', 'categories', 'created_at', 'updated_at',
+)
+
+# Разделитель названий категорий в столбце CSV
+CSV_CATEGORY_SEPARATOR = '|'
+
+
+def export_queryset(since=None, using=DEFAULT_DB_ALIAS):
+    """
+    Выборка рецептов для выгрузки.
+
+    Args:
+        since: Выгружать только рецепты, измененные позже этого момента
+               (с запасом SYNC_COMMIT_LAG)
+        using: Псевдоним базы данных (например, реплики)
+
+    Returns:
+        QuerySet: Рецепты в порядке изменения
+    """
+    queryset = Recipe.objects.using(using).select_related('author').prefetch_related(
+        Prefetch('categories', queryset=Category.objects.using(using).only('name').order_by('name')),
+    )
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since - timedelta(seconds=settings.SYNC_COMMIT_LAG))
+    return queryset.order_by('updated_at', 'id')
+
+
+def serialize(recipe):
+    """
+    Преобразует рецепт в запись выгрузки.
+
+    Args:
+        recipe: Рецепт с загруженными автором и категориями
+
+    Returns:
+        dict: Запись с полями FIELDS
+    """
+    return {
+        'id': recipe.pk,
+        'title': recipe.title,
+        'description': recipe.description,
+        'ingredients': recipe.ingredients,
+        'steps': recipe.steps,
+        'preparation_time': recipe.preparation_time,
+        'image': recipe.image.name or None,
+        'author': recipe.author.username,
+        'categories': [category.name for category in recipe.categories.all()],
+        'created_at': recipe.created_at.isoformat(),
+        'updated_at': recipe.updated_at.isoformat(),
+    }
+
+
+def _encode_ndjson(records):
+    return ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+
+def _encode_csv(records, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+    for record in records:
+        record['categories'] = CSV_CATEGORY_SEPARATOR.join(record['categories'])
+        writer.writerow([record[field] if record[field] is not None else '' for field in FIELDS])
+    return buffer.getvalue()
+
+
+def _batches(iterator, size):
+    """Группирует элементы итератора в списки по size."""
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_stream(since=None, fmt='ndjson', compress=True, chunk_size=None, using=DEFAULT_DB_ALIAS, stats=None):
+    """
+    Выгружает каталог порциями байтов.
+
+    Генератор нужно исчерпать (или закрыть) в том же потоке, где он
+    создан: серверный курсор принадлежит соединению этого потока.
+
+    Args:
+        since: Выгружать только рецепты, измененные позже этого момента
+        fmt: 'ndjson' или 'csv'
+        compress: Сжимать выгрузку gzip
+        chunk_size: Размер порции (по умолчанию EXPORT_CHUNK_SIZE)
+        using: Псевдоним базы данных
+        stats: Словарь, в который записываются started (момент начала
+               выгрузки, используется как since следующей) и count
+
+    Yields:
+        bytes: Очередная порция выгрузки
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат выгрузки: {fmt}')
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    stats = {} if stats is None else stats
+    stats['started'] = timezone.now()
+    stats['count'] = 0
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    if fmt == 'csv':
+        yield encode(_encode_csv([], header=True))
+
+    recipes = export_queryset(since, using=using).iterator(chunk_size=chunk_size)
+    for batch in _batches(recipes, chunk_size):
+        records = [serialize(recipe) for recipe in batch]
+        text = _encode_ndjson(records) if fmt == 'ndjson' else _encode_csv(records)
+        stats['count'] += len(records)
+        data = encode(text)
+        if data:
+            yield data
+
+    if compressor:
+        yield compressor.flush()
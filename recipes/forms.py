@@ -7,7 +7,60 @@
 """
 
 from django import forms
-from .models import Recipe, Category
+from .models import MAX_CATEGORY_ID, Recipe, Category
+from .catalog import category_catalog, category_choices
+from .services import recipe_version, parse_version
+
+class CategoryMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    Поле множественного выбора категорий.
+    
+    Принимает как id существующих категорий, так и названия новых.
+    Значение из цифр — id; название передается с префиксом NAME_PREFIX
+    ("name:2024" — категория с названием "2024"), префикс можно опустить,
+    если название не состоит из одних цифр.
+    Все значения разрешаются одним запросом с IN, а недостающие категории
+    создаются одной пакетной вставкой (см. CategoryManager.resolve).
+    """
+    NAME_PREFIX = 'name:'
+
+    def _check_values(self, value):
+        """
+        Разрешает выбранные значения в объекты Category.
+        
+        Args:
+            value: Список значений из формы (id или названия)
+        
+        Returns:
+            list: Список объектов Category
+        
+        Raises:
+            ValidationError: Если указан id несуществующей категории
+        """
+        ids, names = set(), []
+        for item in value:
+            item = str(item).strip()
+            if item.startswith(self.NAME_PREFIX):
+                names.append(item[len(self.NAME_PREFIX):])
+            elif item.isascii() and item.isdigit():
+                if not 1 <= int(item) <= MAX_CATEGORY_ID:
+                    raise forms.ValidationError(
+                        self.error_messages['invalid_choice'],
+                        code='invalid_choice',
+                        params={'value': item},
+                    )
+                ids.add(int(item))
+            else:
+                names.append(item)
+        categories, missing_ids = Category.objects.resolve(ids=ids, names=names)
+        if missing_ids:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': min(missing_ids)},
+            )
+        return categories
+
 
 class RecipeForm(forms.ModelForm):
     """
@@ -18,6 +71,7 @@ class RecipeForm(forms.ModelForm):
         Meta.fields: Список полей модели для отображения в форме
         Meta.labels: Словарь с пользовательскими названиями полей
         Meta.widgets: Словарь с настройками виджетов для полей
+        Meta.field_classes: Классы полей формы, отличные от стандартных
     
     Fields:
         title: Название рецепта
@@ -27,11 +81,18 @@ class RecipeForm(forms.ModelForm):
         preparation_time: Время приготовления в минутах
         image: Фотография готового блюда
         categories: Связанные категории рецепта
+        version: Версия рецепта для оптимистичной блокировки
     
     Notes:
         - Для текстовых полей используются виджеты Textarea с настроенным размером
         - Поле categories поддерживает множественный выбор категорий
+        - Новые категории в поле categories создаются пакетно, число
+          запросов при сохранении рецепта не зависит от числа категорий
+        - Скрытое поле version хранит updated_at редактируемого рецепта
+          для обнаружения одновременных изменений
     """
+    version = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Recipe
         fields = ['title', 'description', 'ingredients', 'steps', 'preparation_time', 'image', 'categories']
@@ -44,6 +105,9 @@ class RecipeForm(forms.ModelForm):
             'image': 'Изображение',
             'categories': 'Категории',
         }
+        field_classes = {
+            'categories': CategoryMultipleChoiceField,
+        }
         widgets = {
             'description': forms.Textarea(attrs={
                 'rows': 4,
@@ -60,27 +124,41 @@ class RecipeForm(forms.ModelForm):
             }),
         }
 
-    def clean_categories(self):
+    def __init__(self, *args, **kwargs):
+        """
+        Инициализация формы.
+        
+        Варианты выбора категорий берутся из кэшированного справочника,
+        чтобы отрисовка списка не выполняла запрос к БД.
         """
-        Валидация и обработка категорий рецепта.
+        super().__init__(*args, **kwargs)
+        self.fields['categories'].choices = category_choices
+        if self.instance.pk:
+            self.fields['version'].initial = recipe_version(self.instance)
+
+    def clean_version(self):
+        """
+        Разбирает версию рецепта, которую видел пользователь.
         
         Returns:
-            list: Список объектов Category, включая новые категории,
-                  если они были добавлены.
+            datetime | None: Ожидаемое значение updated_at
+        """
+        try:
+            return parse_version(self.cleaned_data.get('version'))
+        except ValueError:
+            raise forms.ValidationError('Некорректная версия рецепта')
+
+    def changed_model_fields(self):
+        """
+        Возвращает имена изменившихся полей модели без учета категорий.
         
-        Notes:
-            Автоматически создает новые категории, если они не существуют
-            в базе данных.
+        Returns:
+            list: Поля для передачи в update_fields
         """
-        categories = self.cleaned_data.get('categories', [])
-        new_categories = []
-        for category in categories:
-            if not Category.objects.filter(name=category.name).exists():
-                new_category = Category.objects.create(name=category.name)
-                new_categories.append(new_category)
-            else:
-                new_categories.append(category)
-        return new_categories
+        return [
+            name for name in self.changed_data
+            if name in self._meta.fields and name != 'categories'
+        ]
 
 
 class CategoryForm(forms.ModelForm):
@@ -109,29 +187,62 @@ class CategoryFilterForm(forms.Form):
     
     Attributes:
         categories: Поле множественного выбора категорий
+        sort: Сортировка рецептов
     
     Fields:
-        categories: ModelMultipleChoiceField для выбора нескольких категорий
+        categories: TypedMultipleChoiceField для выбора нескольких категорий
+        sort: ChoiceField — по названию (по умолчанию) или по популярности
     
     Notes:
         - Использует CheckboxSelectMultiple для удобного выбора категорий
         - Категории отсортированы по алфавиту
         - Поле не является обязательным
+        - Варианты выбора берутся из кэшированного справочника категорий,
+          поэтому отображение формы не обращается к БД
     """
-    categories = forms.ModelMultipleChoiceField(
-        queryset=Category.objects.all().order_by('name'),
+    categories = forms.TypedMultipleChoiceField(
+        choices=category_choices,
+        coerce=int,
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={
             'class': 'form-check-input'
         }),
         label=''
     )
+    sort = forms.ChoiceField(
+        choices=[('title', 'По названию'), ('popular', 'Популярные')],
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'form-select form-select-sm'
+        }),
+        label='Сортировка'
+    )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, snapshot=None, **kwargs):
         """
         Инициализация формы.
         
-        Настраивает отображение названий категорий в списке выбора.
+        Args:
+            snapshot: Заранее полученный снимок справочника категорий.
+                Асинхронные представления передают снимок из
+                category_catalog.asnapshot(), чтобы проверка и отрисовка
+                формы не обращались к БД.
         """
         super().__init__(*args, **kwargs)
-        self.fields['categories'].label_from_instance = lambda obj: obj.name
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.fields['categories'].choices = snapshot.choices()
+
+    def clean_categories(self):
+        """
+        Преобразует выбранные id категорий в объекты Category.
+        
+        Returns:
+            list: Список объектов Category из справочника.
+        """
+        snapshot = self.snapshot or category_catalog.snapshot()
+        return [
+            snapshot.by_id[category_id]
+            for category_id in self.cleaned_data.get('categories', [])
+            if category_id in snapshot.by_id
+        ]
@@ -0,0 +1,64 @@
+"""
+Команда расчета похожих рецептов.
+
+Без опций пересчитывает списки всего каталога. С --incremental
+пересчитывает только списки, затронутые изменениями рецептов после
+предыдущего расчета (по журналу RecipeChange); если расчета еще не было
+или журнал за этот период уже сжат, выполняется полный пересчет.
+Признаки всего каталога при этом все равно загружаются и векторизуются
+(веса IDF зависят от всего каталога): экономится только поиск соседей.
+Команду достаточно запускать по расписанию: полный пересчет — раз
+в сутки, инкрементальный — каждые несколько минут.
+
+Использование:
+    python manage.py build_similar
+    python manage.py build_similar --incremental
+    python manage.py build_similar --recipe 12 --recipe 15
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes import similarity
+from recipes.models import SimilarRecipe
+
+
+class Command(BaseCommand):
+    help = 'Расчет похожих рецептов (TF-IDF по ингредиентам, категориям и названиям)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Пересчитать только списки, затронутые изменениями после прошлого расчета '
+                                 '(векторизуется по-прежнему весь каталог)')
+        parser.add_argument('--recipe', type=int, action='append', dest='recipes',
+                            help='Пересчитать списки, затронутые изменением рецепта (можно несколько раз)')
+        parser.add_argument('--top-k', type=int, default=None,
+                            help=f'Число похожих рецептов (по умолчанию {settings.SIMILAR_RECIPES_TOP_K})')
+
+    def handle(self, *args, **options):
+        k = options['top_k']
+        if k is not None and k < 1:
+            raise CommandError('Число похожих рецептов должно быть больше нуля')
+
+        start = time.perf_counter()
+        recipe_ids = options['recipes']
+        if recipe_ids is None and options['incremental']:
+            previous = SimilarRecipe.objects.aggregate(previous=Max('computed_at'))['previous']
+            retention = timezone.now() - timedelta(days=settings.SYNC_RETENTION_DAYS)
+            if previous is not None and previous > retention:
+                recipe_ids = similarity.changed_since(previous)
+
+        if recipe_ids is None:
+            result = similarity.build(k)
+            self.stdout.write(f"Полный пересчет: рецептов {result['recipes']}")
+        else:
+            result = similarity.update(recipe_ids, k)
+            self.stdout.write(f"Изменено рецептов: {len(recipe_ids)}, пересчитано списков: {result['recipes']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Сохранено записей: {result['saved']} за {time.perf_counter() - start:.1f} с"
+        ))
@@ -0,0 +1,72 @@
+"""
+Команда выгрузки каталога рецептов в NDJSON или CSV.
+
+Каталог читается серверным курсором порциями (см. recipes/export.py),
+поэтому память не зависит от размера каталога. Формат определяется
+по расширению файла (.ndjson, .csv, с .gz — со сжатием) или опциями,
+'-' означает стандартный вывод. Для инкрементальной выгрузки передается
+момент начала предыдущей (команда выводит его в конце работы).
+
+Использование:
+    python manage.py export_recipes recipes.ndjson.gz
+    python manage.py export_recipes changes.csv --since 2024-05-01T03:00:00+00:00
+    python manage.py export_recipes - --format csv --database replica | wc -l
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from recipes import export
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка каталога рецептов в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки ('-' — стандартный вывод)")
+        parser.add_argument('--format', choices=export.FORMATS, default=None,
+                            help='Формат (по умолчанию по расширению файла, иначе ndjson)')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать выгрузку (включено для файлов .gz)')
+        parser.add_argument('--since', default=None,
+                            help='Выгружать рецепты, измененные позже этого момента (ISO 8601)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Размер порции курсора')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='База данных (например, реплика)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['format'] or ('csv' if name.endswith('.csv') else 'ndjson')
+        compress = options['gzip'] or path.endswith('.gz')
+
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Некорректная дата: {options['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        stats = {}
+        chunks = export.export_stream(
+            since=since, fmt=fmt, compress=compress,
+            chunk_size=options['chunk_size'], using=options['database'], stats=stats,
+        )
+        try:
+            output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if path != '-':
+                output.close()
+
+        # При выводе в stdout отчет уходит в stderr, чтобы не смешиваться с данными
+        report = self.stderr if path == '-' else self.stdout
+        report.write(self.style.SUCCESS(f"Выгружено рецептов: {stats['count']}"))
+        report.write(f"Для следующей выгрузки: --since {stats['started'].isoformat()}")
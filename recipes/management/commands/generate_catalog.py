@@ -0,0 +1,211 @@
+"""
+Команда генерации синтетического каталога рецептов.
+
+Создает пользователей, категории и рецепты с многоблочными текстами
+ингредиентов и шагов на русском языке в том же формате, который
+разбирают фильтры parse_ingredients и parse_steps. Популярность
+категорий распределена неравномерно, как на настоящем сайте.
+
+Использование:
+    python manage.py generate_catalog --recipes 5000 --seed 42
+"""
+
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import Category, Recipe, RecipeChange
+
+CATEGORY_NAMES = (
+    'Завтраки', 'Супы', 'Салаты', 'Выпечка', 'Десерты', 'Горячее', 'Закуски',
+    'Напитки', 'Соусы', 'Гарниры', 'Вегетарианское', 'Постное', 'Рыба',
+    'Мясо', 'Птица', 'Каши', 'Блины', 'Пироги', 'Заготовки', 'Детское меню',
+    'Праздничное', 'Быстрые рецепты', 'Итальянская кухня', 'Грузинская кухня',
+    'Азиатская кухня', 'Русская кухня', 'Французская кухня', 'Без глютена',
+    'Пицца', 'Паста',
+)
+
+DISHES = (
+    'борщ', 'щи', 'солянка', 'плов', 'пирог с капустой', 'пирог с яблоками',
+    'сырники', 'блины', 'оладьи', 'котлеты', 'голубцы', 'пельмени', 'вареники',
+    'омлет', 'запеканка', 'рагу', 'гуляш', 'салат оливье', 'винегрет',
+    'окрошка', 'уха', 'шарлотка', 'медовик', 'наполеон', 'хачапури', 'лазанья',
+    'ризотто', 'паста карбонара', 'курица с картофелем', 'рыба в кляре',
+    'гречка с грибами', 'тыквенный суп', 'морс', 'компот', 'кулебяка',
+)
+
+STYLES = (
+    'по-домашнему', 'по-бабушкиному', 'с зеленью', 'на скорую руку',
+    'в духовке', 'на сковороде', 'в мультиварке', 'по-деревенски',
+    'праздничный', 'постный', 'с сыром', 'по старинному рецепту',
+)
+
+DESCRIPTIONS = (
+    'Простой и сытный рецепт для всей семьи.',
+    'Готовится быстро, а получается очень вкусно.',
+    'Этот рецепт передается в нашей семье из поколения в поколение.',
+    'Отлично подходит для праздничного стола.',
+    'Легкое блюдо, которое понравится даже детям.',
+    'Секрет вкуса — в свежих продуктах и терпении.',
+    'Можно приготовить заранее и разогреть перед подачей.',
+    'Подавайте горячим со сметаной и свежим хлебом.',
+)
+
+INGREDIENT_BLOCKS = (
+    'Для теста', 'Для начинки', 'Для соуса', 'Для бульона', 'Для крема',
+    'Для маринада', 'Для украшения', 'Для подачи',
+)
+
+INGREDIENTS = (
+    ('мука', 'г'), ('сахар', 'г'), ('соль', 'ч.л.'), ('молоко', 'мл'),
+    ('яйцо', 'шт.'), ('сливочное масло', 'г'), ('растительное масло', 'ст.л.'),
+    ('картофель', 'шт.'), ('морковь', 'шт.'), ('лук репчатый', 'шт.'),
+    ('чеснок', 'зубчик'), ('капуста', 'г'), ('свекла', 'шт.'), ('говядина', 'г'),
+    ('свинина', 'г'), ('куриное филе', 'г'), ('творог', 'г'), ('сметана', 'г'),
+    ('сыр', 'г'), ('томатная паста', 'ст.л.'), ('рис', 'г'), ('гречка', 'г'),
+    ('грибы', 'г'), ('укроп', 'пучок'), ('петрушка', 'пучок'), ('вода', 'мл'),
+    ('яблоки', 'шт.'), ('мед', 'ст.л.'), ('перец черный молотый', 'по вкусу'),
+)
+
+STEP_BLOCKS = (
+    'Подготовка', 'Приготовление теста', 'Приготовление начинки',
+    'Приготовление соуса', 'Сборка', 'Выпечка', 'Подача',
+)
+
+STEP_ACTIONS = (
+    'Вымыть и очистить овощи', 'Мелко нарезать лук', 'Натереть морковь на терке',
+    'Смешать сухие ингредиенты', 'Взбить яйца с сахаром', 'Растопить масло',
+    'Добавить муку и замесить тесто', 'Обжарить до золотистой корочки',
+    'Тушить под крышкой 20 минут', 'Посолить и поперчить по вкусу',
+    'Выложить в форму', 'Запекать при 180°C 40 минут', 'Довести до кипения',
+    'Варить на медленном огне', 'Дать настояться 15 минут', 'Украсить зеленью',
+    'Нарезать порционными кусками', 'Подавать горячим',
+)
+
+DEFAULT_PASSWORD = 'recipe-bench'
+
+
+class Command(BaseCommand):
+    """
+    Генерирует синтетический каталог рецептов.
+
+    Пользователи создаются с общим паролем (--password), чтобы их можно
+    было использовать в нагрузочных сценариях с входом на сайт.
+    """
+    help = 'Создает синтетический каталог: пользователей, категории и рецепты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000, help='Число рецептов')
+        parser.add_argument('--users', type=int, default=None,
+                            help='Число авторов (по умолчанию — один на 20 рецептов)')
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES),
+                            help='Число категорий')
+        parser.add_argument('--images', type=float, default=0.7,
+                            help='Доля рецептов с изображением (0..1)')
+        parser.add_argument('--seed', type=int, default=None, help='Начальное значение генератора')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Пароль созданных пользователей')
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пакета вставки')
+
+    def handle(self, *args, **options):
+        if options['recipes'] < 0 or options['categories'] < 1:
+            raise CommandError('Число рецептов не может быть отрицательным, а категорий должно быть больше нуля')
+        rng = random.Random(options['seed'])
+        users = self.create_users(options['users'] or max(1, options['recipes'] // 20), options['password'])
+        categories = self.create_categories(options['categories'])
+        self.create_recipes(rng, options['recipes'], users, categories,
+                            options['images'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано рецептов: {options['recipes']}, авторов: {len(users)}, "
+            f"категорий: {len(categories)}. Пароль пользователей: {options['password']}"
+        ))
+
+    def create_users(self, count, password):
+        """
+        Создает недостающих авторов cook1..cookN.
+
+        Хеш пароля вычисляется один раз и используется для всех пользователей.
+        """
+        names = [f'cook{index}' for index in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+        password_hash = make_password(password)
+        User.objects.bulk_create(
+            [User(username=name, password=password_hash) for name in names if name not in existing]
+        )
+        return list(User.objects.filter(username__in=names))
+
+    def create_categories(self, count):
+        """Создает категории (без учета регистра повторно не создаются)."""
+        names = [
+            CATEGORY_NAMES[index] if index < len(CATEGORY_NAMES)
+            else f'{CATEGORY_NAMES[index % len(CATEGORY_NAMES)]} {index // len(CATEGORY_NAMES) + 1}'
+            for index in range(count)
+        ]
+        categories, _ = Category.objects.resolve(names=names)
+        return categories
+
+    def create_recipes(self, rng, count, users, categories, image_share, batch_size):
+        """
+        Создает рецепты пакетами вместе со связями с категориями.
+
+        Популярность категорий убывает по закону Ципфа: первые категории
+        встречаются заметно чаще последних.
+        """
+        weights = [1 / (rank + 1) for rank in range(len(categories))]
+        through = Recipe.categories.through
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            recipes = [self.make_recipe(rng, created + index, users, image_share) for index in range(size)]
+            with transaction.atomic():
+                Recipe.objects.bulk_create(recipes)
+                RecipeChange.objects.log(recipe.pk for recipe in recipes)
+                links = []
+                for recipe in recipes:
+                    chosen = set()
+                    for _ in range(rng.randint(1, min(4, len(categories)))):
+                        chosen.add(rng.choices(categories, weights)[0].pk)
+                    links.extend(through(recipe_id=recipe.pk, category_id=pk) for pk in chosen)
+                through.objects.bulk_create(links)
+            created += size
+            self.stdout.write(f'  рецептов: {created}/{count}')
+
+    def make_recipe(self, rng, number, users, image_share):
+        """Создает (не сохраняя) один рецепт."""
+        title = f'{rng.choice(DISHES).capitalize()} {rng.choice(STYLES)}'
+        return Recipe(
+            title=title,
+            description=' '.join(rng.sample(DESCRIPTIONS, rng.randint(1, 3))),
+            ingredients=self.make_ingredients(rng),
+            steps=self.make_steps(rng),
+            preparation_time=rng.randrange(10, 181, 5),
+            image=f'recipes/bench-{number}.jpg' if rng.random() < image_share else None,
+            author=rng.choice(users),
+        )
+
+    def make_ingredients(self, rng):
+        """Текст ингредиентов из 1-3 блоков с заголовками."""
+        blocks = []
+        for title in rng.sample(INGREDIENT_BLOCKS, rng.randint(1, 3)):
+            lines = [f'{title}:']
+            for name, unit in rng.sample(INGREDIENTS, rng.randint(3, 8)):
+                if unit == 'по вкусу':
+                    lines.append(f'- {name} по вкусу')
+                else:
+                    amount = rng.choice((1, 2, 3)) if unit in ('шт.', 'ч.л.', 'ст.л.', 'зубчик', 'пучок') \
+                        else rng.randrange(50, 1001, 50)
+                    lines.append(f'- {name} — {amount} {unit}')
+            blocks.append('\n'.join(lines))
+        return '\n\n'.join(blocks)
+
+    def make_steps(self, rng):
+        """Текст шагов: этапы с подшагами и нумерованные шаги."""
+        blocks = []
+        for title in rng.sample(STEP_BLOCKS, rng.randint(1, 3)):
+            substeps = [f'- {action}' for action in rng.sample(STEP_ACTIONS, rng.randint(2, 5))]
+            blocks.append('\n'.join([f'{title}:', *substeps]))
+        numbered = rng.sample(STEP_ACTIONS, rng.randint(2, 6))
+        blocks.append('\n'.join(f'{index}. {action}' for index, action in enumerate(numbered, 1)))
+        return '\n\n'.join(blocks)
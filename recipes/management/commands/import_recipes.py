@@ -0,0 +1,82 @@
+"""
+Команда пакетного импорта рецептов из NDJSON.
+
+Каждая строка файла — JSON-объект рецепта (формат описан в recipes/bulk.py).
+Автор берется из поля author записи или задается для всех записей
+опцией --author. Файлы с расширением .gz читаются со сжатием,
+'-' означает стандартный ввод.
+
+Использование:
+    python manage.py import_recipes recipes.ndjson --author admin
+    python manage.py import_recipes dump.ndjson.gz --batch-size 1000 --workers 4
+"""
+
+import gzip
+import io
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import bulk, textparse
+
+
+class Command(BaseCommand):
+    help = 'Пакетный импорт рецептов из файла NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл NDJSON (.gz со сжатием, '-' — стандартный ввод)")
+        parser.add_argument('--author', default=None,
+                            help='Имя пользователя — автора всех рецептов (по умолчанию поле author записи)')
+        parser.add_argument('--batch-size', type=int, default=settings.BULK_IMPORT_BATCH_SIZE,
+                            help='Размер пакета')
+        parser.add_argument('--workers', type=int, default=settings.BULK_IMPORT_WORKERS,
+                            help='Число процессов разбора текстов (0 — без пула)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('Размер пакета должен быть больше нуля')
+
+        author = None
+        if options['author']:
+            try:
+                author = User.objects.get(username=options['author'])
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь не найден: {options['author']}")
+
+        stream = self._open(options['path'])
+        try:
+            result = bulk.import_lines(
+                stream,
+                author=author,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                on_batch=self._progress,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            textparse.pool.shutdown()
+
+        for error in result.as_dict()['errors']:
+            self.stderr.write(f"  строка {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {result.created}, ошибок: {len(result.errors)}'
+        ))
+
+    def _progress(self, line_number, result):
+        """Выводит прогресс после каждого пакета."""
+        self.stdout.write(f'  строк: {line_number}, создано: {result.created}, ошибок: {len(result.errors)}')
+
+    @staticmethod
+    def _open(path):
+        """Открывает входной файл как текстовый поток."""
+        if path == '-':
+            return sys.stdin
+        try:
+            if path.endswith('.gz'):
+                return io.TextIOWrapper(gzip.open(path), encoding='utf-8')
+            return open(path, encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
@@ -0,0 +1,25 @@
+"""
+Команда пересчета популярности рецептов.
+
+Популярность — сумма просмотров с затуханием: просмотр теряет половину
+веса за RECIPE_POPULARITY_HALF_LIFE_HOURS часов. Пересчет выполняется
+одним запросом UPDATE (см. RecipeStatsManager.update_popularity),
+команду достаточно запускать по расписанию, например раз в час.
+Учитываются просмотры, уже сохраненные процессами сайта
+(см. recipes/counters.py).
+
+Использование:
+    python manage.py update_popularity
+"""
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import RecipeStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчет популярности рецептов по просмотрам'
+
+    def handle(self, *args, **options):
+        updated = RecipeStats.objects.update_popularity()
+        self.stdout.write(self.style.SUCCESS(f"Популярность пересчитана для рецептов: {updated}"))
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    """
+    Объединяет категории, названия которых совпадают без учёта регистра
+    и лишних пробелов, перед добавлением ограничения уникальности.
+    """
+    Category = apps.get_model('recipes', 'Category')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Through = Recipe.categories.through
+
+    kept = {}
+    for category in Category.objects.order_by('id'):
+        name = ' '.join(category.name.split())
+        key = name.lower()
+        if key not in kept:
+            kept[key] = category.id
+            if name != category.name:
+                Category.objects.filter(id=category.id).update(name=name)
+            continue
+
+        target_id = kept[key]
+        linked = set(
+            Through.objects.filter(category_id=target_id).values_list('recipe_id', flat=True)
+        )
+        for row in Through.objects.filter(category_id=category.id):
+            if row.recipe_id not in linked:
+                Through.objects.create(recipe_id=row.recipe_id, category_id=target_id)
+        category.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_alter_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='recipes_category_name_ci_unique', violation_error_message='Категория с таким названием уже существует'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Поля поиска в админке (RecipeAdmin.search_fields). Django выполняет
+# icontains как UPPER(поле::text) LIKE UPPER(%s), поэтому индексы
+# построены по тому же выражению.
+SEARCH_FIELDS = ('title', 'description', 'steps')
+
+
+def index_name(field):
+    return f'recipes_recipe_{field}_trgm'
+
+
+def create_trgm_indexes(apps, schema_editor):
+    """
+    Создает триграммные GIN-индексы для поиска по подстроке (только Postgres).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(field)} '
+            f'ON recipes_recipe USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name(field)}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0006_category_name_ci_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
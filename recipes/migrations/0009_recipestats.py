@@ -0,0 +1,29 @@
+# Generated by Django 5.0.10 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('views', models.BigIntegerField(default=0, verbose_name='Просмотры')),
+                ('scored_views', models.BigIntegerField(default=0, verbose_name='Учтено в популярности')),
+                ('popularity', models.FloatField(db_index=True, default=0, verbose_name='Популярность')),
+                ('last_viewed_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний просмотр')),
+                ('scored_at', models.DateTimeField(blank=True, null=True, verbose_name='Пересчет популярности')),
+            ],
+            options={
+                'verbose_name': 'Статистика рецепта',
+                'verbose_name_plural': 'Статистика рецептов',
+            },
+        ),
+    ]
@@ -5,6 +5,8 @@
 Модели:
     - Category: Модель для хранения категорий рецептов
     - Recipe: Основная модель для хранения рецептов
+    - RecipeChange: Журнал изменений рецептов для синхронизации клиентов
+    - RevokedToken: Отозванные токены доступа API
 
 Примечания:
     - Все поля имеют подробные help_text для административного интерфейса
@@ -12,13 +14,111 @@
     - Настроены мета-классы для корректного отображения в админке
 """
 
-from django.db import models
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Exists, F, Max, OuterRef
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.utils import timezone
-import cloudinary
-import cloudinary.uploader
-from django.db.models.signals import pre_delete
+from django.db.models.signals import m2m_changed, pre_delete, post_save, post_delete
 from django.dispatch import receiver
+from .catalog import category_catalog
+from .storage import destroy_image
+
+# Наибольший id категории (BigAutoField)
+MAX_CATEGORY_ID = 2 ** 63 - 1
+
+
+class CategoryManager(models.Manager):
+    """
+    Менеджер категорий с пакетным поиском и созданием.
+    """
+
+    def _name_keys(self, names):
+        """Нормализует названия: {название в нижнем регистре: название}."""
+        keys = {}
+        for name in names:
+            name = self.model.normalize_name(name)
+            if name:
+                keys.setdefault(name.lower(), name)
+        return keys
+
+    @staticmethod
+    def _name_lookup(names):
+        """
+        Условие поиска категорий по названиям без учёта регистра.
+
+        Регистр приводится функцией БД с обеих сторон, чтобы сравнение
+        совпадало с уникальным индексом по Lower('name').
+        """
+        return Q(name_key__in=[Lower(Value(name)) for name in names])
+
+    def _find(self, ids, names):
+        """Выборка категорий по id или названиям без учёта регистра."""
+        return self.annotate(name_key=Lower('name')).filter(Q(pk__in=ids) | self._name_lookup(names))
+
+    def _missing(self, keys, found):
+        """Новые категории для названий keys, которых нет среди found."""
+        found_keys = {category.name.lower() for category in found}
+        return [self.model(name=name) for key, name in keys.items() if key not in found_keys]
+
+    def resolve(self, ids=(), names=()):
+        """
+        Находит категории по id и названиям, создавая недостающие.
+        
+        Все категории ищутся одним запросом с IN, а отсутствующие названия
+        создаются одной пакетной вставкой с игнорированием конфликтов,
+        поэтому число запросов не зависит от количества категорий,
+        а параллельное создание одинаковых названий не приводит к дублям.
+        
+        Args:
+            ids: Идентификаторы существующих категорий
+            names: Названия категорий (сравниваются без учёта регистра)
+        
+        Returns:
+            tuple: (список найденных и созданных категорий,
+                    множество id, которых нет в базе)
+        """
+        ids, keys = set(ids), self._name_keys(names)
+        if not ids and not keys:
+            return [], set()
+
+        found = list(self._find(ids, keys.values()))
+        missing = self._missing(keys, found)
+        if missing:
+            self.bulk_create(missing, ignore_conflicts=True)
+            found.extend(self._find((), [category.name for category in missing]))
+            category_catalog.invalidate()
+        return found, ids - {category.pk for category in found}
+
+    async def aresolve(self, ids=(), names=()):
+        """
+        Асинхронный вариант resolve() на асинхронном API ORM.
+
+        Args:
+            ids: Идентификаторы существующих категорий
+            names: Названия категорий (сравниваются без учёта регистра)
+
+        Returns:
+            tuple: (список найденных и созданных категорий,
+                    множество id, которых нет в базе)
+        """
+        ids, keys = set(ids), self._name_keys(names)
+        if not ids and not keys:
+            return [], set()
+
+        found = [category async for category in self._find(ids, keys.values())]
+        missing = self._missing(keys, found)
+        if missing:
+            await self.abulk_create(missing, ignore_conflicts=True)
+            found.extend([category async for category in self._find((), [category.name for category in missing])])
+            await sync_to_async(category_catalog.invalidate)()
+        return found, ids - {category.pk for category in found}
+
 
 class Category(models.Model):
     """
@@ -29,10 +129,13 @@ class Category(models.Model):
     
     Методы:
         __str__: Возвращает строковое представление категории.
+        normalize_name: Приводит название к каноническому виду.
+        save: Переопределенный метод сохранения для нормализации названия.
     
     Мета:
         verbose_name: Человекочитаемое название модели в единственном числе
         verbose_name_plural: Человекочитаемое название модели во множественном числе
+        constraints: Уникальность названия без учёта регистра
     """
     name = models.CharField(
         max_length=100,
@@ -40,14 +143,41 @@ class Category(models.Model):
         verbose_name="Название категории"
     )
 
+    objects = CategoryManager()
+
     def __str__(self):
         """Возвращает строковое представление объекта Category."""
         return self.name
+
+    @staticmethod
+    def normalize_name(name):
+        """
+        Убирает пробелы по краям и схлопывает повторяющиеся пробелы.
+        
+        Args:
+            name: Исходное название категории
+        
+        Returns:
+            str: Нормализованное название
+        """
+        return ' '.join((name or '').split())
+
+    def save(self, *args, **kwargs):
+        """Сохраняет категорию с нормализованным названием."""
+        self.name = self.normalize_name(self.name)
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
         ordering = ['name']  # Сортировка по имени
+        constraints = [
+            models.UniqueConstraint(
+                Lower('name'),
+                name='recipes_category_name_ci_unique',
+                violation_error_message="Категория с таким названием уже существует",
+            ),
+        ]
 
 class Recipe(models.Model):
     """
@@ -134,6 +264,299 @@ class Recipe(models.Model):
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ['-created_at']  # Сортировка по дате создания (сначала новые)
+        indexes = [
+            # Выгрузка в порядке изменения и инкрементальная выгрузка (recipes/export.py)
+            models.Index(fields=['updated_at', 'id'], name='recipes_recipe_updated_idx'),
+        ]
+
+
+class RecipeChangeManager(models.Manager):
+    """Менеджер журнала изменений рецептов."""
+
+    def log(self, recipe_ids, deleted=False):
+        """
+        Записывает изменения рецептов одной пакетной вставкой.
+
+        Вставка выполняется в текущей транзакции, поэтому запись журнала
+        фиксируется или откатывается вместе с изменением рецепта. Каждые
+        SYNC_COMPACT_EVERY записей после фиксации запускается compact().
+
+        Args:
+            recipe_ids: Идентификаторы измененных рецептов
+            deleted: Рецепты удалены (записи-надгробия)
+        """
+        now = timezone.now()
+        changes = [self.model(recipe_id=recipe_id, deleted=deleted, changed_at=now)
+                   for recipe_id in dict.fromkeys(recipe_ids)]
+        if len(changes) == 1:
+            # Одиночная вставка без пакетной обертки в транзакцию
+            changes[0].save(force_insert=True, using=self.db)
+        elif changes:
+            self.bulk_create(changes)
+        every = settings.SYNC_COMPACT_EVERY
+        if changes and changes[0].pk is not None and (changes[0].pk - 1) // every != changes[-1].pk // every:
+            transaction.on_commit(self.compact)
+
+    def compact(self):
+        """
+        Сжимает журнал.
+
+        Удаляет записи, у рецепта которых есть более поздняя запись
+        (клиенту достаточно последней), и записи старше SYNC_RETENTION_DAYS
+        с запасом в сутки: токены такого возраста уже отклоняются
+        (см. recipes/sync.py), поэтому эти записи никому не нужны.
+
+        Returns:
+            int: Число удаленных записей
+        """
+        superseded = self.filter(recipe_id=OuterRef('recipe_id'), pk__gt=OuterRef('pk'))
+        removed, _ = self.filter(Exists(superseded)).delete()
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_RETENTION_DAYS + 1)
+        expired, _ = self.filter(changed_at__lt=cutoff).delete()
+        return removed + expired
+
+
+class RecipeChange(models.Model):
+    """
+    Запись журнала изменений рецептов.
+
+    Журнал ведут сигналы сохранения и удаления Recipe, изменения связей
+    с категориями и изменения категорий (см. ниже), а также пакетный
+    импорт. Порядковый номер записи (id) служит позицией синхронизации
+    в токене /api/recipes/changes (см. recipes/sync.py).
+
+    Атрибуты:
+        recipe_id (BigIntegerField): Идентификатор рецепта (без внешнего
+            ключа: запись остается после удаления рецепта)
+        deleted (BooleanField): Рецепт удален (надгробие)
+        changed_at (DateTimeField): Время изменения
+    """
+    recipe_id = models.BigIntegerField(verbose_name="Рецепт")
+    deleted = models.BooleanField(default=False, verbose_name="Удален")
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Время изменения")
+
+    objects = RecipeChangeManager()
+
+    def __str__(self):
+        """Возвращает строковое представление записи журнала."""
+        return f"{'-' if self.deleted else '+'}{self.recipe_id} ({self.changed_at:%Y-%m-%d %H:%M:%S})"
+
+    class Meta:
+        verbose_name = "Изменение рецепта"
+        verbose_name_plural = "Изменения рецептов"
+        indexes = [
+            # Поиск более поздних записей того же рецепта при сжатии журнала
+            models.Index(fields=['recipe_id', 'id'], name='recipes_change_recipe_idx'),
+        ]
+
+class RecipeStatsManager(models.Manager):
+    """Менеджер счетчиков просмотров рецептов."""
+
+    def add_views(self, counts, viewed_at=None):
+        """
+        Прибавляет просмотры рецептов одной вставкой INSERT ... ON CONFLICT.
+
+        Строки счетчиков создаются при первом просмотре, существующие
+        увеличиваются в той же вставке. Рецепты, удаленные до сохранения
+        просмотров, пропускаются.
+
+        Args:
+            counts: Словарь {id рецепта: число просмотров}
+            viewed_at: Время последнего просмотра (по умолчанию сейчас)
+
+        Returns:
+            int: Число вставленных или обновленных строк
+        """
+        if not counts:
+            return 0
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        table = quote_name(opts.db_table)
+        recipe_table = quote_name(Recipe._meta.db_table)
+        column = {name: quote_name(opts.get_field(name).column)
+                  for name in ('recipe', 'views', 'scored_views', 'popularity', 'last_viewed_at')}
+        viewed_at = connection.ops.adapt_datetimefield_value(viewed_at or timezone.now())
+        cases = ' '.join(['WHEN %s THEN %s'] * len(counts))
+        placeholders = ', '.join(['%s'] * len(counts))
+        # WHERE перед ON CONFLICT обязателен для SQLite при INSERT ... SELECT
+        sql = (
+            f"INSERT INTO {table} ({column['recipe']}, {column['views']}, {column['scored_views']}, "
+            f"{column['popularity']}, {column['last_viewed_at']}) "
+            f"SELECT r.id, CASE r.id {cases} END, 0, 0, %s FROM {recipe_table} r WHERE r.id IN ({placeholders}) "
+            f"ON CONFLICT ({column['recipe']}) DO UPDATE SET "
+            f"{column['views']} = {table}.{column['views']} + excluded.{column['views']}, "
+            f"{column['last_viewed_at']} = excluded.{column['last_viewed_at']}"
+        )
+        params = [value for item in counts.items() for value in item] + [viewed_at, *counts]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def update_popularity(self, now=None):
+        """
+        Пересчитывает популярность рецептов одним запросом UPDATE.
+
+        Популярность — сумма просмотров, в которой каждый просмотр
+        затухает вдвое за RECIPE_POPULARITY_HALF_LIFE_HOURS часов:
+        прежнее значение уменьшается на время с предыдущего пересчета,
+        и к нему прибавляются просмотры, накопленные с тех пор.
+
+        Args:
+            now: Время пересчета (по умолчанию сейчас)
+
+        Returns:
+            int: Число обновленных строк
+        """
+        now = now or timezone.now()
+        previous = self.aggregate(previous=Max('scored_at'))['previous']
+        decay = 1.0
+        if previous is not None:
+            hours = max((now - previous).total_seconds(), 0) / 3600
+            decay = 0.5 ** (hours / settings.RECIPE_POPULARITY_HALF_LIFE_HOURS)
+        return self.update(
+            popularity=F('popularity') * decay + F('views') - F('scored_views'),
+            scored_views=F('views'),
+            scored_at=now,
+        )
+
+
+class RecipeStats(models.Model):
+    """
+    Счетчики просмотров и популярность рецепта.
+
+    Просмотры накапливаются в памяти процесса и сохраняются пакетами
+    (см. recipes/counters.py), популярность пересчитывает команда
+    update_popularity.
+
+    Атрибуты:
+        recipe (OneToOneField): Рецепт
+        views (BigIntegerField): Всего просмотров
+        scored_views (BigIntegerField): Просмотров на момент пересчета популярности
+        popularity (FloatField): Популярность с затуханием по времени
+        last_viewed_at (DateTimeField): Время последнего сохраненного просмотра
+        scored_at (DateTimeField): Время пересчета популярности
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="Рецепт"
+    )
+    views = models.BigIntegerField(default=0, verbose_name="Просмотры")
+    scored_views = models.BigIntegerField(default=0, verbose_name="Учтено в популярности")
+    popularity = models.FloatField(default=0, db_index=True, verbose_name="Популярность")
+    last_viewed_at = models.DateTimeField(null=True, blank=True, verbose_name="Последний просмотр")
+    scored_at = models.DateTimeField(null=True, blank=True, verbose_name="Пересчет популярности")
+
+    objects = RecipeStatsManager()
+
+    def __str__(self):
+        """Возвращает строковое представление счетчиков."""
+        return f"{self.recipe_id}: {self.views} просмотров, популярность {self.popularity:.1f}"
+
+    class Meta:
+        verbose_name = "Статистика рецепта"
+        verbose_name_plural = "Статистика рецептов"
+
+
+class SimilarRecipe(models.Model):
+    """
+    Похожий рецепт из заранее рассчитанного списка.
+
+    Списки строит команда build_similar (см. recipes/similarity.py):
+    для каждого рецепта хранятся SIMILAR_RECIPES_TOP_K ближайших по
+    ингредиентам, категориям и названию. Страница рецепта и API читают
+    список одним запросом.
+
+    Атрибуты:
+        recipe (ForeignKey): Рецепт, для которого построен список
+        similar (ForeignKey): Похожий рецепт
+        rank (PositiveSmallIntegerField): Место в списке (с 1)
+        score (FloatField): Косинусная близость векторов TF-IDF
+        computed_at (DateTimeField): Время расчета
+    """
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar_recipes', verbose_name="Рецепт"
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='+', verbose_name="Похожий рецепт"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Место")
+    score = models.FloatField(verbose_name="Близость")
+    computed_at = models.DateTimeField(db_index=True, verbose_name="Время расчета")
+
+    def __str__(self):
+        """Возвращает строковое представление записи."""
+        return f"{self.recipe_id} ~ {self.similar_id} ({self.score:.2f})"
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        ordering = ['recipe', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'rank'], name='recipes_similar_recipe_rank_uniq'),
+        ]
+
+
+class RevokedTokenManager(models.Manager):
+    """Менеджер списка отозванных токенов API."""
+
+    async def arevoke(self, jti, expires_at):
+        """
+        Заносит токен в список отозванных и удаляет истекшие записи.
+
+        Истекшие токены отклоняются при проверке подписи (см. api/auth.py),
+        поэтому их записи больше не нужны.
+
+        Args:
+            jti: Идентификатор токена
+            expires_at: Время истечения срока действия токена
+        """
+        try:
+            await self.acreate(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            # Токен уже отозван параллельным запросом
+            pass
+        await self.filter(expires_at__lt=timezone.now()).adelete()
+
+    async def ais_revoked(self, jti):
+        """
+        Проверяет, отозван ли токен.
+
+        Args:
+            jti: Идентификатор токена
+
+        Returns:
+            bool: Токен отозван
+        """
+        return await self.filter(jti=jti).aexists()
+
+
+class RevokedToken(models.Model):
+    """
+    Отозванный токен доступа API.
+
+    Список хранится в базе данных, а не в кэше: запись не вытесняется
+    при переполнении кэша и видна всем процессам API.
+
+    Атрибуты:
+        jti (CharField): Идентификатор токена
+        expires_at (DateTimeField): Время истечения срока действия токена
+    """
+    jti = models.CharField(max_length=32, primary_key=True, verbose_name="Идентификатор токена")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Истекает")
+
+    objects = RevokedTokenManager()
+
+    def __str__(self):
+        """Возвращает строковое представление записи."""
+        return f"{self.jti} (до {self.expires_at:%Y-%m-%d %H:%M:%S})"
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
+
+
+# Сортировка по популярности: рецепты без просмотров — в конце
+POPULAR_ORDERING = (F('stats__popularity').desc(nulls_last=True),)
 
 @receiver(pre_delete, sender=Recipe)
 def delete_recipe_image(sender, instance, **kwargs):
@@ -145,6 +568,57 @@ def delete_recipe_image(sender, instance, **kwargs):
             # Получаем public_id изображения из URL
             public_id = instance.image.public_id
             # Удаляем изображение из Cloudinary
-            cloudinary.uploader.destroy(public_id)
+            destroy_image(public_id)
         except Exception as e:
             print(f"Ошибка при удалении изображения из Cloudinary: {e}")
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_catalog(sender, instance, **kwargs):
+    """
+    Сигнал для сброса кэшированного справочника категорий
+    при создании, изменении или удалении категории
+    """
+    category_catalog.invalidate()
+
+@receiver(post_save, sender=Recipe)
+def log_recipe_saved(sender, instance, raw=False, **kwargs):
+    """
+    Сигнал для записи создания или изменения рецепта в журнал изменений
+    """
+    if not raw:
+        RecipeChange.objects.log([instance.pk])
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_deleted(sender, instance, **kwargs):
+    """
+    Сигнал для записи надгробия удаленного рецепта в журнал изменений
+    """
+    RecipeChange.objects.log([instance.pk], deleted=True)
+
+@receiver(m2m_changed, sender=Recipe.categories.through)
+def log_recipe_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сигнал для записи изменения категорий рецепта в журнал изменений.
+    При изменении со стороны категории (category.recipe_set) меняются
+    все затронутые рецепты; их набор для clear запоминается до очистки.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            RecipeChange.objects.log([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        RecipeChange.objects.log(pk_set)
+    elif action == 'post_clear':
+        RecipeChange.objects.log(getattr(instance, '_cleared_recipe_ids', ()))
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def log_category_recipes_changed(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Сигнал для записи в журнал изменений рецептов категории при ее
+    переименовании или удалении (рецепты отдаются вместе с категориями)
+    """
+    if not created and not raw:
+        RecipeChange.objects.log(instance.recipe_set.values_list('pk', flat=True))
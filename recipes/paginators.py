@@ -0,0 +1,65 @@
+"""
+Пагинация больших таблиц с оценкой числа строк.
+
+Точный COUNT(*) по большой таблице в Postgres читает всю таблицу
+(или весь индекс) на каждой странице списка в админке. Для больших
+выборок достаточно оценки планировщика: для выборки без условий — из
+статистики таблицы (pg_class.reltuples), с условиями — из EXPLAIN.
+Если оценка меньше ADMIN_ESTIMATED_COUNT_THRESHOLD, считается точное
+значение, поэтому небольшие выборки и фильтры с малым результатом
+пагинируются точно. На других СУБД всегда используется точный COUNT.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Оценивает число строк выборки по статистике Postgres.
+
+    Args:
+        queryset: Выборка QuerySet
+
+    Returns:
+        int | None: Оценка или None, если оценить нельзя
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            # -1: таблица ещё ни разу не анализировалась
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, использующий оценку числа строк для больших выборок.
+
+    Число страниц в списке может немного отличаться от действительного;
+    последние страницы при этом могут оказаться пустыми или неполными.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list) if hasattr(self.object_list, 'query') else None
+        if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
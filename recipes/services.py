@@ -0,0 +1,128 @@
+"""
+Операции записи рецептов.
+
+Этот модуль содержит общий путь сохранения рецептов для веб-интерфейса и API:
+- создание рецепта вместе с категориями в одной транзакции
+- обновление только изменившихся полей через update_fields
+- минимальные изменения связей many-to-many (добавление и удаление разницы)
+- оптимистичную блокировку по полю updated_at
+"""
+
+from datetime import datetime
+
+from django.db import transaction
+
+from .models import Recipe
+
+
+class RecipeConflictError(Exception):
+    """
+    Рецепт был изменен другим запросом после того, как клиент его прочитал.
+
+    Представления преобразуют это исключение в ответ 409 Conflict.
+    """
+
+
+def recipe_version(recipe):
+    """
+    Возвращает версию рецепта для оптимистичной блокировки.
+
+    Args:
+        recipe: Объект Recipe
+
+    Returns:
+        str: Значение updated_at в формате ISO 8601 или пустая строка
+             для несохраненного рецепта
+    """
+    return recipe.updated_at.isoformat() if recipe.updated_at else ''
+
+
+def parse_version(value):
+    """
+    Разбирает версию, полученную от клиента.
+
+    Args:
+        value: Строка ISO 8601, datetime или None
+
+    Returns:
+        datetime | None: Ожидаемое значение updated_at
+
+    Raises:
+        ValueError: Если строка не является датой в формате ISO 8601
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def create_recipe(recipe, categories=()):
+    """
+    Создает рецепт и его связи с категориями в одной транзакции.
+
+    Args:
+        recipe: Несохраненный объект Recipe с заполненными полями и автором
+        categories: Объекты Category или их id
+
+    Returns:
+        Recipe: Сохраненный рецепт
+    """
+    with transaction.atomic():
+        recipe.save()
+        if categories:
+            recipe.categories.add(*categories)
+    return recipe
+
+
+def update_recipe(recipe, changed_fields, categories=None, expected_version=None):
+    """
+    Сохраняет изменения рецепта минимальным набором запросов.
+
+    Записываются только перечисленные поля (и updated_at), а категории
+    обновляются добавлением и удалением разницы с текущим набором.
+    Все изменения выполняются в одной транзакции.
+
+    Args:
+        recipe: Объект Recipe с уже примененными новыми значениями полей
+        changed_fields: Имена изменившихся полей модели
+        categories: Новый набор категорий (объекты или id) или None,
+                    если категории не менялись
+        expected_version: Значение updated_at, которое видел клиент,
+                          или None, чтобы не проверять конфликт
+
+    Returns:
+        Recipe: Обновленный рецепт
+
+    Raises:
+        RecipeConflictError: Если рецепт изменился после expected_version
+        Recipe.DoesNotExist: Если рецепт был удален
+    """
+    with transaction.atomic():
+        if expected_version is not None:
+            current_version = (
+                Recipe.objects.select_for_update()
+                .filter(pk=recipe.pk)
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+            if current_version is None:
+                raise Recipe.DoesNotExist
+            if current_version != expected_version:
+                raise RecipeConflictError
+
+        to_add, to_remove = set(), set()
+        if categories is not None:
+            new_ids = {getattr(category, 'pk', category) for category in categories}
+            current_ids = set(recipe.categories.values_list('pk', flat=True))
+            to_add = new_ids - current_ids
+            to_remove = current_ids - new_ids
+
+        update_fields = [name for name in changed_fields if name != 'categories']
+        if update_fields or to_add or to_remove:
+            recipe.save(update_fields=[*update_fields, 'updated_at'])
+        if to_remove:
+            recipe.categories.remove(*to_remove)
+        if to_add:
+            recipe.categories.add(*to_add)
+    return recipe
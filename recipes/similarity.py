@@ -0,0 +1,299 @@
+"""
+Расчет похожих рецептов (векторы TF-IDF на NumPy и SciPy).
+
+Каждый рецепт описывается признаками: основами слов из разобранных
+ингредиентов (parse_ingredients, как на странице рецепта), категориями
+и словами названия. Признаки взвешиваются TF-IDF, векторы нормируются,
+и близость рецептов — скалярное произведение векторов (косинус).
+Векторы хранятся разреженной матрицей (у рецепта десятки признаков из
+SIMILAR_MAX_FEATURES), а произведение матриц считается блоками по
+SIMILAR_BLOCK_SIZE строк, поэтому память растет линейно с каталогом.
+
+Для каждого рецепта сохраняются SIMILAR_RECIPES_TOP_K ближайших
+(модель SimilarRecipe). Полный пересчет — build(), инкрементальный —
+update(): пересчитываются списки измененных рецептов и тех, в чьи
+списки измененные рецепты входят или теперь должны войти. Измененные
+рецепты берутся из журнала RecipeChange (changed_since()). Веса IDF
+меняются вместе с каталогом, и списки, не затронутые изменением, на
+границе топа могут немного отличаться от полного пересчета, поэтому
+полный пересчет стоит периодически повторять. Списки, из которых
+каскадно удалены удаленные рецепты, пересчитываются вместе с ними.
+Признаки и веса всегда строятся по всему каталогу, поэтому
+инкрементальный пересчет экономит поиск соседей, но не векторизацию.
+
+NumPy и SciPy нужны только этому модулю и команде build_similar; сайт
+и API читают готовые списки.
+"""
+
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+from django.utils import timezone
+
+from .models import Recipe, RecipeChange, SimilarRecipe
+from .templatetags.recipe_filters import parse_ingredients
+
+WORD_RE = re.compile(r'[^\W\d_]+')
+
+# Окончания, отбрасываемые при выделении основы слова
+ENDINGS = 'аеёиоуыэюяйь'
+
+# Основы слов, не характеризующие рецепт (единицы измерения и т.п.)
+STOP_STEMS = frozenset({
+    'для', 'или', 'вкус', 'стакан', 'ложк', 'столов', 'чайн', 'грамм', 'штук',
+    'щепотк', 'пучок', 'кусок', 'средн', 'больш', 'маленьк', 'свеж', 'мелк',
+})
+
+# Вес признаков по источнику
+WEIGHTS = {'ingredient': 1.0, 'category': 2.0, 'title': 1.5}
+
+# Рецептов в блоке при перемножении матриц
+SIMILAR_BLOCK_SIZE = 512
+
+
+def stems(text):
+    """
+    Основы слов текста: без окончаний, не длиннее шести букв.
+
+    Args:
+        text: Произвольный текст
+
+    Returns:
+        list: Основы слов (без слов короче трех букв и STOP_STEMS)
+    """
+    result = []
+    for word in WORD_RE.findall(text.lower()):
+        stem = word.rstrip(ENDINGS)[:6]
+        if len(stem) < 3:
+            stem = word
+        if len(stem) >= 3 and stem not in STOP_STEMS:
+            result.append(stem)
+    return result
+
+
+def recipe_terms(title, ingredients, category_ids):
+    """
+    Признаки рецепта с весами.
+
+    Args:
+        title: Название
+        ingredients: Текст ингредиентов
+        category_ids: Идентификаторы категорий
+
+    Returns:
+        Counter: {признак: вес}
+    """
+    terms = Counter()
+    for block in parse_ingredients(ingredients):
+        for item in block['items']:
+            for stem in set(stems(item)):
+                terms[f'i:{stem}'] += WEIGHTS['ingredient']
+    for stem in stems(title):
+        terms[f't:{stem}'] += WEIGHTS['title']
+    for category_id in category_ids:
+        terms[f'c:{category_id}'] += WEIGHTS['category']
+    return terms
+
+
+def load_corpus():
+    """
+    Признаки всех рецептов каталога (два запроса).
+
+    Returns:
+        tuple: (список id, список Counter признаков в том же порядке)
+    """
+    categories = defaultdict(list)
+    through = Recipe.categories.through
+    for recipe_id, category_id in through.objects.values_list('recipe_id', 'category_id'):
+        categories[recipe_id].append(category_id)
+    ids, terms = [], []
+    for recipe_id, title, ingredients in Recipe.objects.order_by('pk').values_list('id', 'title', 'ingredients') \
+            .iterator(chunk_size=2000):
+        ids.append(recipe_id)
+        terms.append(recipe_terms(title, ingredients, categories[recipe_id]))
+    return ids, terms
+
+
+def vectorize(terms, max_features=None):
+    """
+    Нормированные векторы TF-IDF.
+
+    Args:
+        terms: Список Counter признаков рецептов
+        max_features: Наибольший размер словаря (самые частые признаки)
+
+    Returns:
+        scipy.sparse.csr_matrix: Матрица float32 (рецепты x признаки) со
+                                 строками единичной длины (пустые для
+                                 рецептов без признаков)
+    """
+    max_features = max_features or settings.SIMILAR_MAX_FEATURES
+    document_frequency = Counter(term for recipe in terms for term in recipe)
+    vocabulary = {
+        term: index
+        for index, (term, _) in enumerate(document_frequency.most_common(max_features))
+    }
+    rows, columns, weights = [], [], []
+    for row, recipe in enumerate(terms):
+        for term, weight in recipe.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                weights.append(weight)
+    frequency = np.array([document_frequency[term] for term in vocabulary], dtype=np.float32)
+    idf = np.log((1 + len(terms)) / (1 + frequency)) + 1
+    columns = np.asarray(columns, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float32) * idf[columns]
+    matrix = sparse.csr_matrix((weights, (rows, columns)), shape=(len(terms), len(vocabulary)), dtype=np.float32)
+    # Строки без признаков не содержат значений и остаются пустыми
+    norms = np.sqrt(np.asarray(matrix.power(2).sum(axis=1)).ravel())
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+    return matrix
+
+
+def _scores(matrix, rows):
+    """Плотная матрица близости строк rows ко всем строкам matrix."""
+    return (matrix[rows] @ matrix.T).toarray()
+
+
+def nearest(matrix, rows, k):
+    """
+    Ближайшие соседи строк матрицы.
+
+    Args:
+        matrix: Матрица из vectorize()
+        rows: Номера строк, для которых ищутся соседи
+        k: Число соседей
+
+    Returns:
+        dict: {номер строки: [(номер соседа, близость), ...]} по убыванию
+              близости, без самой строки и соседей с нулевой близостью
+    """
+    result = {}
+    k = min(k, matrix.shape[0] - 1)
+    if k <= 0:
+        return {row: [] for row in rows}
+    rows = np.asarray(rows, dtype=np.int64)
+    for start in range(0, len(rows), SIMILAR_BLOCK_SIZE):
+        block = rows[start:start + SIMILAR_BLOCK_SIZE]
+        scores = _scores(matrix, block)
+        scores[np.arange(len(block)), block] = -1
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for position, row in enumerate(block):
+            order = top[position][np.argsort(-scores[position, top[position]])]
+            result[int(row)] = [
+                (int(column), float(scores[position, column]))
+                for column in order if scores[position, column] > 0
+            ]
+    return result
+
+
+def _save(ids, neighbors, computed_at, replace_all=False):
+    """
+    Сохраняет списки похожих рецептов, заменяя прежние.
+
+    Args:
+        ids: id рецептов по номерам строк матрицы
+        neighbors: Результат nearest()
+        computed_at: Время расчета
+        replace_all: Удалить списки всех рецептов (полный пересчет)
+
+    Returns:
+        int: Число сохраненных записей
+    """
+    entries = [
+        SimilarRecipe(recipe_id=ids[row], similar_id=ids[column], rank=rank, score=score,
+                      computed_at=computed_at)
+        for row, items in neighbors.items()
+        for rank, (column, score) in enumerate(items, start=1)
+    ]
+    with transaction.atomic():
+        existing = SimilarRecipe.objects.all()
+        if not replace_all:
+            existing = existing.filter(recipe_id__in=[ids[row] for row in neighbors])
+        existing.delete()
+        SimilarRecipe.objects.bulk_create(entries, batch_size=2000)
+    return len(entries)
+
+
+def build(k=None):
+    """
+    Полный пересчет похожих рецептов каталога.
+
+    Args:
+        k: Число соседей (по умолчанию SIMILAR_RECIPES_TOP_K)
+
+    Returns:
+        dict: recipes — число рецептов, saved — число записей
+    """
+    started = timezone.now()
+    k = k or settings.SIMILAR_RECIPES_TOP_K
+    ids, terms = load_corpus()
+    matrix = vectorize(terms)
+    neighbors = nearest(matrix, range(len(ids)), k)
+    return {'recipes': len(ids), 'saved': _save(ids, neighbors, started, replace_all=True)}
+
+
+def changed_since(moment):
+    """id рецептов из журнала изменений после moment."""
+    return set(RecipeChange.objects.filter(changed_at__gt=moment).values_list('recipe_id', flat=True))
+
+
+def update(recipe_ids, k=None):
+    """
+    Инкрементальный пересчет после изменения рецептов.
+
+    Пересчитываются списки измененных рецептов, рецептов, в чьих списках
+    они есть, и рецептов, для которых они теперь ближе последнего соседа
+    в списке. Если среди recipe_ids есть удаленные рецепты, пересчитываются
+    и неполные списки: из них каскадно удалены записи удаленных рецептов.
+    Словарь и веса IDF строятся по всему каталогу заново.
+
+    Args:
+        recipe_ids: id измененных и удаленных рецептов
+        k: Число соседей (по умолчанию SIMILAR_RECIPES_TOP_K)
+
+    Returns:
+        dict: recipes — число пересчитанных списков, saved — число записей
+    """
+    started = timezone.now()
+    k = k or settings.SIMILAR_RECIPES_TOP_K
+    ids, terms = load_corpus()
+    row_of = {recipe_id: row for row, recipe_id in enumerate(ids)}
+    changed = [row_of[recipe_id] for recipe_id in recipe_ids if recipe_id in row_of]
+    affected = set(changed)
+    if any(recipe_id not in row_of for recipe_id in recipe_ids):
+        affected.update(
+            row_of[recipe_id]
+            for recipe_id in Recipe.objects.annotate(size=Count('similar_recipes')).filter(size__lt=k)
+            .values_list('id', flat=True)
+            if recipe_id in row_of
+        )
+    if not affected:
+        return {'recipes': 0, 'saved': 0}
+    matrix = vectorize(terms)
+
+    affected.update(
+        row_of[recipe_id]
+        for recipe_id in SimilarRecipe.objects.filter(similar_id__in=[ids[row] for row in changed])
+        .values_list('recipe_id', flat=True)
+        if recipe_id in row_of
+    )
+    # Порог входа в список: близость последнего соседа, если список полон
+    threshold = np.zeros(len(ids), dtype=np.float32)
+    for recipe_id, lowest, size in SimilarRecipe.objects.values('recipe_id') \
+            .annotate(lowest=Min('score'), size=Count('pk')).values_list('recipe_id', 'lowest', 'size'):
+        if size >= k and recipe_id in row_of:
+            threshold[row_of[recipe_id]] = lowest
+    for start in range(0, len(changed), SIMILAR_BLOCK_SIZE):
+        scores = _scores(matrix, changed[start:start + SIMILAR_BLOCK_SIZE])
+        affected.update(int(row) for row in np.nonzero(((scores > threshold) & (scores > 0)).any(axis=0))[0])
+
+    neighbors = nearest(matrix, sorted(affected), k)
+    return {'recipes': len(neighbors), 'saved': _save(ids, neighbors, started)}
@@ -0,0 +1,151 @@
+"""
+Работа с хранилищем изображений рецептов (Cloudinary).
+
+Все обращения к Cloudinary из приложения проходят через этот модуль,
+чтобы их время учитывалось в метриках запроса и попадало в трассировку.
+
+Для локальных замеров нагрузки (см. recipe_site/settings_bench.py)
+при FAKE_IMAGE_STORAGE = True загрузка и удаление изображений
+не обращаются к Cloudinary, а файлы хранятся в памяти процесса
+(FakeMediaStorage). Задержку сетевого хранилища можно имитировать
+настройкой FAKE_STORAGE_LATENCY.
+
+SDK Cloudinary загружается при первом обращении к хранилищу, а не при
+запуске процесса: учетные данные из CLOUDINARY_STORAGE настраивает
+cloudinary_storage.app_settings при импорте. По той же причине класс
+MediaStorage создается при первом обращении к атрибуту модуля
+(DEFAULT_FILE_STORAGE загружается Django лениво).
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import InMemoryStorage
+
+from monitoring.instrumentation import timed_storage
+
+
+def _fake_latency():
+    """Имитирует задержку сетевого хранилища."""
+    if settings.FAKE_STORAGE_LATENCY:
+        time.sleep(settings.FAKE_STORAGE_LATENCY)
+
+
+def _uploader():
+    """
+    Возвращает модуль cloudinary.uploader, импортируя SDK при первом вызове.
+
+    Импорт cloudinary_storage.app_settings настраивает учетные данные
+    Cloudinary из CLOUDINARY_STORAGE.
+    """
+    from cloudinary_storage import app_settings  # noqa: F401
+    import cloudinary.uploader
+    return cloudinary.uploader
+
+
+def upload_image(file, **options):
+    """
+    Загружает изображение в Cloudinary.
+
+    Args:
+        file: Содержимое файла (байты или файловый объект)
+        **options: Параметры cloudinary.uploader.upload (например, folder)
+
+    Returns:
+        dict: Ответ Cloudinary (url, secure_url, public_id и т.д.)
+    """
+    with timed_storage('upload'):
+        if settings.FAKE_IMAGE_STORAGE:
+            _fake_latency()
+            public_id = f"{options.get('folder', 'recipes')}/{uuid.uuid4().hex}"
+            url = f'{settings.MEDIA_URL}{public_id}.jpg'
+            return {'public_id': public_id, 'url': url, 'secure_url': url}
+        return _uploader().upload(file, **options)
+
+
+def destroy_image(public_id):
+    """
+    Удаляет изображение из Cloudinary.
+
+    Args:
+        public_id: Идентификатор изображения в Cloudinary
+    """
+    with timed_storage('destroy'):
+        if settings.FAKE_IMAGE_STORAGE:
+            _fake_latency()
+            return {'result': 'ok'}
+        return _uploader().destroy(public_id)
+
+
+class TimedStorageMixin:
+    """
+    Примесь к классу хранилища, учитывающая время сетевых операций.
+    """
+
+    def _save(self, name, content):
+        with timed_storage('save'):
+            return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        with timed_storage('open'):
+            return super()._open(name, mode)
+
+    def delete(self, name):
+        with timed_storage('delete'):
+            return super().delete(name)
+
+    def exists(self, name):
+        with timed_storage('exists'):
+            return super().exists(name)
+
+
+class _SlowInMemoryStorage(InMemoryStorage):
+    """Хранилище в памяти с задержкой FAKE_STORAGE_LATENCY на каждую операцию."""
+
+    def _save(self, name, content):
+        _fake_latency()
+        return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        _fake_latency()
+        return super()._open(name, mode)
+
+    def delete(self, name):
+        _fake_latency()
+        return super().delete(name)
+
+    def exists(self, name):
+        _fake_latency()
+        return super().exists(name)
+
+
+class FakeMediaStorage(TimedStorageMixin, _SlowInMemoryStorage):
+    """
+    Хранилище медиафайлов в памяти процесса для локальных замеров нагрузки.
+
+    Операции учитываются в метриках так же, как у MediaStorage,
+    и выполняются с задержкой FAKE_STORAGE_LATENCY.
+    """
+
+
+def _media_storage_class():
+    """Создает класс MediaStorage, импортируя cloudinary_storage.storage."""
+    from cloudinary_storage.storage import MediaCloudinaryStorage
+
+    class MediaStorage(TimedStorageMixin, MediaCloudinaryStorage):
+        """
+        Хранилище медиафайлов Cloudinary с учетом времени сетевых операций.
+        """
+
+    MediaStorage.__module__ = __name__
+    MediaStorage.__qualname__ = 'MediaStorage'
+    return MediaStorage
+
+
+def __getattr__(name):
+    """Ленивое создание MediaStorage при первом обращении (PEP 562)."""
+    if name == 'MediaStorage':
+        globals()[name] = cls = _media_storage_class()
+        return cls
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,147 @@
+"""
+Синхронизация клиентов по журналу изменений рецептов.
+
+Клиент хранит непрозрачный токен и запрашивает изменения после него
+(GET /api/recipes/changes?since=<токен>). Токен — подписанная позиция
+в журнале RecipeChange и момент, по который клиент получил изменения. Если изменений нет, ответ стоит
+одного поиска по первичному ключу журнала.
+
+Первая синхронизация: клиент получает токен без since, затем загружает
+каталог целиком и дальше запрашивает только изменения.
+
+Записи журнала нумеруются при вставке, а видны после фиксации транзакции,
+поэтому запись с меньшим номером может появиться позже записи с большим.
+Чтобы токен не перешагнул такую запись, в ответ попадают только записи
+старше SYNC_COMMIT_LAG секунд (считается, что транзакции записи рецептов
+короче).
+
+Токен действует SYNC_RETENTION_DAYS дней: более старые записи журнала
+удаляются при сжатии (RecipeChangeManager.compact), и клиенту с таким
+токеном нужна полная синхронизация (ответ 410).
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .models import Recipe, RecipeChange
+
+TOKEN_SALT = 'recipes.sync'
+
+
+class SyncTokenError(Exception):
+    """Токен синхронизации поврежден или подписан другим ключом."""
+
+
+class SyncTokenExpired(SyncTokenError):
+    """Токен старше срока хранения журнала: нужна полная синхронизация."""
+
+
+def make_token(position, seen):
+    """
+    Выдает токен синхронизации.
+
+    Args:
+        position: Номер последней переданной клиенту записи журнала
+        seen: Момент, по который клиент получил изменения (datetime)
+
+    Returns:
+        str: Непрозрачный токен
+    """
+    return signing.dumps([position, round(seen.timestamp(), 3)], salt=TOKEN_SALT, compress=True)
+
+
+def parse_token(token):
+    """
+    Разбирает токен синхронизации.
+
+    Args:
+        token: Токен, выданный make_token
+
+    Returns:
+        tuple: (позиция в журнале, момент получения изменений datetime)
+
+    Raises:
+        SyncTokenExpired: Токен старше SYNC_RETENTION_DAYS
+        SyncTokenError: Токен поврежден
+    """
+    try:
+        position, seen = signing.loads(
+            token, salt=TOKEN_SALT, max_age=timedelta(days=settings.SYNC_RETENTION_DAYS),
+        )
+    except signing.SignatureExpired:
+        raise SyncTokenExpired('Токен синхронизации устарел')
+    except (signing.BadSignature, TypeError, ValueError):
+        raise SyncTokenError('Некорректный токен синхронизации')
+    return int(position), datetime.fromtimestamp(seen, tz=dt_timezone.utc)
+
+
+def head_position(cutoff):
+    """Номер последней записи журнала не новее cutoff."""
+    return RecipeChange.objects.filter(changed_at__lte=cutoff).order_by('-pk') \
+        .values_list('pk', flat=True).first() or 0
+
+
+def changes_since(token=None, limit=None):
+    """
+    Изменения рецептов после токена.
+
+    Args:
+        token: Токен предыдущей синхронизации или None для получения
+               начального токена
+        limit: Наибольшее число записей журнала (по умолчанию SYNC_PAGE_SIZE)
+
+    Returns:
+        dict: created и updated — рецепты (с автором и категориями),
+              deleted — id удаленных рецептов, next_token — токен для
+              следующего запроса, has_more — есть ли еще изменения.
+              created отличается от updated временем создания рецепта
+              относительно предыдущего токена; клиенту достаточно применять
+              оба списка как вставку или замену.
+
+    Raises:
+        SyncTokenExpired: Токен старше SYNC_RETENTION_DAYS
+        SyncTokenError: Токен поврежден
+    """
+    result = {'created': [], 'updated': [], 'deleted': [], 'has_more': False}
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_COMMIT_LAG)
+    if token is None:
+        result['next_token'] = make_token(head_position(cutoff), cutoff)
+        return result
+
+    position, seen = parse_token(token)
+    limit = limit or settings.SYNC_PAGE_SIZE
+    entries = list(RecipeChange.objects.filter(pk__gt=position).order_by('pk')[:limit + 1])
+    result['has_more'] = len(entries) > limit
+    entries = entries[:limit]
+
+    # Последнее состояние каждого рецепта в пределах видимых записей;
+    # слишком свежие записи клиент получит при следующем запросе
+    latest = {}
+    for entry in entries:
+        if entry.changed_at > cutoff:
+            result['has_more'] = False
+            break
+        latest[entry.recipe_id] = entry.deleted
+        position = entry.pk
+
+    changed_ids = [recipe_id for recipe_id, deleted in latest.items() if not deleted]
+    recipes = {
+        recipe.pk: recipe
+        for recipe in Recipe.objects.select_related('author').prefetch_related('categories')
+        .filter(pk__in=changed_ids)
+    } if changed_ids else {}
+    for recipe_id, deleted in latest.items():
+        recipe = recipes.get(recipe_id)
+        if recipe is None:
+            # Удален после записи журнала: надгробие может быть еще не видно
+            result['deleted'].append(recipe_id)
+        elif recipe.created_at > seen:
+            result['created'].append(recipe)
+        else:
+            result['updated'].append(recipe)
+
+    result['next_token'] = make_token(position, cutoff if not result['has_more'] else seen)
+    return result
@@ -9,8 +9,15 @@
 from django import template
 import re
 
+from monitoring.tracing import traced
+
 register = template.Library()
 
+# Шаблоны строк шагов компилируются при загрузке библиотеки,
+# а не при первом разборе рецепта
+STEP_WITH_COLON_RE = re.compile(r'^(?:(\d+)\.\s*)?(.+):$')  # Шаг с двоеточием
+NUMBERED_STEP_RE = re.compile(r'^(\d+)\.\s*(.+)$')  # Нумерованный шаг
+
 @register.filter
 def split(value, arg):
     """
@@ -76,6 +83,7 @@ def get_substeps(steps, index):
     return substeps
 
 @register.filter
+@traced
 def parse_ingredients(value):
     """
     Разбирает текст ингредиентов на блоки.
@@ -147,6 +155,7 @@ def parse_ingredients(value):
     return blocks
 
 @register.filter
+@traced
 def parse_steps(value):
     """
     Разбирает текст шагов приготовления в структурированный формат.
@@ -194,8 +203,8 @@ def parse_steps(value):
             continue
         
         # Проверяем различные форматы строк
-        step_with_colon = re.match(r'^(?:(\d+)\.\s*)?(.+):$', line)  # Шаг с двоеточием
-        step_with_number = re.match(r'^(\d+)\.\s*(.+)$', line)  # Нумерованный шаг
+        step_with_colon = STEP_WITH_COLON_RE.match(line)
+        step_with_number = NUMBERED_STEP_RE.match(line)
         
         # Если это шаг с двоеточием
         if step_with_colon:
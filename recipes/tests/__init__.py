@@ -0,0 +1,22 @@
+"""
+Тесты приложения рецептов.
+
+Основу составляют тесты бюджета SQL-запросов: для каждого маршрута из
+recipes.urls и api.main задаются наибольшее число SQL-запросов
+и ориентировочное время ответа (base.SITE_BUDGETS, base.API_BUDGETS).
+Каждый маршрут проверяется на каталогах рецептов нескольких размеров:
+число запросов не должно расти вместе с числом строк (иначе это N+1)
+и не должно превышать бюджет. Запросы считаются через
+monitoring.instrumentation.collect(), поэтому учитываются и запросы
+из потоков sync_to_async, в которых работает API.
+
+Модули:
+    - base: Бюджеты, наполнение каталога и базовые классы тестов
+    - test_site: Страницы сайта
+    - test_api: Эндпоинты API
+    - test_bulk: Пакетный импорт
+    - test_export_sync: Выгрузка каталога и синхронизация клиентов
+    - test_catalog: Админка рецептов и справочник категорий
+    - test_monitoring: Холодный запуск, профилирование, метрики,
+      трассировка и проверки готовности
+"""
@@ -0,0 +1,249 @@
+"""
+Общие данные тестов: бюджеты запросов, наполнение каталога и базовые классы.
+
+Бюджеты SITE_BUDGETS и API_BUDGETS описывают развертывание с общим кэшем
+(см. QueryBudgetTestCase) и проверяются в test_site, test_api, test_bulk
+и test_export_sync.
+"""
+
+import logging
+import time
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import TransactionTestCase, override_settings
+
+from api import auth
+from api.main import app as api_app
+from monitoring.instrumentation import collect
+
+from ..models import Category, Recipe
+
+# Запросы к ASGI-приложению не логируются, чтобы не засорять вывод тестов
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# Размеры каталога, на которых проверяется каждый маршрут
+CATALOG_SIZES = (3, 12, 36)
+
+# Категорий в каталоге и категорий у каждого рецепта
+CATEGORY_COUNT = 8
+CATEGORIES_PER_RECIPE = 3
+
+# Рецептов на одного автора
+RECIPES_PER_AUTHOR = 4
+
+# Бюджеты страниц сайта: имя маршрута -> (запросов, миллисекунд)
+SITE_BUDGETS = {
+    'home': (2, 500),
+    'recipe_detail': (3, 500),  # С похожими рецептами
+    'add_recipe': (0, 500),
+    'edit_recipe': (2, 500),
+    'delete_recipe': (7, 500),  # Со статистикой просмотров и похожими рецептами
+    'signup': (0, 500),
+    'login': (0, 500),
+    'logout': (3, 500),
+    'add_category': (1, 500),
+}
+
+# Бюджеты эндпоинтов API: (метод, шаблон пути) -> (запросов, миллисекунд).
+# Эндпоинты с токеном включают проверку отзыва (см. api/auth.py)
+API_BUDGETS = {
+    ('POST', '/token'): (1, 3000),  # Проверка пароля в пуле процессов
+    ('POST', '/token/revoke'): (4, 300),  # С удалением истекших записей об отзыве
+    ('GET', '/recipes/'): (2, 500),
+    ('GET', '/recipes/{recipe_id}/similar'): (1, 500),
+    ('GET', '/recipes/{recipe_id}'): (2, 300),
+    ('POST', '/recipes/'): (9, 500),  # Рецепт, категории и журнал изменений в одной транзакции
+    ('POST', '/recipes/bulk'): (6, 1000),  # Пакет из BULK_RECORDS записей
+    ('GET', '/recipes/export'): (3, 1000),  # Весь каталог умещается в одну порцию
+    ('GET', '/recipes/changes'): (3, 500),
+    ('GET', '/recipes/search'): (1, 500),  # Набор полей card: без автора и категорий
+    ('GET', '/recipes/batch'): (2, 500),
+    ('POST', '/recipes/batch'): (2, 500),
+    ('PUT', '/recipes/{recipe_id}'): (14, 500),  # С записями журнала изменений
+    ('DELETE', '/recipes/{recipe_id}'): (8, 500),  # Со статистикой просмотров и похожими рецептами
+    ('PUT', '/recipes/{recipe_id}/image'): (4, 500),
+    ('GET', '/categories/'): (0, 300),
+    ('GET', '/categories/{category_id}'): (0, 300),
+    ('GET', '/'): (0, 300),
+}
+
+# Список рецептов с набором полей card: без автора и категорий
+CARD_LIST_QUERIES = 1
+
+# Список рецептов при теплом кэше фрагментов: только id и updated_at страницы
+CACHED_LIST_QUERIES = 1
+
+# Клиент без новых изменений: один поиск по журналу изменений
+SYNC_UP_TO_DATE_QUERIES = 1
+
+# Число записей в пакете при проверке POST /recipes/bulk
+BULK_RECORDS = 20
+
+# Бюджет времени импорта recipe_site.asgi при холодном запуске (секунды)
+COLD_START_BUDGET = 2.0
+
+
+def grow_catalog(size):
+    """
+    Дополняет каталог рецептов до указанного размера.
+
+    У каждого рецепта несколько категорий, авторы распределены так,
+    чтобы у соседних рецептов они различались.
+
+    Args:
+        size: Требуемое число рецептов
+    """
+    categories = list(Category.objects.order_by('id'))
+    for index in range(len(categories), CATEGORY_COUNT):
+        categories.append(Category.objects.create(name=f'Категория {index}'))
+
+    existing = Recipe.objects.count()
+    authors = list(User.objects.filter(username__startswith='author').order_by('id'))
+    for index in range(existing, size):
+        author_index = index // RECIPES_PER_AUTHOR
+        if author_index >= len(authors):
+            authors.append(User.objects.create_user(f'author{author_index}'))
+        recipe = Recipe.objects.create(
+            title=f'Рецепт {index}',
+            description='Описание',
+            ingredients='Тесто:\n- мука\n- вода\n\nНачинка:\n- творог',
+            steps='Подготовка:\n- смешать\n\n1. Испечь',
+            preparation_time=30,
+            author=authors[author_index],
+        )
+        recipe.categories.set(
+            categories[(index + offset) % CATEGORY_COUNT] for offset in range(CATEGORIES_PER_RECIPE)
+        )
+
+
+
+
+def create_recipe(author):
+    """
+    Создает короткий рецепт без категорий.
+
+    Args:
+        author: Автор рецепта
+
+    Returns:
+        Recipe: Созданный рецепт
+    """
+    return Recipe.objects.create(
+        title='Свой рецепт', description='Описание', ingredients='мука',
+        steps='испечь', preparation_time=10, author=author,
+    )
+
+
+def access_token(user):
+    """Выдает токен доступа API пользователю без проверки пароля."""
+    return auth.create_access_token({'sub': user.username, 'uid': user.pk})
+
+
+def call_api(method, path, **kwargs):
+    """Выполняет запрос к приложению FastAPI напрямую через ASGI."""
+    async def send():
+        transport = httpx.ASGITransport(app=api_app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+            return await client.request(method, path, **kwargs)
+    return async_to_sync(send)()
+
+
+# Бюджеты считаются для развертывания с общим кэшем, где пользователь
+# и сессия кэшируются (см. recipes/backends.py), а справочник категорий
+# перечитывается только при смене версии (см. recipes/catalog.py)
+@override_settings(
+    USER_CACHE_TIMEOUT=60,
+    CATEGORY_CATALOG_TIMEOUT=0,
+    SESSION_ENGINE=settings.SESSION_ENGINES['cached_db'],
+)
+class QueryBudgetTestCase(TransactionTestCase):
+    """
+    Базовый класс тестов бюджета запросов.
+
+    Каждая проверка выполняется на каталогах размеров CATALOG_SIZES.
+    Перед замером запрос выполняется один раз вхолостую, чтобы заполнить
+    кэши (справочник категорий, сессии, пользователи): сравнивается
+    установившееся число запросов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        self.user = User.objects.create_user('owner')
+
+    def measure(self, perform, prepare=None):
+        """
+        Замеряет число SQL-запросов и время выполнения запроса.
+
+        Args:
+            perform: Функция, выполняющая запрос; получает результат prepare
+            prepare: Функция подготовки данных, выполняемая вне замера
+
+        Returns:
+            tuple: (число запросов, время в миллисекундах, ответ)
+        """
+        perform(prepare() if prepare else None)
+        argument = prepare() if prepare else None
+        with collect() as stats:
+            start = time.perf_counter()
+            response = perform(argument)
+            duration = (time.perf_counter() - start) * 1000
+        return stats.db_queries, duration, response
+
+    def assertWithinBudget(self, budget, label, perform, prepare=None, status=200):
+        """
+        Проверяет бюджет запроса на каталогах возрастающего размера.
+
+        Args:
+            budget: Кортеж (наибольшее число запросов, миллисекунд)
+            label: Название маршрута для сообщений об ошибках
+            perform: Функция, выполняющая запрос и возвращающая ответ
+            prepare: Функция подготовки данных, выполняемая вне замера
+            status: Ожидаемый код ответа
+        """
+        max_queries, max_ms = budget
+        counts = {}
+        for size in CATALOG_SIZES:
+            grow_catalog(size)
+            queries, duration, response = self.measure(perform, prepare)
+            self.assertEqual(response.status_code, status, f'{label}: неожиданный код ответа')
+            self.assertLessEqual(
+                queries, max_queries,
+                f'{label}: {queries} SQL-запросов при бюджете {max_queries} (рецептов: {size})'
+            )
+            self.assertLessEqual(
+                duration, max_ms,
+                f'{label}: {duration:.0f} мс при бюджете {max_ms} мс (рецептов: {size})'
+            )
+            counts[size] = queries
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'{label}: число SQL-запросов растет с размером каталога: {counts}'
+        )
+
+
+class APITestCase(QueryBudgetTestCase):
+    """Базовый класс тестов эндпоинтов API (api.main) от имени владельца."""
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {'Authorization': f'Bearer {self.token()}'}
+
+    def tearDown(self):
+        auth.token_users._items.clear()
+
+    def token(self):
+        """Выдает токен доступа владельцу без проверки пароля."""
+        return access_token(self.user)
+
+    def call(self, method, path, **kwargs):
+        """Выполняет запрос к API."""
+        return call_api(method, path, **kwargs)
+
+    def own_recipe(self):
+        """Создает рецепт текущего пользователя."""
+        return create_recipe(self.user)
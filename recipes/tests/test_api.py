@@ -0,0 +1,317 @@
+"""
+Бюджеты SQL-запросов эндпоинтов API (api.main): токены и их отзыв,
+списки и пакетная загрузка рецептов, изменение рецептов и категории.
+"""
+
+import itertools
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from fastapi.routing import APIRoute
+
+from api import auth, fieldsets
+from api.main import app as api_app
+
+from .. import similarity
+from ..models import Category, Recipe, RecipeStats, RevokedToken, SimilarRecipe
+from .base import (
+    API_BUDGETS, CACHED_LIST_QUERIES, CARD_LIST_QUERIES, CATALOG_SIZES, APITestCase, grow_catalog,
+)
+
+
+class APIQueryBudgetTests(APITestCase):
+    """Бюджеты запросов эндпоинтов API (api.main)."""
+
+    def test_every_route_has_budget(self):
+        routes = {
+            (method, route.path)
+            for route in api_app.routes if isinstance(route, APIRoute)
+            for method in route.methods
+        }
+        self.assertEqual(routes - API_BUDGETS.keys(), set(), 'Эндпоинты без бюджета запросов')
+
+    def test_token(self):
+        self.user.set_password('secret-password')
+        self.user.save()
+        try:
+            self.assertWithinBudget(
+                API_BUDGETS[('POST', '/token')], 'POST /token',
+                lambda _: self.call('POST', '/token', data={'username': 'owner', 'password': 'secret-password'}),
+            )
+        finally:
+            from api import passwords
+            passwords.pool.shutdown()
+
+    def test_dummy_password_hash(self):
+        # Хеш для несуществующих пользователей вычисляется при запуске API
+        async def startup():
+            messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await api_app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, receive, send)
+            return sent
+
+        from api import passwords
+        try:
+            with mock.patch.object(auth, '_dummy_password_hash', None):
+                self.assertEqual(async_to_sync(startup)(), ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+                prepared = auth._dummy_password_hash
+                self.assertIsNotNone(prepared)
+                response = self.call('POST', '/token', data={'username': 'nobody', 'password': 'secret-password'})
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(auth._dummy_password_hash, prepared)
+        finally:
+            passwords.pool.shutdown()
+
+    def test_revoke_token(self):
+        self.assertWithinBudget(
+            API_BUDGETS[('POST', '/token/revoke')], 'POST /token/revoke',
+            lambda token: self.call('POST', '/token/revoke', headers={'Authorization': f'Bearer {token}'}),
+            prepare=self.token,
+        )
+
+    def test_revocation_survives_list(self):
+        # Фрагментов больше, чем записей в кэше по умолчанию (MAX_ENTRIES = 300)
+        grow_catalog(320)
+        token = self.token()
+        headers = {'Authorization': f'Bearer {token}'}
+        self.assertEqual(self.call('POST', '/token/revoke', headers=headers).status_code, 200)
+        for fields in ('full', 'card'):
+            self.assertEqual(len(self.call('GET', '/recipes/', params={'limit': 400, 'fields': fields}).json()), 320)
+        self.assertEqual(self.call('POST', '/token/revoke', headers=headers).status_code, 401)
+
+    def test_revocation_seen_by_other_process(self):
+        token = self.token()
+        headers = {'Authorization': f'Bearer {token}'}
+        self.assertEqual(self.call('GET', '/recipes/export', headers=headers).status_code, 403)
+        self.assertEqual(self.call('POST', '/token/revoke', headers=headers).status_code, 200)
+        # Другой процесс: ни кэша Django, ни кэша пользователей по токенам
+        cache.clear()
+        fresh = auth.TokenUserCache(auth.TOKEN_CACHE_TTL, auth.TOKEN_CACHE_MAX_SIZE)
+        with mock.patch.object(auth, 'token_users', fresh):
+            self.assertEqual(self.call('GET', '/recipes/export', headers=headers).status_code, 401)
+
+    def test_expired_revocations_removed(self):
+        RevokedToken.objects.create(jti='expired', expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.call('POST', '/token/revoke', headers={'Authorization': f'Bearer {self.token()}'}).status_code, 200)
+        self.assertQuerySetEqual(RevokedToken.objects.exclude(expires_at__gt=timezone.now()), [])
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+    def test_list_recipes(self):
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/')], 'GET /recipes/',
+                                lambda _: self.call('GET', '/recipes/'))
+
+    def test_list_recipes_card(self):
+        def perform(_):
+            response = self.call('GET', '/recipes/', params={'fields': 'card'})
+            self.assertEqual(set(response.json()[0]), set(fieldsets.PRESETS['card']))
+            return response
+
+        self.assertWithinBudget((CARD_LIST_QUERIES, API_BUDGETS[('GET', '/recipes/')][1]), 'GET /recipes/?fields=card',
+                                perform)
+        self.assertEqual(self.call('GET', '/recipes/', params={'fields': 'card,secret'}).status_code, 400)
+
+    def test_list_recipes_cached(self):
+        def prepare():
+            return self.call('GET', '/recipes/').json()
+
+        def perform(expected):
+            response = self.call('GET', '/recipes/')
+            self.assertEqual(response.json(), expected)
+            return response
+
+        self.assertWithinBudget((CACHED_LIST_QUERIES, API_BUDGETS[('GET', '/recipes/')][1]),
+                                'GET /recipes/ (кэш фрагментов)', perform, prepare=prepare)
+
+        # Измененный рецепт не отдается из кэша
+        recipe = Recipe.objects.order_by('id').first()
+        recipe.title = 'Новое название'
+        recipe.save()
+        titles = {item['id']: item['title'] for item in self.call('GET', '/recipes/').json()}
+        self.assertEqual(titles[recipe.pk], 'Новое название')
+
+        # Как и рецепт с переименованным автором
+        recipe.author.username = 'renamed'
+        recipe.author.save()
+        authors = {item['id']: item['author'] for item in self.call('GET', '/recipes/').json()}
+        self.assertEqual(authors[recipe.pk], 'renamed')
+        self.assertEqual(self.call('GET', f'/recipes/{recipe.pk}').json()['author'], 'renamed')
+        batch = self.call('GET', '/recipes/batch', params={'ids': recipe.pk}).json()
+        self.assertEqual(batch['results'][0]['recipe']['author'], 'renamed')
+
+    def test_list_recipes_popular(self):
+        def prepare():
+            recipe = Recipe.objects.order_by('id').first()
+            RecipeStats.objects.update_or_create(recipe=recipe, defaults={'popularity': 1e6})
+            return recipe
+
+        def perform(recipe):
+            response = self.call('GET', '/recipes/', params={'sort': 'popular', 'fields': 'card'})
+            self.assertEqual(response.json()[0]['id'], recipe.pk)
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/')], 'GET /recipes/?sort=popular', perform,
+                                prepare=prepare)
+
+    def test_similar_recipes(self):
+        grow_catalog(CATALOG_SIZES[-1])
+        similarity.build()
+
+        def prepare():
+            recipe = Recipe.objects.order_by('id').first()
+            return recipe, list(SimilarRecipe.objects.filter(recipe=recipe).values_list('similar_id', flat=True))
+
+        def perform(prepared):
+            recipe, expected = prepared
+            response = self.call('GET', f'/recipes/{recipe.pk}/similar')
+            self.assertEqual([item['id'] for item in response.json()], expected)
+            self.assertEqual(set(response.json()[0]), set(fieldsets.PRESETS['card']))
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/{recipe_id}/similar')], 'GET /recipes/{recipe_id}/similar',
+                                perform, prepare=prepare)
+        self.assertEqual(self.call('GET', '/recipes/0/similar').status_code, 404)
+
+    def test_similar_recipes_incremental(self):
+        grow_catalog(CATALOG_SIZES[1])
+        similarity.build()
+        recipe, other = Recipe.objects.order_by('id')[:2]
+        recipe.title, recipe.ingredients = other.title, other.ingredients
+        recipe.save()
+        recipe.categories.set(other.categories.all())
+
+        since = SimilarRecipe.objects.order_by('-computed_at').values_list('computed_at', flat=True).first()
+        self.assertIn(recipe.pk, similarity.changed_since(since))
+        self.assertGreater(similarity.update(similarity.changed_since(since))['recipes'], 0)
+        first = SimilarRecipe.objects.get(recipe=other, rank=1)
+        self.assertEqual(first.similar_id, recipe.pk)
+        self.assertAlmostEqual(first.score, 1.0, places=5)
+
+        # Списки, из которых каскадно удален рецепт, снова полные
+        k = settings.SIMILAR_RECIPES_TOP_K
+        referrers = set(SimilarRecipe.objects.filter(similar=recipe).values_list('recipe_id', flat=True))
+        self.assertTrue(referrers)
+        recipe.delete()
+        similarity.update(similarity.changed_since(since))
+        sizes = dict(SimilarRecipe.objects.filter(recipe_id__in=referrers).values('recipe_id')
+                     .annotate(size=Count('pk')).values_list('recipe_id', 'size'))
+        self.assertEqual(sizes, dict.fromkeys(referrers, k))
+
+    def test_search_recipes(self):
+        def perform(_):
+            response = self.call('GET', '/recipes/search', params={'q': 'Рецепт', 'fields': 'card,title'})
+            self.assertTrue(response.json())
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/search')], 'GET /recipes/search', perform)
+
+    def test_get_recipe(self):
+        self.assertWithinBudget(
+            API_BUDGETS[('GET', '/recipes/{recipe_id}')], 'GET /recipes/{recipe_id}',
+            lambda recipe: self.call('GET', f'/recipes/{recipe.pk}'),
+            prepare=lambda: Recipe.objects.order_by('-id').first(),
+        )
+
+    def test_create_recipe(self):
+        grow_catalog(0)
+        category = Category.objects.order_by('id').first()
+        recipe = {
+            'title': 'Новый рецепт', 'description': 'Описание', 'ingredients': '- мука',
+            'steps': '1. Испечь', 'preparation_time': 20, 'categories': [category.pk],
+        }
+        files = {'image': ('test.jpg', b'image', 'image/jpeg')}
+
+        def perform(_):
+            response = self.call('POST', '/recipes/', headers=self.headers, files=files,
+                                 data={'recipe': json.dumps(recipe, ensure_ascii=False)})
+            self.assertEqual(response.json()['categories'], [{'name': category.name, 'id': category.pk}])
+            return response
+
+        with mock.patch('recipes.storage.upload_image', return_value={'url': 'recipes/new.jpg'}):
+            self.assertWithinBudget(API_BUDGETS[('POST', '/recipes/')], 'POST /recipes/', perform)
+            invalid = self.call('POST', '/recipes/', headers=self.headers, files=files,
+                                data={'recipe': json.dumps({'title': 'Без полей'})})
+        self.assertEqual(invalid.status_code, 422)
+
+    def test_batch(self):
+        def prepare():
+            ids = list(Recipe.objects.order_by('-id').values_list('id', flat=True)[:3])
+            return [ids[0], 0, *ids[1:], ids[0]]
+
+        def perform(ids):
+            response = self.call('GET', '/recipes/batch', params={'ids': ','.join(map(str, ids))})
+            results = response.json()['results']
+            self.assertEqual([item['id'] for item in results], ids)
+            self.assertEqual([item['status'] for item in results].count('not_found'), 1)
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/batch')], 'GET /recipes/batch', perform, prepare=prepare)
+
+    def test_batch_post(self):
+        self.assertWithinBudget(
+            API_BUDGETS[('POST', '/recipes/batch')], 'POST /recipes/batch',
+            lambda ids: self.call('POST', '/recipes/batch', json={'ids': ids}),
+            prepare=lambda: list(Recipe.objects.values_list('id', flat=True)),
+        )
+        too_many = list(range(1, settings.API_BATCH_MAX_IDS + 2))
+        self.assertEqual(self.call('POST', '/recipes/batch', json={'ids': too_many}).status_code, 400)
+
+    def test_update_recipe(self):
+        recipe = self.own_recipe()
+        grow_catalog(0)
+        # Наборы категорий чередуются, чтобы каждое обновление меняло одинаковое число связей
+        ids = list(Category.objects.order_by('id').values_list('id', flat=True))
+        category_sets = itertools.cycle((ids[:2], ids[2:4]))
+        versions = itertools.count()
+
+        self.assertWithinBudget(
+            API_BUDGETS[('PUT', '/recipes/{recipe_id}')], 'PUT /recipes/{recipe_id}',
+            lambda data: self.call('PUT', f'/recipes/{recipe.pk}', headers=self.headers, json=data),
+            prepare=lambda: {
+                'title': f'Рецепт {next(versions)}',
+                'categories': list(next(category_sets)),
+            },
+        )
+
+    def test_delete_recipe(self):
+        self.assertWithinBudget(
+            API_BUDGETS[('DELETE', '/recipes/{recipe_id}')], 'DELETE /recipes/{recipe_id}',
+            lambda recipe: self.call('DELETE', f'/recipes/{recipe.pk}', headers=self.headers),
+            prepare=self.own_recipe,
+        )
+
+    def test_update_recipe_image(self):
+        recipe = self.own_recipe()
+        upload = mock.patch('recipes.storage.upload_image', return_value={'secure_url': 'recipes/new.jpg'})
+        with upload:
+            self.assertWithinBudget(
+                API_BUDGETS[('PUT', '/recipes/{recipe_id}/image')], 'PUT /recipes/{recipe_id}/image',
+                lambda _: self.call('PUT', f'/recipes/{recipe.pk}/image', headers=self.headers,
+                                    files={'image': ('new.jpg', b'image', 'image/jpeg')}),
+            )
+
+    def test_categories(self):
+        self.assertWithinBudget(API_BUDGETS[('GET', '/categories/')], 'GET /categories/',
+                                lambda _: self.call('GET', '/categories/'))
+
+    def test_category(self):
+        self.assertWithinBudget(
+            API_BUDGETS[('GET', '/categories/{category_id}')], 'GET /categories/{category_id}',
+            lambda category: self.call('GET', f'/categories/{category.pk}'),
+            prepare=lambda: Category.objects.order_by('id').first(),
+        )
+
+    def test_root(self):
+        self.assertWithinBudget(API_BUDGETS[('GET', '/')], 'GET /', lambda _: self.call('GET', '/'))
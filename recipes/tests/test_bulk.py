@@ -0,0 +1,73 @@
+"""
+Пакетный импорт рецептов из NDJSON через API (recipes/bulk.py).
+"""
+
+import json
+from unittest import mock
+
+from django.conf import settings
+
+from .. import textparse
+from ..models import Category, Recipe
+from .base import API_BUDGETS, BULK_RECORDS, APITestCase, grow_catalog
+
+
+class BulkImportTests(APITestCase):
+    """Пакетный импорт рецептов POST /recipes/bulk (recipes/bulk.py)."""
+
+    def test_bulk_import(self):
+        grow_catalog(0)
+        category = Category.objects.order_by('id').first()
+        record = {
+            'title': 'Импорт', 'description': 'Описание', 'preparation_time': 15,
+            'ingredients': 'Тесто:\n- мука\n- вода', 'steps': '1. Замесить\n2. Испечь',
+            'categories': [category.pk, 'Выпечка'],
+        }
+        body = '\n'.join(json.dumps(record, ensure_ascii=False) for _ in range(BULK_RECORDS))
+        # Одна некорректная запись не прерывает пакет
+        body += '\n{"title": ""}\n'
+
+        def perform(_):
+            response = self.call('POST', '/recipes/bulk', headers=self.headers, content=body.encode())
+            self.assertEqual(response.json()['created'], BULK_RECORDS)
+            self.assertEqual([error['line'] for error in response.json()['errors']], [BULK_RECORDS + 1])
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('POST', '/recipes/bulk')], 'POST /recipes/bulk', perform)
+        recipe = Recipe.objects.filter(title='Импорт').first()
+        self.assertEqual(sorted(recipe.categories.values_list('name', flat=True)), sorted({category.name, 'Выпечка'}))
+
+    def test_bulk_import_invalid_categories(self):
+        grow_catalog(0)
+        record = {
+            'title': 'Импорт', 'description': 'Описание', 'preparation_time': 15,
+            'ingredients': '- мука', 'steps': '1. Испечь', 'categories': ['Выпечка'],
+        }
+        invalid = [[10 ** 30], [0], ['x' * 101], [None], [True]]
+        lines = [json.dumps(record, ensure_ascii=False)] + [
+            json.dumps({**record, 'categories': categories}) for categories in invalid
+        ]
+        response = self.call('POST', '/recipes/bulk', headers=self.headers, content='\n'.join(lines).encode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['line'] for error in response.json()['errors']], list(range(2, len(lines) + 1)))
+
+    def test_bulk_import_pool(self):
+        # Пакет не меньше BULK_IMPORT_POOL_MIN разбирается в пуле процессов
+        grow_catalog(0)
+        record = {
+            'title': 'Импорт', 'description': 'Описание', 'preparation_time': 15,
+            'ingredients': 'Тесто:\n- мука\n- вода', 'steps': '1. Замесить\n2. Испечь',
+        }
+        count = settings.BULK_IMPORT_POOL_MIN
+        body = '\n'.join(json.dumps({**record, 'title': f'Импорт {i}'}, ensure_ascii=False) for i in range(count))
+        try:
+            with mock.patch.object(textparse.pool, 'get', wraps=textparse.pool.get) as get_pool:
+                response = self.call('POST', '/recipes/bulk', headers=self.headers, content=body.encode())
+            get_pool.assert_called_once()
+        finally:
+            textparse.pool.shutdown()
+        self.assertEqual(response.json(), {
+            'created': count, 'ids': response.json()['ids'], 'errors': [],
+        })
+        self.assertEqual(Recipe.objects.filter(title__startswith='Импорт').count(), count)
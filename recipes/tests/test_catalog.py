@@ -0,0 +1,97 @@
+"""
+Каталог рецептов и справочник категорий: список рецептов в админке,
+выбор категорий в форме и снимок справочника в нескольких процессах.
+"""
+
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import admin
+from ..catalog import CategoryCatalog
+from ..forms import RecipeForm
+from ..models import Category, Recipe
+from ..paginators import EstimatedCountPaginator
+from .base import CATALOG_SIZES, RECIPES_PER_AUTHOR, grow_catalog
+
+
+class AdminChangeListTests(TransactionTestCase):
+    """Список рецептов в админке: фильтры с автодополнением и оценка числа строк."""
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin'))
+        grow_catalog(CATALOG_SIZES[1])
+
+    def changelist(self, **params):
+        response = self.client.get(reverse('admin:recipes_recipe_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_filters(self):
+        self.assertEqual(self.changelist().result_count, CATALOG_SIZES[1])
+        category = Category.objects.order_by('id').first()
+        cl = self.changelist(categories__id__exact=category.pk)
+        self.assertEqual({recipe.pk for recipe in cl.result_list},
+                         set(category.recipe_set.values_list('pk', flat=True)))
+        # Виджет фильтра содержит только выбранное значение
+        spec = next(spec for spec in cl.filter_specs if spec.field_path == 'categories')
+        self.assertIsInstance(spec, admin.AutocompleteFieldListFilter)
+        self.assertInHTML(f'<option value="{category.pk}" selected>{category.name}</option>', spec.widget())
+        author = User.objects.get(username='author0')
+        cl = self.changelist(author__id__exact=author.pk)
+        self.assertEqual(cl.result_count, RECIPES_PER_AUTHOR)
+        self.assertTrue(all(recipe.author_id == author.pk for recipe in cl.result_list))
+
+    def test_estimated_count(self):
+        queryset = Recipe.objects.order_by('id')
+        threshold = settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        # На SQLite оценки нет: точный COUNT
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, CATALOG_SIZES[1])
+        with mock.patch('recipes.paginators.estimate_count', return_value=threshold - 1):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, CATALOG_SIZES[1])
+        with mock.patch('recipes.paginators.estimate_count', return_value=threshold):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, threshold)
+            self.assertEqual(self.changelist().paginator.count, threshold)
+
+
+class CategoryFieldTests(TransactionTestCase):
+    """Выбор категорий в форме рецепта: id и названия (recipes/forms.py)."""
+
+    def test_ids_and_names(self):
+        field = RecipeForm().fields['categories']
+        existing = Category.objects.create(name='Супы')
+        categories = field.clean([str(existing.pk), 'name:2024', 'Выпечка'])
+        self.assertEqual(sorted(category.name for category in categories), ['2024', 'Выпечка', 'Супы'])
+        self.assertEqual(Category.objects.count(), 3)
+        # Цифры не из ASCII — название, а не id
+        self.assertEqual([category.name for category in field.clean(['²'])], ['²'])
+        for value in ('999999', str(2 ** 63)):
+            with self.assertRaises(ValidationError, msg=value):
+                field.clean([value])
+
+
+class CategoryCatalogTests(TransactionTestCase):
+    """Справочник категорий в нескольких процессах (recipes/catalog.py)."""
+
+    @override_settings(CATEGORY_CATALOG_TIMEOUT=30)
+    def test_other_process_refreshes_by_timeout(self):
+        Category.objects.create(name='Супы')
+        # Другой воркер: свой снимок и свой кэш в памяти процесса
+        worker = CategoryCatalog()
+        worker_cache = LocMemCache('other-process', {})
+        with mock.patch('recipes.catalog.cache', worker_cache):
+            self.assertEqual([category.name for category in worker.all()], ['Супы'])
+        # Смена версии видна только кэшу этого процесса
+        Category.objects.create(name='Выпечка')
+        loaded_at = time.monotonic()
+        with mock.patch('recipes.catalog.cache', worker_cache):
+            self.assertEqual([category.name for category in worker.all()], ['Супы'])
+            with mock.patch('recipes.catalog.time.monotonic', return_value=loaded_at + 31):
+                self.assertEqual([category.name for category in worker.all()], ['Выпечка', 'Супы'])
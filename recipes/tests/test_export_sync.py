@@ -0,0 +1,136 @@
+"""
+Выгрузка каталога (recipes/export.py) и синхронизация клиентов
+по журналу изменений (recipes/sync.py).
+"""
+
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from .. import export, sync
+from ..models import Recipe
+from .base import (
+    API_BUDGETS, CATALOG_SIZES, CATEGORIES_PER_RECIPE, SYNC_UP_TO_DATE_QUERIES, APITestCase, grow_catalog,
+)
+
+
+class ExportTests(APITestCase):
+    """Выгрузка каталога (recipes/export.py): API и команда export_recipes."""
+
+    def test_export(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        def perform(count):
+            response = self.call('GET', '/recipes/export', headers=self.headers, params={'compress': 'false'})
+            records = [json.loads(line) for line in response.text.splitlines()]
+            self.assertEqual(len(records), count)
+            self.assertEqual(set(records[0]), set(export.FIELDS))
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/export')], 'GET /recipes/export', perform,
+                                prepare=Recipe.objects.count)
+
+    def test_export_staff_only(self):
+        response = self.call('GET', '/recipes/export', headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_csv_gzip(self):
+        self.user.is_staff = True
+        self.user.save()
+        grow_catalog(CATALOG_SIZES[0])
+        response = self.call('GET', '/recipes/export', headers=self.headers, params={'format': 'csv'})
+        self.assertEqual(response.headers['content-type'], 'application/gzip')
+        rows = list(csv.reader(io.StringIO(gzip.decompress(response.content).decode())))
+        self.assertEqual(rows[0], list(export.FIELDS))
+        self.assertEqual(len(rows) - 1, CATALOG_SIZES[0])
+        record = dict(zip(rows[0], rows[-1]))
+        self.assertEqual(record['categories'].count(export.CSV_CATEGORY_SEPARATOR), CATEGORIES_PER_RECIPE - 1)
+
+    def test_export_since(self):
+        self.user.is_staff = True
+        self.user.save()
+        grow_catalog(CATALOG_SIZES[0])
+        Recipe.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.call('GET', '/recipes/export', headers=self.headers, params={'compress': 'false'})
+        since = response.headers['x-export-started']
+        changed = self.own_recipe()
+        # Рецепт сохранен до since, но его транзакция зафиксирована позже
+        late = Recipe.objects.order_by('id').first()
+        Recipe.objects.filter(pk=late.pk).update(updated_at=datetime.fromisoformat(since) - timedelta(seconds=1))
+
+        def exported(**kwargs):
+            with self.settings(**kwargs):
+                response = self.call('GET', '/recipes/export', headers=self.headers,
+                                     params={'compress': 'false', 'since': since})
+            return {json.loads(line)['id'] for line in response.text.splitlines()}
+
+        self.assertEqual(exported(), {changed.pk, late.pk})
+        self.assertEqual(exported(SYNC_COMMIT_LAG=0), {changed.pk})
+
+    def test_export_command(self):
+        grow_catalog(CATALOG_SIZES[0])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'recipes.ndjson.gz'
+            stdout = io.StringIO()
+            call_command('export_recipes', str(path), stdout=stdout)
+            records = [json.loads(line) for line in gzip.decompress(path.read_bytes()).decode().splitlines()]
+        self.assertEqual(len(records), CATALOG_SIZES[0])
+        self.assertEqual([record['updated_at'] for record in records],
+                         sorted(record['updated_at'] for record in records))
+        self.assertIn(f'Выгружено рецептов: {CATALOG_SIZES[0]}', stdout.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', str(path), since='вчера')
+
+
+class SyncTests(APITestCase):
+    """Синхронизация клиентов по журналу изменений (recipes/sync.py)."""
+
+    @override_settings(SYNC_COMMIT_LAG=0)
+    def test_changes(self):
+        def prepare():
+            token = sync.changes_since()['next_token']
+            updated, deleted = self.own_recipe(), self.own_recipe()
+            deleted_id = deleted.pk
+            deleted.delete()
+            updated.title = 'Измененный рецепт'
+            updated.save()
+            return token, updated.pk, deleted_id
+
+        def perform(argument):
+            token, updated_id, deleted_id = argument
+            response = self.call('GET', '/recipes/changes', params={'since': token})
+            changes = response.json()
+            self.assertEqual([recipe['id'] for recipe in changes['created']], [updated_id])
+            self.assertEqual(changes['deleted'], [deleted_id])
+            return response
+
+        self.assertWithinBudget(API_BUDGETS[('GET', '/recipes/changes')], 'GET /recipes/changes',
+                                perform, prepare=prepare)
+
+    @override_settings(SYNC_COMMIT_LAG=0)
+    def test_changes_up_to_date(self):
+        def perform(token):
+            response = self.call('GET', '/recipes/changes', params={'since': token})
+            changes = response.json()
+            self.assertEqual(changes['created'] + changes['updated'] + changes['deleted'], [])
+            return response
+
+        self.assertWithinBudget(
+            (SYNC_UP_TO_DATE_QUERIES, API_BUDGETS[('GET', '/recipes/changes')][1]), 'GET /recipes/changes',
+            perform, prepare=lambda: sync.changes_since()['next_token'],
+        )
+        # Поврежденный токен — 400, устаревший — 410
+        self.assertEqual(self.call('GET', '/recipes/changes', params={'since': 'broken'}).status_code, 400)
+        with mock.patch('django.core.signing.time.time', return_value=0):
+            token = sync.changes_since()['next_token']
+        self.assertEqual(self.call('GET', '/recipes/changes', params={'since': token}).status_code, 410)
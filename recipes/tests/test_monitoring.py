@@ -0,0 +1,312 @@
+"""
+Мониторинг: холодный запуск, профилирование по токену, доступ к /metrics,
+журнал медленных запросов, трассировка, диспетчер ASGI и проверки
+/healthz и /readyz.
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.test import Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from monitoring import profiling, startup, tracing
+from monitoring.health import HealthASGIMiddleware
+from monitoring.models import ProfileRecord, SlowQuery
+from monitoring.slowlog import SlowQueryLog
+
+from .base import COLD_START_BUDGET, access_token, call_api
+
+
+class ColdStartBudgetTests(SimpleTestCase):
+    """Бюджет холодного запуска ASGI-приложения."""
+
+    def test_cold_start(self):
+        # Лучший из двух запусков: первый может включать прогрев кэша ОС
+        profiles = [startup.profile_startup('recipe_site.asgi') for _ in range(2)]
+        profile = min(profiles, key=lambda item: item['import'])
+        self.assertEqual(profile['loaded'], [], 'Эти модули должны загружаться при первом использовании')
+        self.assertLessEqual(
+            profile['import'], COLD_START_BUDGET,
+            f"Импорт recipe_site.asgi занял {profile['import'] * 1000:.0f} мс "
+            f"(бюджет {COLD_START_BUDGET * 1000:.0f} мс)\n" + startup.format_report(profile, top=10),
+        )
+
+
+class ProfilingTokenTests(TransactionTestCase):
+    """Токен профилирования привязан к выдавшему его сотруднику (monitoring/profiling.py)."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', is_staff=True)
+        self.other = User.objects.create_user('other', is_staff=True)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILE_DIR=directory.name))
+
+    def call_api(self, profile_token, user=None):
+        """Запрос к API с токеном профилирования и, если задан user, токеном доступа."""
+        headers = {profiling.PROFILE_HEADER: profile_token}
+        if user is not None:
+            headers['Authorization'] = f'Bearer {access_token(user)}'
+        return call_api('GET', '/categories/', headers=headers)
+
+    def test_api_profile_only_for_issuer(self):
+        token = profiling.make_profile_token(self.staff)
+        self.assertEqual(self.call_api(token).status_code, 200)
+        self.assertEqual(self.call_api(token, self.other).status_code, 200)
+        self.assertFalse(ProfileRecord.objects.exists())
+        self.call_api(token, self.staff)
+        self.assertEqual(list(ProfileRecord.objects.values_list('app', 'user')), [('api', self.staff.pk)])
+
+    def test_site_profile_only_for_issuer(self):
+        token = profiling.make_profile_token(self.staff)
+        client = Client()
+        client.force_login(self.other)
+        self.assertNotIn('X-Profile-Id', client.get(reverse('home'), {profiling.PROFILE_PARAM: token}))
+        client.force_login(self.staff)
+        self.assertIn('X-Profile-Id', client.get(reverse('home'), {profiling.PROFILE_PARAM: token}))
+
+
+class MetricsAccessTests(TransactionTestCase):
+    """Доступ к /metrics (monitoring/views.py)."""
+
+    def get(self, **headers):
+        return Client().get(reverse('metrics'), headers=headers).status_code
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=False)
+    def test_closed_by_default(self):
+        self.assertEqual(self.get(), 403)
+        self.assertEqual(self.get(Authorization='Bearer '), 403)
+
+    @override_settings(METRICS_TOKEN='metrics-secret', METRICS_PUBLIC=False)
+    def test_token_and_staff(self):
+        self.assertEqual(self.get(Authorization='Bearer wrong'), 403)
+        self.assertEqual(self.get(Authorization='Bearer metrics-secret'), 200)
+        client = Client()
+        client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=True)
+    def test_public(self):
+        self.assertEqual(self.get(), 200)
+
+
+class SlowQueryLogTests(TransactionTestCase):
+    """Сохранение журнала медленных запросов (monitoring/slowlog.py)."""
+
+    def test_flush_concurrent_create(self):
+        # Запись появилась между UPDATE этого процесса и его вставкой
+        SlowQuery.objects.create(fingerprint='f', endpoint='home', sql='SELECT ?', count=1, total_ms=10,
+                                 max_ms=10, first_seen=timezone.now(), last_seen=timezone.now())
+        log = SlowQueryLog()
+        log._pending[('f', 'home')] = {'sql': 'SELECT ?', 'count': 2, 'total': 0.05, 'max': 0.03,
+                                       'params': [], 'explain': ''}
+        update = QuerySet.update
+        missed = []
+
+        def race(queryset, **kwargs):
+            if not missed:
+                missed.append(queryset)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=race):
+            self.assertEqual(log.flush(), 1)
+        record = SlowQuery.objects.get()
+        self.assertEqual((record.count, record.total_ms, record.max_ms), (3, 60, 30))
+
+
+@override_settings(TRACING_ENABLED=True)
+class TracingTests(SimpleTestCase):
+    """Отбор запросов для трассировки (monitoring/tracing.py)."""
+
+    TRACEPARENT = '00-{}-{}-01'.format('a' * 32, 'b' * 16)
+
+    @override_settings(TRACING_SAMPLE_RATE=0)
+    def test_untrusted_traceparent(self):
+        # Флаг отбора от клиента не включает трассировку сверх TRACING_SAMPLE_RATE
+        self.assertIsNone(tracing.start_trace('GET /', self.TRACEPARENT))
+        with self.settings(TRACING_SAMPLE_RATE=1):
+            span = tracing.start_trace('GET /', self.TRACEPARENT.replace('-01', '-00'))
+        self.assertEqual((span.trace_id, span.parent_id), ('a' * 32, 'b' * 16))
+
+    @override_settings(TRACING_SAMPLE_RATE=0, TRACING_TRUST_TRACEPARENT=True)
+    def test_trusted_traceparent(self):
+        self.assertEqual(tracing.start_trace('GET /', self.TRACEPARENT).trace_id, 'a' * 32)
+        with self.settings(TRACING_SAMPLE_RATE=1):
+            self.assertIsNone(tracing.start_trace('GET /', self.TRACEPARENT.replace('-01', '-00')))
+
+    @override_settings(TRACING_JSONL_MAX_BYTES=1000)
+    def test_jsonl_size_cap(self):
+        span = tracing.Span('a' * 32, None, 'GET /')
+        span.end_ns = span.start_ns
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'traces.jsonl'
+            exporter = tracing.BatchExporter('jsonl', str(path))
+            for _ in range(20):
+                exporter._export_jsonl([span] * 5)
+            self.assertLess(path.stat().st_size, 2000)
+            self.assertGreaterEqual(Path(f'{path}.1').stat().st_size, 1000)
+            self.assertEqual(sorted(child.name for child in Path(directory).iterdir()),
+                             ['traces.jsonl', 'traces.jsonl.1'])
+
+
+class RecordingApp:
+    """ASGI-приложение, запоминающее scope полученных запросов."""
+
+    def __init__(self, status):
+        self.status = status
+        self.scopes = []
+
+    async def __call__(self, scope, receive, send):
+        self.scopes.append(scope)
+        if scope['type'] == 'lifespan':
+            await inner_app(scope, receive, send)
+            return
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+class PathPrefixDispatcherTests(SimpleTestCase):
+    """Диспетчер запросов между Django и FastAPI (recipe_site/asgi.py)."""
+
+    def setUp(self):
+        from recipe_site.asgi import PathPrefixDispatcher
+
+        self.api, self.site = RecordingApp(201), RecordingApp(202)
+        self.dispatcher = PathPrefixDispatcher([('/api/', self.api)], self.site, lifespan_app=self.api)
+
+    def get(self, path, root_path=''):
+        async def send():
+            transport = httpx.ASGITransport(app=self.dispatcher, root_path=root_path)
+            async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+                return await client.get(path)
+        return async_to_sync(send)().status_code
+
+    def test_routing(self):
+        self.assertEqual(self.get('/api/recipes/'), 201)
+        self.assertEqual(self.get('/recipe/1/'), 202)
+        # Путь лишь начинается с тех же букв, что и префикс
+        self.assertEqual(self.get('/apiary/'), 202)
+        self.assertEqual(self.api.scopes[0]['path'], '/api/recipes/')
+
+    def test_root_path(self):
+        self.get('/site/api/recipes/', root_path='/site')
+        scope = self.api.scopes[0]
+        self.assertEqual((scope['root_path'], scope['app_root_path']), ('/site/api', '/site'))
+        self.get('/site/recipe/1/', root_path='/site')
+        self.assertEqual(self.site.scopes[0]['root_path'], '/site')
+
+    def test_lifespan(self):
+        async def lifespan(dispatcher):
+            messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await dispatcher({'type': 'lifespan'}, receive, send)
+            return sent
+
+        complete = ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        self.assertEqual(async_to_sync(lifespan)(self.dispatcher), complete)
+        self.assertEqual([scope['type'] for scope in self.api.scopes], ['lifespan'])
+        self.assertEqual(self.site.scopes, [])
+
+        # Без lifespan_app диспетчер подтверждает события сам
+        self.dispatcher.lifespan_app = None
+        self.assertEqual(async_to_sync(lifespan)(self.dispatcher), complete)
+        self.assertEqual(len(self.api.scopes), 1)
+
+
+async def inner_app(scope, receive, send):
+    """Приложение под HealthASGIMiddleware: отвечает 204 на любой запрос."""
+    if scope['type'] == 'lifespan':
+        while (await receive())['type'] != 'lifespan.shutdown':
+            await send({'type': 'lifespan.startup.complete'})
+        await send({'type': 'lifespan.shutdown.complete'})
+        return
+    await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+@override_settings(WARMUP_ENABLED=True, WARMUP_RETRY_INTERVAL=0.05)
+class HealthCheckTests(SimpleTestCase):
+    """Проверки живости и готовности воркера (monitoring/health.py)."""
+
+    def run_async(self, scenario, warmup):
+        """Выполняет scenario(middleware, get) в новом цикле событий."""
+        middleware = HealthASGIMiddleware(inner_app, warmup=warmup)
+
+        async def run():
+            transport = httpx.ASGITransport(app=middleware)
+            async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+                await scenario(middleware, client.get)
+        async_to_sync(run)()
+        return middleware
+
+    async def wait_for(self, readiness, state):
+        """Ждет состояния прогрева state (не дольше двух секунд)."""
+        for _ in range(200):
+            if readiness.state == state:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f'Состояние прогрева {readiness.state}, ожидалось {state}')
+
+    def test_healthz(self):
+        async def scenario(middleware, get):
+            response = await get('/healthz')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {'status': 'ok'})
+            self.assertEqual((await get('/other')).status_code, 204)
+        self.run_async(scenario, mock.Mock(return_value={}))
+
+    def test_readyz(self):
+        async def scenario(middleware, get):
+            response = await get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['status'], 'starting')
+            await self.wait_for(middleware.readiness, 'ready')
+            response = await get('/readyz')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {'status': 'ready', 'warmup': {'templates': 3}})
+        warmup = mock.Mock(return_value={'templates': 3})
+        self.run_async(scenario, warmup)
+        warmup.assert_called_once_with()
+
+    def test_readyz_lifespan(self):
+        async def scenario(middleware, get):
+            # Прогрев запускается событием startup, до первого запроса
+            async def receive():
+                return messages.pop(0)
+            messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+            await middleware({'type': 'lifespan'}, receive, mock.AsyncMock())
+            await self.wait_for(middleware.readiness, 'ready')
+            self.assertEqual((await get('/readyz')).status_code, 200)
+        self.run_async(scenario, mock.Mock(return_value={}))
+
+    def test_readyz_retry(self):
+        async def scenario(middleware, get):
+            self.assertEqual((await get('/readyz')).status_code, 503)
+            await self.wait_for(middleware.readiness, 'failed')
+            response = await get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['error'], 'RuntimeError: база недоступна')
+            await self.wait_for(middleware.readiness, 'ready')
+            response = await get('/readyz')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('error', response.json())
+        warmup = mock.Mock(side_effect=[RuntimeError('база недоступна'), {}])
+        with self.assertLogs('monitoring.health', 'ERROR'):
+            self.run_async(scenario, warmup)
+        self.assertEqual(warmup.call_count, 2)
@@ -0,0 +1,160 @@
+"""
+Бюджеты SQL-запросов страниц сайта (recipes.urls), в том числе
+с асинхронными вариантами представлений.
+"""
+
+import asyncio
+import types
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.urls import path, reverse
+
+from .. import backends, similarity, urls, views
+from ..counters import view_counter
+from ..models import Category, Recipe, RecipeStats
+from .base import (
+    CATALOG_SIZES, CATEGORIES_PER_RECIPE, SITE_BUDGETS, QueryBudgetTestCase, create_recipe, grow_catalog,
+)
+
+
+class SiteQueryBudgetTests(QueryBudgetTestCase):
+    """Бюджеты запросов страниц сайта (recipes.urls)."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+
+    def own_recipe(self):
+        """Создает рецепт текущего пользователя с категориями."""
+        recipe = create_recipe(self.user)
+        recipe.categories.set(Category.objects.all()[:CATEGORIES_PER_RECIPE])
+        return recipe
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names - SITE_BUDGETS.keys(), set(), 'Маршруты без бюджета запросов')
+
+    def test_home(self):
+        self.assertWithinBudget(SITE_BUDGETS['home'], 'home', lambda _: self.client.get(reverse('home')))
+
+    def test_home_filtered(self):
+        self.assertWithinBudget(
+            SITE_BUDGETS['home'], 'home?categories',
+            lambda ids: self.client.get(reverse('home'), {'categories': ids}),
+            prepare=lambda: list(Category.objects.order_by('id').values_list('id', flat=True)[:2]),
+        )
+
+    def test_recipe_detail(self):
+        self.assertWithinBudget(
+            SITE_BUDGETS['recipe_detail'], 'recipe_detail',
+            lambda recipe: self.client.get(reverse('recipe_detail', args=[recipe.pk])),
+            prepare=lambda: Recipe.objects.order_by('-id').first(),
+        )
+
+    def test_home_popular(self):
+        self.assertWithinBudget(SITE_BUDGETS['home'], 'home?sort=popular',
+                                lambda _: self.client.get(reverse('home'), {'sort': 'popular'}))
+
+    def test_recipe_views(self):
+        grow_catalog(CATALOG_SIZES[0])
+        view_counter.flush()
+        popular, other = Recipe.objects.order_by('title')[:2]
+        for recipe in (popular, popular, other):
+            self.client.get(reverse('recipe_detail', args=[recipe.pk]))
+        self.assertFalse(RecipeStats.objects.exists())
+
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(dict(RecipeStats.objects.values_list('recipe_id', 'views')), {popular.pk: 2, other.pk: 1})
+        RecipeStats.objects.update_popularity()
+        response = self.client.get(reverse('home'), {'sort': 'popular'})
+        self.assertEqual([recipe.pk for recipe in response.context['recipes']][:2], [popular.pk, other.pk])
+
+    def test_recipe_detail_similar(self):
+        grow_catalog(CATALOG_SIZES[1])
+        similarity.build()
+        self.assertWithinBudget(
+            SITE_BUDGETS['recipe_detail'], 'recipe_detail (похожие рецепты)',
+            lambda recipe: self.client.get(reverse('recipe_detail', args=[recipe.pk])),
+            prepare=lambda: Recipe.objects.order_by('id').first(),
+        )
+        recipe = Recipe.objects.order_by('id').first()
+        response = self.client.get(reverse('recipe_detail', args=[recipe.pk]))
+        self.assertEqual(len(response.context['similar_recipes']), settings.SIMILAR_RECIPES_TOP_K)
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_user_cache_disabled(self):
+        # Без общего кэша пользователь загружается из БД на каждом запросе
+        backend = backends.CachedModelBackend()
+        self.assertEqual(backend.get_user(self.user.pk), self.user)
+        self.assertIsNone(cache.get(backends.user_cache_key(self.user.pk)))
+
+    def test_add_recipe(self):
+        self.client.force_login(self.user)
+        self.assertWithinBudget(SITE_BUDGETS['add_recipe'], 'add_recipe',
+                                lambda _: self.client.get(reverse('add_recipe')))
+
+    def test_edit_recipe(self):
+        self.client.force_login(self.user)
+        recipe = self.own_recipe()
+        self.assertWithinBudget(SITE_BUDGETS['edit_recipe'], 'edit_recipe',
+                                lambda _: self.client.get(reverse('edit_recipe', args=[recipe.pk])))
+
+    def test_delete_recipe(self):
+        self.client.force_login(self.user)
+        self.assertWithinBudget(
+            SITE_BUDGETS['delete_recipe'], 'delete_recipe',
+            lambda recipe: self.client.post(reverse('delete_recipe', args=[recipe.pk])),
+            prepare=self.own_recipe,
+            status=302,
+        )
+
+    def test_signup(self):
+        self.assertWithinBudget(SITE_BUDGETS['signup'], 'signup', lambda _: self.client.get(reverse('signup')))
+
+    def test_login(self):
+        self.assertWithinBudget(SITE_BUDGETS['login'], 'login', lambda _: self.client.get(reverse('login')))
+
+    def test_logout(self):
+        self.assertWithinBudget(
+            SITE_BUDGETS['logout'], 'logout',
+            lambda _: self.client.get(reverse('logout')),
+            prepare=lambda: self.client.force_login(self.user),
+            status=302,
+        )
+
+    def test_add_category(self):
+        self.client.force_login(self.user)
+        self.assertWithinBudget(
+            SITE_BUDGETS['add_category'], 'add_category',
+            lambda _: self.client.post(reverse('add_category'), {'name': 'Выпечка'}),
+        )
+
+
+# Маршруты сайта с асинхронными вариантами представлений (как при ASYNC_VIEWS = True)
+ASYNC_SITE_VIEWS = {'home': views.ahome, 'recipe_detail': views.arecipe_detail, 'add_category': views.aadd_category_ajax}
+async_urlconf = types.ModuleType('async_urlconf')
+async_urlconf.urlpatterns = [
+    path(str(pattern.pattern), ASYNC_SITE_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+    for pattern in urls.urlpatterns
+]
+
+
+@override_settings(ROOT_URLCONF=async_urlconf, ASYNC_VIEWS=True)
+class AsyncSiteQueryBudgetTests(SiteQueryBudgetTests):
+    """Бюджеты запросов страниц сайта с асинхронными представлениями."""
+
+    def test_async_views(self):
+        self.assertEqual(ASYNC_SITE_VIEWS.keys() - SITE_BUDGETS.keys(), set())
+        for name, view in ASYNC_SITE_VIEWS.items():
+            self.assertTrue(asyncio.iscoroutinefunction(view), name)
+
+    def test_add_category_existing(self):
+        # Существующая категория находится без учёта регистра, новая не создается
+        self.client.force_login(self.user)
+        # Латиница: lower() в SQLite не меняет регистр кириллицы
+        category = Category.objects.create(name='Pasta')
+        response = self.client.post(reverse('add_category'), {'name': 'pasta'})
+        self.assertEqual(response.json(), {'success': True, 'category': {'id': category.pk, 'name': 'Pasta'}})
+        self.assertEqual(Category.objects.count(), 1)
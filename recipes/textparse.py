@@ -0,0 +1,39 @@
+"""
+Разбор текстов рецептов в отдельном пуле процессов.
+
+Пакетный импорт (recipes/bulk.py) нормализует и разбирает тексты
+ингредиентов и шагов тех же фильтрами parse_ingredients и parse_steps,
+что и страница рецепта. Для больших пакетов это заметная нагрузка на
+процессор, поэтому пакеты от BULK_IMPORT_POOL_MIN записей разбираются
+в пуле из BULK_IMPORT_WORKERS процессов (см. recipe_site/procpool.py).
+
+Дочерний процесс импортирует фильтры recipe_filters только при разборе
+первой записи; записи передаются парами строк, а не объектами моделей.
+"""
+
+from recipe_site.procpool import ProcessPool
+
+pool = ProcessPool('BULK_IMPORT_WORKERS')
+
+
+def normalize(text):
+    """Унифицирует переводы строк и убирает пробелы в конце строк."""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def preparse(texts):
+    """
+    Нормализует и разбирает тексты ингредиентов и шагов одной записи.
+
+    Args:
+        texts: Пара (ingredients, steps)
+
+    Returns:
+        tuple: (ingredients, steps, число ингредиентов, число шагов)
+    """
+    from .templatetags.recipe_filters import parse_ingredients, parse_steps
+
+    ingredients, steps = (normalize(text) for text in texts)
+    ingredient_count = sum(len(block['items']) for block in parse_ingredients(ingredients))
+    return ingredients, steps, ingredient_count, len(parse_steps(steps))
@@ -5,22 +5,35 @@
 - Просмотр, создание, редактирование и удаление рецептов
 - Аутентификацию пользователей (регистрация, вход, выход)
 - Управление категориями
+
+При ASYNC_VIEWS = True главная страница, страница рецепта и добавление
+категории обслуживаются асинхронными вариантами представлений.
 """
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    home_view, recipe_detail_view, add_category_view = (
+        views.ahome, views.arecipe_detail, views.aadd_category_ajax
+    )
+else:
+    home_view, recipe_detail_view, add_category_view = (
+        views.home, views.recipe_detail, views.add_category_ajax
+    )
+
 urlpatterns = [
     # Основные страницы
     path('', 
-         views.home, 
+         home_view, 
          name='home',
          # Главная страница со списком рецептов
     ),
     
     # Управление рецептами
     path('recipe/<int:recipe_id>/', 
-         views.recipe_detail, 
+         recipe_detail_view, 
          name='recipe_detail',
          # Детальная страница рецепта, recipe_id - идентификатор рецепта
     ),
@@ -59,6 +72,6 @@ urlpatterns = [
     
     # Управление категориями
     path('category/add/', 
-         views.add_category_ajax, 
+         add_category_view, 
          name='add_category'),
 ]
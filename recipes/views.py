@@ -9,20 +9,45 @@
 - удаление рецепта
 - фильтрация рецептов по категориям
 
+Главная страница, страница рецепта и добавление категории через AJAX
+имеют асинхронные варианты (ahome, arecipe_detail, aadd_category_ajax)
+на асинхронном API ORM. Какие варианты подключаются к маршрутам,
+определяет настройка ASYNC_VIEWS (см. recipes/urls.py).
+
 Каждое представление включает в себя необходимые проверки прав доступа
 и обработку данных форм.
 """
 
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Recipe, Category
+from .models import POPULAR_ORDERING, Recipe, Category, SimilarRecipe
+from .catalog import category_catalog
+from .counters import view_counter
 from .forms import RecipeForm, CategoryFilterForm
+from .services import create_recipe, update_recipe, RecipeConflictError
 from django.http import JsonResponse
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
+from monitoring.tracing import traced
+
+
+async def _aload_user(request):
+    """
+    Загружает пользователя запроса до отрисовки шаблона.
+    
+    Контекстный процессор auth передает в шаблон request.user, а ленивая
+    загрузка пользователя и сессии из БД в асинхронном коде запрещена,
+    поэтому пользователь загружается заранее через request.auser().
+    
+    Args:
+        request: объект HttpRequest
+    """
+    request.user = await request.auser()
+
 
+@traced
 def home(request):
     """
     Отображает главную страницу со списком всех рецептов.
@@ -38,16 +63,19 @@ def home(request):
         - Отображает все рецепты, если фильтры не выбраны
         - Сохраняет выбранные фильтры в форме
         - Сортирует рецепты по названию в алфавитном порядке
+          или по популярности (sort=popular)
     """
     # Инициализация формы фильтрации
     form = CategoryFilterForm(request.GET)
-    recipes = Recipe.objects.all().order_by('title')  # Добавляем сортировку по названию
+    # Категории карточек загружаются одним запросом на всю страницу
+    recipes = Recipe.objects.prefetch_related('categories')
     selected_categories = []
 
     # Применение фильтров, если они выбраны
     if form.is_valid() and form.cleaned_data['categories']:
         selected_categories = form.cleaned_data['categories']
-        recipes = recipes.filter(categories__in=selected_categories).distinct().order_by('title')  # Сохраняем сортировку после фильтрации
+        recipes = recipes.filter(categories__in=selected_categories).distinct()
+    recipes = recipes.order_by(*_home_ordering(form))
 
     context = {
         'recipes': recipes,
@@ -56,6 +84,51 @@ def home(request):
     }
     return render(request, 'recipes/home.html', context)
 
+def _home_ordering(form):
+    """
+    Сортировка рецептов главной страницы по параметру sort.
+
+    Returns:
+        tuple: Поля сортировки: по названию или по популярности
+    """
+    if form.is_valid() and form.cleaned_data.get('sort') == 'popular':
+        return (*POPULAR_ORDERING, 'title')
+    return ('title',)
+
+@traced
+async def ahome(request):
+    """
+    Асинхронный вариант home.
+    
+    Args:
+        request: объект HttpRequest
+    
+    Returns:
+        HttpResponse с отрендеренным шаблоном home.html
+        
+    Notes:
+        Справочник категорий берется из асинхронного снимка, а рецепты
+        загружаются до отрисовки, поэтому шаблон не обращается к БД.
+    """
+    snapshot = await category_catalog.asnapshot()
+    form = CategoryFilterForm(request.GET, snapshot=snapshot)
+    recipes = Recipe.objects.prefetch_related('categories')
+    selected_categories = []
+
+    if form.is_valid() and form.cleaned_data['categories']:
+        selected_categories = form.cleaned_data['categories']
+        recipes = recipes.filter(categories__in=selected_categories).distinct()
+    recipes = recipes.order_by(*_home_ordering(form))
+
+    context = {
+        'recipes': [recipe async for recipe in recipes],
+        'form': form,
+        'selected_categories': selected_categories
+    }
+    await _aload_user(request)
+    return render(request, 'recipes/home.html', context)
+
+@traced
 def recipe_detail(request, recipe_id):
     """
     Отображает детальную страницу рецепта.
@@ -67,15 +140,58 @@ def recipe_detail(request, recipe_id):
     Returns:
         HttpResponse с отрендеренным шаблоном
     """
-    recipe = get_object_or_404(Recipe, id=recipe_id)
-    # Получаем отсортированные категории для рецепта
-    categories = recipe.categories.all().order_by('name')
+    recipe = get_object_or_404(
+        Recipe.objects.select_related('author').prefetch_related('categories'),
+        id=recipe_id
+    )
+    # Просмотр учитывается в памяти и сохраняется в БД пакетом (см. recipes/counters.py)
+    view_counter.add(recipe.pk)
+    # Категории уже отсортированы по имени (Category.Meta.ordering)
+    categories = recipe.categories.all()
     return render(request, 'recipes/recipe_detail.html', {
         'recipe': recipe,
-        'categories': categories
+        'categories': categories,
+        'similar_recipes': _similar_recipes(recipe),
+    })
+
+def _similar_recipes(recipe):
+    """
+    Заранее рассчитанные похожие рецепты (см. команду build_similar).
+
+    Returns:
+        QuerySet: Записи SimilarRecipe с карточками рецептов (один запрос)
+    """
+    return SimilarRecipe.objects.filter(recipe=recipe).select_related('similar').only(
+        'rank', 'similar__id', 'similar__title', 'similar__image', 'similar__preparation_time',
+    )
+
+@traced
+async def arecipe_detail(request, recipe_id):
+    """
+    Асинхронный вариант recipe_detail.
+    
+    Args:
+        request: объект HttpRequest
+        recipe_id: идентификатор рецепта
+        
+    Returns:
+        HttpResponse с отрендеренным шаблоном
+    """
+    recipe = await aget_object_or_404(
+        Recipe.objects.select_related('author').prefetch_related('categories'),
+        id=recipe_id
+    )
+    view_counter.add(recipe.pk)
+    similar_recipes = [item async for item in _similar_recipes(recipe)]
+    await _aload_user(request)
+    return render(request, 'recipes/recipe_detail.html', {
+        'recipe': recipe,
+        'categories': recipe.categories.all(),
+        'similar_recipes': similar_recipes,
     })
 
 @login_required
+@traced
 def add_recipe(request):
     """
     Обрабатывает создание нового рецепта.
@@ -97,8 +213,8 @@ def add_recipe(request):
         if form.is_valid():
             recipe = form.save(commit=False)
             recipe.author = request.user
-            recipe.save()
-            form.save_m2m()  # Сохраняем связи many-to-many
+            # Рецепт и связи many-to-many сохраняются в одной транзакции
+            create_recipe(recipe, form.cleaned_data['categories'])
             messages.success(request, 'Рецепт успешно добавлен!')
             return redirect('recipe_detail', recipe_id=recipe.id)
     else:
@@ -107,6 +223,7 @@ def add_recipe(request):
     return render(request, 'recipes/recipe_form.html', {'form': form, 'title': 'Добавить рецепт'})
 
 @login_required
+@traced
 def edit_recipe(request, recipe_id):
     """
     Редактирование существующего рецепта.
@@ -116,25 +233,48 @@ def edit_recipe(request, recipe_id):
         recipe_id: идентификатор рецепта
         
     Returns:
-        HttpResponse с отрендеренным шаблоном или редирект
+        HttpResponse с отрендеренным шаблоном или редирект.
+        Если рецепт был изменен после открытия формы, форма
+        возвращается с ошибкой и статусом 409.
+        
+    Особенности:
+        - Записываются только изменившиеся поля
+        - Категории обновляются добавлением и удалением разницы
+        - Все изменения выполняются в одной транзакции
     """
     recipe = get_object_or_404(Recipe, id=recipe_id, author=request.user)
+    status = 200
     
     if request.method == 'POST':
         form = RecipeForm(request.POST, request.FILES, instance=recipe)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Рецепт успешно обновлен!')
-            return redirect('recipe_detail', recipe_id=recipe.id)
+            categories = None
+            if 'categories' in form.changed_data:
+                categories = form.cleaned_data['categories']
+            try:
+                update_recipe(
+                    form.save(commit=False),
+                    form.changed_model_fields(),
+                    categories=categories,
+                    expected_version=form.cleaned_data['version'],
+                )
+            except RecipeConflictError:
+                form.add_error(None, 'Рецепт был изменен в другом окне. '
+                                     'Обновите страницу и повторите изменения.')
+                status = 409
+            else:
+                messages.success(request, 'Рецепт успешно обновлен!')
+                return redirect('recipe_detail', recipe_id=recipe.id)
     else:
         form = RecipeForm(instance=recipe)
     
     return render(request, 'recipes/recipe_form.html', {
         'form': form,
         'title': 'Редактировать рецепт'
-    })
+    }, status=status)
 
 @login_required
+@traced
 def delete_recipe(request, recipe_id):
     """
     Удаление рецепта.
@@ -151,6 +291,7 @@ def delete_recipe(request, recipe_id):
     messages.success(request, 'Рецепт успешно удален!')
     return redirect('home')
 
+@traced
 def signup(request):
     """
     Регистрирует нового пользователя в системе.
@@ -173,6 +314,7 @@ def signup(request):
         form = UserCreationForm()
     return render(request, 'registration/signup.html', {'form': form})
 
+@traced
 def login_view(request):
     """
     Аутентифицирует пользователя в системе.
@@ -198,6 +340,7 @@ def login_view(request):
     return render(request, 'registration/login.html', {'form': form})
 
 @login_required
+@traced
 def add_category(request):
     """
     Добавляет новую категорию рецептов. Требует аутентификации пользователя.
@@ -218,6 +361,7 @@ def add_category(request):
         form = CategoryForm()
     return render(request, 'recipes/add_category.html', {'form': form})
 
+@traced
 def add_category_ajax(request):
     """
     Представление для добавления новой категории через AJAX.
@@ -227,13 +371,19 @@ def add_category_ajax(request):
         
     Returns:
         JsonResponse с результатом операции
+        
+    Notes:
+        Если категория с таким названием уже существует (без учёта регистра),
+        возвращается она, а новая не создается.
     """
     if request.method == 'POST':
-        name = request.POST.get('name')
+        name = Category.normalize_name(request.POST.get('name'))
         if name:
             try:
-                # Создаем новую категорию
-                category = Category.objects.create(name=name)
+                # Находим категорию без учёта регистра или создаем новую;
+                # уникальный индекс исключает дубли при параллельных запросах
+                categories, _ = Category.objects.resolve(names=[name])
+                category = categories[0]
                 return JsonResponse({
                     'success': True,
                     'category': {
@@ -257,6 +407,45 @@ def add_category_ajax(request):
         'error': 'Метод не поддерживается'
     })
 
+@traced
+async def aadd_category_ajax(request):
+    """
+    Асинхронный вариант add_category_ajax.
+    
+    Args:
+        request: объект HttpRequest
+        
+    Returns:
+        JsonResponse с результатом операции
+    """
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Метод не поддерживается'
+        })
+    name = Category.normalize_name(request.POST.get('name'))
+    if not name:
+        return JsonResponse({
+            'success': False,
+            'error': 'Название категории не может быть пустым'
+        })
+    try:
+        categories, _ = await Category.objects.aresolve(names=[name])
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+    category = categories[0]
+    return JsonResponse({
+        'success': True,
+        'category': {
+            'id': category.id,
+            'name': category.name
+        }
+    })
+
+@traced
 def logout_view(request):
     """
     Выход пользователя из системы.
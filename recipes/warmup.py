@@ -0,0 +1,108 @@
+"""
+Прогрев воркера перед тем, как он сообщит о готовности.
+
+Первые запросы к только что запущенному воркеру оплачивают компиляцию
+шаблонов, загрузку библиотеки фильтров recipe_filters и справочника
+категорий. Функция run() выполняет всё это заранее; пока она не завершилась, /readyz отвечает 503
+(см. monitoring/health.py).
+
+Шаг connections проверяет, что базы данных доступны: воркер, который
+не может подключиться, не сообщает о готовности. Открытые соединения
+запросам не достаются — под ASGI синхронные представления работают
+в других потоках со своими соединениями, а переиспользует их пулер
+(см. CONN_MAX_AGE в настройках).
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.loader import render_to_string
+
+from .catalog import category_catalog
+
+logger = logging.getLogger(__name__)
+
+
+def open_connections():
+    """Проверяет подключение ко всем базам данных."""
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def compile_templates():
+    """
+    Компилирует шаблоны приложения рецептов.
+
+    Шаблоны попадают в кэш загрузчика (cached.Loader), вместе с ними
+    загружаются библиотеки тегов, в том числе recipe_filters.
+    """
+    directory = Path(apps.get_app_config('recipes').path) / 'templates'
+    count = 0
+    for engine in engines.all():
+        for path in sorted(directory.rglob('*.html')):
+            engine.get_template(path.relative_to(directory).as_posix())
+            count += 1
+    return count
+
+
+def load_catalog():
+    """Загружает снимок справочника категорий."""
+    return len(category_catalog.snapshot().categories)
+
+
+def prerender_recipes(limit=None):
+    """
+    Отрисовывает страницы последних измененных рецептов.
+
+    Прогревает разбор ингредиентов и шагов и код отрисовки страницы рецепта.
+
+    Args:
+        limit: Число рецептов (по умолчанию WARMUP_PRERENDER)
+    """
+    from .models import Recipe
+
+    limit = settings.WARMUP_PRERENDER if limit is None else limit
+    recipes = Recipe.objects.select_related('author').prefetch_related('categories') \
+        .order_by('-updated_at')[:limit]
+    count = 0
+    for recipe in recipes:
+        render_to_string('recipes/recipe_detail.html', {
+            'recipe': recipe,
+            'categories': recipe.categories.all(),
+        })
+        count += 1
+    return count
+
+
+# Шаги прогрева в порядке выполнения
+STEPS = (
+    ('connections', open_connections),
+    ('templates', compile_templates),
+    ('catalog', load_catalog),
+    ('prerender', prerender_recipes),
+)
+
+
+def run():
+    """
+    Выполняет все шаги прогрева.
+
+    Returns:
+        dict: {шаг: {'result': ..., 'ms': ...}}
+
+    Raises:
+        Exception: Ошибка шага прогрева (последующие шаги не выполняются)
+    """
+    report = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        result = step()
+        report[name] = {'result': result, 'ms': round((time.perf_counter() - start) * 1000, 1)}
+    logger.info('Прогрев завершен: %s', report)
+    return report
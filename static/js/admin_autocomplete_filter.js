@@ -0,0 +1,23 @@
+/*
+ * Фильтры списка в админке с выбором значения через автодополнение
+ * (recipes.admin.AutocompleteFieldListFilter): выбор значения
+ * перезагружает список с параметром фильтра.
+ */
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(function() {
+        $('.autocomplete-filter select').on('change', function() {
+            const parameter = $(this).closest('.autocomplete-filter').data('parameter');
+            const url = new URL(window.location.href);
+            if (this.value) {
+                url.searchParams.set(parameter, this.value);
+            } else {
+                url.searchParams.delete(parameter);
+            }
+            url.searchParams.delete('p');
+            window.location.href = url.toString();
+        });
+    });
+}